@@ -31,6 +31,74 @@ class Settings:
             os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
         )
 
+        # Authenticated-user cache in get_current_user (0 disables it)
+        self.auth_user_cache_ttl_seconds = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "30"))
+        self.auth_user_cache_max_entries = int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", "10000"))
+        # Accept the profile claims of access tokens younger than this without
+        # reading the user at all (0 = always resolve the user)
+        self.auth_trust_token_claims_seconds = float(os.getenv("AUTH_TRUST_TOKEN_CLAIMS_SECONDS", "0"))
+
+        # Refresh-token revocation store: how often each worker pulls revocations
+        # made by the others, and how many its in-process filter is sized for
+        self.token_revocation_sync_seconds = float(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", "5"))
+        self.token_revocation_bloom_capacity = int(os.getenv("TOKEN_REVOCATION_BLOOM_CAPACITY", "100000"))
+
+        # Password hashing: PBKDF2 rounds (raising it rehashes passwords on
+        # their next login) and the process pool hashes run in (0 workers =
+        # a thread instead of processes)
+        self.password_pbkdf2_rounds = int(os.getenv("PASSWORD_PBKDF2_ROUNDS", "30000"))
+        self.password_hash_workers = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+        self.password_hash_max_concurrent = int(
+            os.getenv("PASSWORD_HASH_MAX_CONCURRENT", str(max(self.password_hash_workers, 1)))
+        )
+        # Hashes allowed to wait for a slot; beyond that logins get a 503
+        self.password_hash_max_waiting = int(os.getenv("PASSWORD_HASH_MAX_WAITING", "64"))
+
+        # Image storage ("cloudinary", "local" for offline / air-gapped installs,
+        # or "memory" for load tests)
+        self.storage_backend = os.getenv("STORAGE_BACKEND", "cloudinary").lower()
+        self.local_storage_dir = os.getenv("LOCAL_STORAGE_DIR", "storage")
+        self.storage_public_url = os.getenv(
+            "STORAGE_PUBLIC_URL", self.ngrok_url or "http://localhost:8000"
+        ).rstrip("/")
+        self.storage_fake_latency_ms = float(os.getenv("STORAGE_FAKE_LATENCY_MS", "0"))
+
+        # Deferred uploads: return analyses before the image upload finishes
+        self.deferred_uploads = os.getenv("DEFERRED_UPLOADS", "false").lower() == "true"
+        self.upload_outbox_poll_seconds = float(os.getenv("UPLOAD_OUTBOX_POLL_SECONDS", "2"))
+        self.upload_outbox_max_attempts = int(os.getenv("UPLOAD_OUTBOX_MAX_ATTEMPTS", "8"))
+
+        # Ensure registered indexes in the background at startup
+        self.ensure_indexes_on_startup = os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+
+        # In-process cache in front of the admin analytics queries
+        self.analytics_cache_enabled = os.getenv("ANALYTICS_CACHE_ENABLED", "true").lower() == "true"
+        # Writes leave cached analytics younger than this fresh until they reach it
+        self.analytics_cache_min_fresh_seconds = float(os.getenv("ANALYTICS_CACHE_MIN_FRESH_SECONDS", "10"))
+        # Featured-disease spotlight windows (days) recomputed in the background
+        self.spotlight_windows = [
+            int(d) for d in os.getenv("SPOTLIGHT_WINDOWS", "7,30,90").split(",") if d.strip()
+        ]
+        self.spotlight_refresh_seconds = float(os.getenv("SPOTLIGHT_REFRESH_SECONDS", "120"))
+
+        # Write-behind batching of analysis inserts (see services/write_behind.py)
+        self.write_behind_enabled = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true"
+        self.write_behind_max_batch = int(os.getenv("WRITE_BEHIND_MAX_BATCH", "50"))
+        self.write_behind_max_delay_ms = float(os.getenv("WRITE_BEHIND_MAX_DELAY_MS", "25"))
+        self.write_behind_spool_dir = os.getenv("WRITE_BEHIND_SPOOL_DIR", "spool")
+        self.write_behind_spool_retry_seconds = float(os.getenv("WRITE_BEHIND_SPOOL_RETRY_SECONDS", "30"))
+
+        # Request tracing ("none", "ndjson" or "log")
+        self.tracing_exporter = os.getenv("TRACING_EXPORTER", "none").lower()
+        self.tracing_file = os.getenv("TRACING_FILE", "traces/traces.ndjson")
+        self.tracing_sample_rate = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+        self.tracing_min_duration_ms = float(os.getenv("TRACING_MIN_DURATION_MS", "0"))
+
+        # Event-loop lag monitor / blocking detector
+        self.loop_monitor_enabled = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+        self.loop_monitor_interval_ms = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "100"))
+        self.loop_block_threshold_ms = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+
     def get_cors_origins(self) -> list[str]:
         default_origins = [
             "http://localhost:5173",
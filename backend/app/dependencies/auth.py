@@ -1,9 +1,14 @@
 # Add this import at the top
+import time
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Any, Optional, Dict
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from app.config import get_settings
 from app.services.user_service import user_service
+from app.utils.tracing import span
+
+settings = get_settings()
 
 # OAuth2 scheme for token handling
 oauth2_scheme = OAuth2PasswordBearer(
@@ -11,11 +16,39 @@ oauth2_scheme = OAuth2PasswordBearer(
     auto_error=False  # Allow optional authentication
 )
 
+def _user_from_claims(payload: Dict[str, Any]) -> Optional[Dict]:
+    """
+    The current user straight from a recent access token's profile claims,
+    or None when they may not be trusted: trusting is disabled, the token
+    predates the claims or is older than AUTH_TRUST_TOKEN_CLAIMS_SECONDS,
+    or this process changed the user since it was issued
+    """
+    window = settings.auth_trust_token_claims_seconds
+    issued_at = payload.get("iat")
+    if window <= 0 or issued_at is None or "is_active" not in payload:
+        return None
+    if time.time() - issued_at > window or user_service.changed_since(payload["user_id"], issued_at):
+        return None
+    return {
+        "id": payload["user_id"],
+        "email": payload.get("email") or "",
+        "full_name": payload.get("full_name") or "",
+        "profile_picture": payload.get("profile_picture"),
+        "role": payload.get("role", "user"),
+        "is_active": payload["is_active"],
+        "created_at": payload.get("created_at") or datetime.utcnow().isoformat(),
+    }
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme)
 ) -> Optional[Dict]:
     """
     Dependency to get current user from JWT token
+
+    The user is read through user_service's authenticated-user cache, so
+    repeated requests with the same user cost no database round trip
+    until the entry expires or the user is updated.
     """
     from app.services.auth_service import auth_service
     
@@ -37,8 +70,13 @@ async def get_current_user(
                 detail="Invalid token",
             )
         
-        # Get user from database
-        user = await user_service.get_user_by_id(user_id)
+        trusted = _user_from_claims(payload)
+        if trusted is not None:
+            return trusted
+        
+        # Get user from the cache / database
+        with span("auth.get_user"):
+            user = await user_service.get_cached_user(user_id)
         
         if user is None:
             raise HTTPException(
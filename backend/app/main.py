@@ -9,10 +9,22 @@ from .routes.analysis import router as analysis_router
 from .routes.upload import router as upload_router
 from .routes.auth import router as auth_router
 from app.routes.forum import router as forum_router
-from .services.database import connect_to_mongo, close_mongo_connection
+from .services.database import connect_to_mongo, close_mongo_connection, get_database
+from .services.storage_service import storage_service
+from .services.upload_outbox import upload_outbox
+from .services.indexes import index_manager
+from .services.analytics_service import spotlight_warmer
+from .services.token_revocation import refresh_token_store
+from .services.write_behind import analysis_write_buffer
+from .utils.tracing import TracingMiddleware, TracedJSONResponse, build_tracing_middleware_kwargs
+from .utils.profiler import ProfilingMiddleware
+from .utils.loop_monitor import loop_monitor
+from .utils.password_hasher import password_hasher
 from .routes.chatbot_router import router as chatbot_router
 from .routes.analytics import router as analytics_router
 from .routes.notifications import router as notifications_router
+from .routes.metrics import router as metrics_router
+from .routes.admin import router as admin_router
 
 load_dotenv()
 settings = get_settings()
@@ -26,6 +38,7 @@ app = FastAPI(
     title=settings.project_name,
     description=settings.description,
     version=settings.version,
+    default_response_class=TracedJSONResponse,
 )
 
 # CORS: Explicitly allow ngrok and Expo origins
@@ -49,6 +62,12 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# On-demand profiling of requests to a route (see /api/v1/admin/profile)
+app.add_middleware(ProfilingMiddleware)
+
+# Request tracing (outermost, so spans cover CORS handling too)
+app.add_middleware(TracingMiddleware, **build_tracing_middleware_kwargs())
+
 @app.get("/")
 async def root():
     return {"message": "TomatoGuard API is running"}
@@ -63,11 +82,35 @@ async def on_startup() -> None:
         print(f"❌ MongoDB connection failed: {e}")
         raise
 
+    if settings.ensure_indexes_on_startup:
+        index_manager.start(get_database())
+
+    if settings.deferred_uploads:
+        upload_outbox.start(get_database())
+
+    if settings.write_behind_enabled:
+        analysis_write_buffer.start(get_database())
+
+    spotlight_warmer.start(get_database())
+    refresh_token_store.start(get_database())
+    password_hasher.start()
+
+    if settings.loop_monitor_enabled:
+        loop_monitor.start()
+
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
+    await loop_monitor.stop()
+    await index_manager.stop()
+    await spotlight_warmer.stop()
+    await password_hasher.stop()
+    await refresh_token_store.stop()
+    await upload_outbox.stop()
+    await analysis_write_buffer.stop()  # flushes queued analyses before Mongo closes
     print("🔌 Closing MongoDB connection...")
     await close_mongo_connection()
     print("✅ MongoDB connection closed.")
+    await storage_service.aclose()
 
 # Include route modules
 app.include_router(analysis_router)
@@ -77,6 +120,8 @@ app.include_router(forum_router)
 app.include_router(chatbot_router)
 app.include_router(analytics_router)
 app.include_router(notifications_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -90,6 +90,7 @@ class AnalysisRecord(BaseModel):
     notes: Optional[str] = None
     tags: List[str] = Field(default_factory=list)
     metadata: Optional[AnalysisMetadata] = None
+    image_status: Optional[str] = None  # "pending" / "uploaded" / "failed" for deferred uploads
     
     @validator('notes', pre=True)
     def filter_notes_profanity(cls, v):
@@ -149,6 +150,9 @@ class AnalysisResponse(BaseModel):
     notes: Optional[str] = None
     tags: List[str] = []
     metadata: Optional[AnalysisMetadata] = None
+    image_status: Optional[str] = None
+    # "saved" / "spooled" (write-behind buffer fell back to disk); only set on save
+    write_status: Optional[str] = Field(default=None, exclude=True)
     
     class Config:
         from_attributes = True
@@ -177,6 +181,19 @@ class AnalysisSearchFilters(BaseModel):
     has_disease: Optional[bool] = None
     limit: int = Field(default=50, ge=1, le=100)
     offset: int = Field(default=0, ge=0)
+    # Continuation token (app.utils.pagination); takes precedence over offset
+    cursor: Optional[str] = None
+
+class AnalysisExportFilters(BaseModel):
+    """Selection for bulk exports (services/export_service.py)"""
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    plant_part: Optional[str] = None
+    disease: Optional[str] = None
+    min_confidence: Optional[float] = Field(default=None, ge=0, le=1)
+    max_confidence: Optional[float] = Field(default=None, ge=0, le=1)
+    # Resume after this position (the `cursor` of the last row received)
+    cursor: Optional[str] = None
 
 class AnalysisSummary(BaseModel):
     """Brief summary of analysis for list views"""
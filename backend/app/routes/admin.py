@@ -0,0 +1,121 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from app.dependencies.auth import get_current_admin_user
+from app.models.analysis_model import AnalysisExportFilters
+from app.services.database import get_database
+from app.services.export_service import EXPORT_FORMATS, AnalysisExporter, ExportUnavailable
+from app.services.indexes import index_manager
+from app.utils.loop_monitor import loop_monitor
+from app.utils.profiler import profiler_controller
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
+
+
+@router.post("/profile")
+async def capture_profile(
+    seconds: Optional[float] = Query(None, gt=0, le=120, description="Profile for this many seconds"),
+    route: Optional[str] = Query(None, description="Route template to profile, e.g. /api/analyze/upload"),
+    requests: int = Query(5, ge=1, le=100, description="Number of matching requests to profile"),
+    timeout: float = Query(120, gt=0, le=600, description="Give up waiting for requests after this many seconds"),
+    interval_ms: float = Query(5, ge=1, le=100, description="Sampling interval"),
+    include_idle: bool = Query(False, description="Keep samples of idle threads / the idle event loop"),
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    current_user: dict = Depends(get_current_admin_user),
+):
+    """
+    Capture a sampling profile of the live process.
+
+    Either pass `seconds` (process-wide) or `route` + `requests` (samples
+    only while matching requests are in flight). Returns the top functions
+    and a collapsed-stack flamegraph file; `format=collapsed` returns just
+    the file.
+    """
+    if (seconds is None) == (route is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass exactly one of 'seconds' or 'route'",
+        )
+    if profiler_controller.busy:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already being captured",
+        )
+
+    interval = interval_ms / 1000.0
+    if seconds is not None:
+        result = await profiler_controller.profile_for(seconds, interval, include_idle)
+    else:
+        result = await profiler_controller.profile_requests(
+            route, requests, timeout, interval, include_idle
+        )
+
+    if format == "collapsed":
+        return PlainTextResponse(
+            result["collapsed"],
+            headers={"Content-Disposition": f'attachment; filename="profile-{result["profile_id"]}.folded"'},
+        )
+    return {"status": "success", "data": result}
+
+
+@router.get("/event-loop")
+async def event_loop_status(
+    limit: int = Query(20, ge=1, le=50),
+    current_user: dict = Depends(get_current_admin_user),
+):
+    """Event-loop lag percentiles and the most recent blocking events with stacks"""
+    return {"status": "success", "data": loop_monitor.snapshot(limit)}
+
+
+@router.get("/indexes")
+async def index_status(current_user: dict = Depends(get_current_admin_user)):
+    """Registered indexes vs live indexes: missing, unregistered and unused ones"""
+    return {"status": "success", "data": await index_manager.report(get_database())}
+
+
+@router.post("/indexes/ensure")
+async def ensure_indexes(current_user: dict = Depends(get_current_admin_user)):
+    """Create any registered index that is missing (idempotent)"""
+    return {"status": "success", "data": await index_manager.ensure(get_database())}
+
+
+@router.get("/export/analyses")
+async def export_analyses(
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    plant_part: Optional[str] = Query(None),
+    disease: Optional[str] = Query(None),
+    min_confidence: Optional[float] = Query(None, ge=0, le=1),
+    max_confidence: Optional[float] = Query(None, ge=0, le=1),
+    cursor: Optional[str] = Query(None, description="Resume after the row with this `cursor` value"),
+    include_cursor: bool = Query(True, description="Add a `cursor` column for resuming"),
+    limit: Optional[int] = Query(None, ge=1),
+    current_user: dict = Depends(get_current_admin_user),
+):
+    """
+    Stream analyses as NDJSON, CSV or Parquet (oldest first, chunked).
+
+    Memory use is independent of the export size. To resume an
+    interrupted download, pass the `cursor` of the last complete row.
+    """
+    filters = AnalysisExportFilters(
+        date_from=date_from, date_to=date_to, plant_part=plant_part, disease=disease,
+        min_confidence=min_confidence, max_confidence=max_confidence, cursor=cursor,
+    )
+    try:
+        chunks = AnalysisExporter(get_database()).stream(format, filters, include_cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+
+    filename = f"analyses-{datetime.utcnow():%Y%m%dT%H%M%S}.{format}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,22 +1,43 @@
-from typing import List
+from typing import List, Optional
 from uuid import uuid4
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Response
 from fastapi.responses import JSONResponse
 from datetime import datetime
 
+from app.config import get_settings
 from app.schemas.analysis import ImageUrlRequest
 from app.services.ml_service import ml_service
 from app.services.analysis_service import AnalysisService
+from app.services.storage_service import storage_service
+from app.services.upload_outbox import upload_outbox
+from app.utils.pagination import KEYSET_SORT, keyset_filter, next_cursor
 from app.utils.queue import process_ml_prediction, get_queue_status
+from app.utils.tracing import span
 from app.dependencies.auth import get_current_active_user
 from app.models.analysis_model import (
     AnalysisCreate, 
     AnalysisResponse, 
-    AnalysisSummary
+    AnalysisSummary,
+    UserAnalysisStats
 )
 
 router = APIRouter()
+settings = get_settings()
+
+
+def _should_defer_upload(contents: bytes) -> bool:
+    """Deferred uploads return the diagnosis before the image is stored"""
+    return settings.deferred_uploads and upload_outbox.accepts(contents)
+
+
+async def _store_deferred_image(result: dict, contents: bytes) -> None:
+    """
+    Upload a deferred image now: its record was not saved, so no outbox
+    entry will ever upload it. Raises if storage fails too.
+    """
+    with span("storage.upload", bytes=len(contents), fallback=True):
+        result["upload_info"] = await storage_service.upload_image(contents)
 
 @router.post("/api/analyze/image")
 async def analyze_image_from_url(data: ImageUrlRequest, current_user: dict = Depends(get_current_active_user)):
@@ -52,7 +73,8 @@ async def analyze_image_from_url(data: ImageUrlRequest, current_user: dict = Dep
                 "analysis": result,
                 "image_url": data.url,
                 "analysis_id": saved_analysis.id,
-                "saved_to_db": True
+                "saved_to_db": True,
+                "write_status": saved_analysis.write_status
             }
         except Exception as db_error:
             # Log database error but don't fail the analysis
@@ -74,11 +96,19 @@ async def analyze_image_from_url(data: ImageUrlRequest, current_user: dict = Dep
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/api/analyze/upload")
-async def analyze_uploaded_image(file: UploadFile = File(...), current_user: dict = Depends(get_current_active_user)):
+async def analyze_uploaded_image(
+    file: UploadFile = File(...),
+    multi_object: bool = Query(False, description="Detect and classify every leaf/fruit/stem in the photo"),
+    current_user: dict = Depends(get_current_active_user)
+):
     request_id = str(uuid4())
     try:
-        contents = await file.read()
-        result = await process_ml_prediction(request_id, contents)
+        with span("upload.read"):
+            contents = await file.read()
+        defer_upload = _should_defer_upload(contents)
+        result = await process_ml_prediction(
+            request_id, contents, multi_object=multi_object, defer_upload=defer_upload
+        )
         result["analyzed_by"] = current_user["id"]
         
         # Save to database
@@ -89,7 +119,7 @@ async def analyze_uploaded_image(file: UploadFile = File(...), current_user: dic
             analysis_service = AnalysisService(db)
             
             # Extract image URL and Cloudinary ID from result
-            image_url = result.get("upload_info", {}).get("secure_url", "")
+            image_url = result.get("upload_info", {}).get("url", "")
             cloudinary_id = result.get("upload_info", {}).get("public_id", "")
             
             # Create analysis record
@@ -100,12 +130,16 @@ async def analyze_uploaded_image(file: UploadFile = File(...), current_user: dic
                 analysis_result=result
             )
             
-            saved_analysis = await analysis_service.save_analysis(analysis_create)
+            saved_analysis = await analysis_service.save_analysis(
+                analysis_create, pending_upload=contents if defer_upload else None
+            )
             
             return {
                 **result,
                 "analysis_id": saved_analysis.id,
-                "saved_to_db": True
+                "image_status": saved_analysis.image_status,
+                "saved_to_db": True,
+                "write_status": saved_analysis.write_status
             }
         except Exception as db_error:
             # Log database error but don't fail the analysis
@@ -113,12 +147,24 @@ async def analyze_uploaded_image(file: UploadFile = File(...), current_user: dic
             logger = logging.getLogger(__name__)
             logger.error(f"Failed to save analysis to database: {db_error}")
             
+            if defer_upload:
+                try:
+                    await _store_deferred_image(result, contents)
+                except Exception as upload_error:
+                    logger.error(f"Failed to store image after database error: {upload_error}")
+                    raise HTTPException(
+                        status_code=503,
+                        detail="Analysis could not be saved and the image could not be stored",
+                    )
+            
             return {
                 **result,
                 "saved_to_db": False,
                 "db_error": str(db_error)
             }
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -140,18 +186,21 @@ async def analyze_multiple_images(files: List[UploadFile] = File(...), current_u
     for file in files:
         request_id = str(uuid4())
         try:
-            contents = await file.read()
-            result = await process_ml_prediction(request_id, contents)
+            with span("upload.read", filename=file.filename):
+                contents = await file.read()
+            defer_upload = _should_defer_upload(contents)
+            result = await process_ml_prediction(request_id, contents, defer_upload=defer_upload)
             result["analyzed_by"] = current_user["id"]
             
             # Save to database
             saved_to_db = False
             analysis_id = None
+            write_status = None
             
             if analysis_service:
                 try:
                     # Extract image URL and Cloudinary ID from result
-                    image_url = result.get("upload_info", {}).get("secure_url", "")
+                    image_url = result.get("upload_info", {}).get("url", "")
                     cloudinary_id = result.get("upload_info", {}).get("public_id", "")
                     
                     # Create analysis record
@@ -162,15 +211,22 @@ async def analyze_multiple_images(files: List[UploadFile] = File(...), current_u
                         analysis_result=result
                     )
                     
-                    saved_analysis = await analysis_service.save_analysis(analysis_create)
+                    saved_analysis = await analysis_service.save_analysis(
+                        analysis_create, pending_upload=contents if defer_upload else None
+                    )
                     saved_to_db = True
                     analysis_id = saved_analysis.id
+                    write_status = saved_analysis.write_status
                     
                 except Exception as db_error:
                     import logging
                     logger = logging.getLogger(__name__)
                     logger.error(f"Failed to save batch analysis to database: {db_error}")
             
+            if defer_upload and not saved_to_db:
+                # Not stored and not in the outbox: upload it now (raises into the per-file error)
+                await _store_deferred_image(result, contents)
+            
             results.append({
                 "filename": file.filename,
                 "upload_info": result.get("upload_info"),
@@ -178,7 +234,8 @@ async def analyze_multiple_images(files: List[UploadFile] = File(...), current_u
                 "request_id": request_id,
                 "analyzed_by": current_user["id"],
                 "saved_to_db": saved_to_db,
-                "analysis_id": analysis_id
+                "analysis_id": analysis_id,
+                "write_status": write_status
             })
         except Exception as e:
             results.append({
@@ -206,11 +263,19 @@ async def queue_status():
 
 @router.get("/api/analysis/history")
 async def get_analysis_history(
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
     current_user: dict = Depends(get_current_active_user)
 ):
-    """Get user's analysis history (simple)"""
+    """
+    Get user's analysis history (simple).
+
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the
+    next page; unlike `offset`, that costs the same at any depth. The
+    header is absent on the last page.
+    """
     import logging
     logger = logging.getLogger(__name__)
     
@@ -221,36 +286,25 @@ async def get_analysis_history(
         user_id = current_user["id"]
         logger.info(f"Fetching analysis history for user: {user_id}")
         
-        # Use aggregation pipeline with projection BEFORE sort to reduce memory
-        # This is required for MongoDB Atlas free tier which doesn't support allowDiskUse
-        pipeline = [
-            {"$match": {"user_id": user_id}},
-            # Project only needed fields BEFORE sorting to reduce memory usage
-            {"$project": {
-                "_id": 1,
-                "image_url": 1,
-                "created_at": 1,
-                "is_favorite": 1,
-                # Handle both storage formats for disease detection
-                "disease": {
-                    "$ifNull": [
-                        "$analysis_result.analysis.disease_detection.disease",
-                        {"$ifNull": ["$analysis_result.disease_detection.disease", "Unknown"]}
-                    ]
-                },
-                "confidence": {
-                    "$ifNull": [
-                        "$analysis_result.analysis.disease_detection.confidence",
-                        {"$ifNull": ["$analysis_result.disease_detection.confidence", 0]}
-                    ]
-                }
-            }},
-            {"$sort": {"created_at": -1}},
-            {"$skip": offset},
-            {"$limit": limit}
-        ]
-        
-        analyses = await db.analyses.aggregate(pipeline).to_list(length=limit)
+        try:
+            query = {"user_id": user_id, **keyset_filter(cursor)}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # The (user_id, created_at, _id) index serves both the filter and the
+        # sort, so no in-memory sort is needed (Atlas free tier has no
+        # allowDiskUse); only the canonical summary fields are fetched
+        find = db.analyses.find(
+            query,
+            {"image_url": 1, "created_at": 1, "is_favorite": 1, "disease": 1, "confidence": 1},
+        ).sort(KEYSET_SORT)
+        if offset and not cursor:
+            find = find.skip(offset)
+        analyses = await find.limit(limit).to_list(length=limit)
+
+        token = next_cursor(analyses, limit)
+        if token:
+            response.headers["X-Next-Cursor"] = token
         
         logger.info(f"Found {len(analyses)} analyses for user {user_id}")
         
@@ -265,45 +319,63 @@ async def get_analysis_history(
             result.append({
                 "id": str(analysis["_id"]),
                 "image_url": analysis.get("image_url", ""),
-                "disease": analysis.get("disease", "Unknown"),
-                "confidence": analysis.get("confidence", 0),
+                "disease": analysis.get("disease") or "Unknown",
+                "confidence": analysis.get("confidence") or 0,
                 "created_at": created_at,
                 "is_favorite": analysis.get("is_favorite", False)
             })
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         logger.error(f"Error fetching analysis history: {e}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/api/analysis/statistics", response_model=UserAnalysisStats)
+async def get_analysis_statistics(
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get the user's analysis statistics (profile view)"""
+    try:
+        from app.services.database import get_database
+        
+        analysis_service = AnalysisService(get_database())
+        return await analysis_service.get_user_statistics(current_user["id"])
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/api/analysis/{analysis_id}")
 async def get_analysis_by_id(
     analysis_id: str,
+    view: str = Query("full", description="summary | detail (no images or probability vectors) | full"),
+    fields: Optional[str] = Query(None, description="Comma-separated field paths; overrides view"),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get a specific analysis by ID"""
     try:
         from app.services.database import get_database
-        from bson import ObjectId
         
-        db = get_database()
+        analysis_service = AnalysisService(get_database())
         
-        # Find analysis for this user
-        analysis = await db.analyses.find_one({
-            "_id": ObjectId(analysis_id),
-            "user_id": current_user["id"]
-        })
+        # Only the fields of the requested view are fetched from MongoDB
+        try:
+            analysis = await analysis_service.get_analysis_document(
+                analysis_id,
+                current_user["id"],
+                view=view,
+                fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         if not analysis:
             raise HTTPException(status_code=404, detail="Analysis not found")
         
-        # Convert ObjectId to string
-        analysis["id"] = str(analysis["_id"])
-        del analysis["_id"]
-        
         return analysis
         
     except HTTPException:
@@ -319,16 +391,14 @@ async def delete_analysis(
     """Delete an analysis"""
     try:
         from app.services.database import get_database
-        from bson import ObjectId
         
         db = get_database()
+        analysis_service = AnalysisService(db)
         
-        result = await db.analyses.delete_one({
-            "_id": ObjectId(analysis_id),
-            "user_id": current_user["id"]
-        })
+        # Goes through the service so analytics rollups are kept in step
+        deleted = await analysis_service.delete_analysis(analysis_id, current_user["id"])
         
-        if result.deleted_count == 0:
+        if not deleted:
             raise HTTPException(status_code=404, detail="Analysis not found")
         
         return {"message": "Analysis deleted successfully"}
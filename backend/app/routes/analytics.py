@@ -1,7 +1,9 @@
 """
 Analytics API routes – ML-focused analytics for Admin Dashboard.
 """
-from fastapi import APIRouter, Depends, Query
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from app.dependencies.auth import get_current_admin_user, get_current_active_user
 from app.services.database import get_database
 from app.services.analytics_service import AnalyticsService
@@ -92,11 +94,16 @@ async def recent_analyses(
 async def analysis_history(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=5, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     current_user: dict = Depends(get_current_admin_user),
 ):
     """Paginated analysis history."""
     svc = _get_service()
-    return {"status": "success", "data": await svc.get_analysis_history(page=page, page_size=page_size)}
+    try:
+        data = await svc.get_analysis_history(page=page, page_size=page_size, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "data": data}
 
 
 @router.get("/analysis-detail/{analysis_id}")
@@ -9,13 +9,11 @@ from app.schemas.user import UserCreate, UserLogin, UserRead
 from app.schemas.token import TokenResponse, TokenRefresh
 from app.services.user_service import user_service
 from app.services.auth_service import auth_service
+from app.services.token_revocation import TokenRevoked, refresh_token_store
 from app.dependencies.auth import get_current_user, get_current_active_user
 
 router = APIRouter(prefix="/api/v1/auth", tags=["authentication"])
 
-# In-memory blacklist for refresh tokens (in production, use Redis or database)
-refresh_token_blacklist = set()
-
 @router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
 async def register(user_create: UserCreate):
     """
@@ -66,7 +64,9 @@ async def login(login_data: UserLogin):
         )
     
     # Create tokens
-    tokens = auth_service.create_tokens(str(user.id), user.email, user.role)
+    tokens = auth_service.create_tokens(
+        str(user.id), user.email, user.role, **auth_service.profile_claims(user)
+    )
     
     # Add expiration time (in seconds)
     from app.config import get_settings
@@ -158,7 +158,9 @@ async def firebase_login(request: FirebaseLoginRequest):
             )
         
         # Create our own JWT tokens (same as regular login)
-        tokens = auth_service.create_tokens(str(user.id), user.email, user.role)
+        tokens = auth_service.create_tokens(
+            str(user.id), user.email, user.role, **auth_service.profile_claims(user)
+        )
         
         settings = get_settings()
         expires_in = settings.access_token_expire_minutes * 60
@@ -277,17 +279,10 @@ async def refresh_token(refresh_data: TokenRefresh):
         New access and refresh tokens
         
     Raises:
-        HTTPException: If refresh token is invalid or blacklisted
+        HTTPException: If refresh token is invalid or revoked
     """
     refresh_token = refresh_data.refresh_token
     
-    # Check if token is blacklisted
-    if refresh_token in refresh_token_blacklist:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Refresh token is invalid",
-        )
-    
     try:
         # Verify refresh token
         payload = auth_service.verify_token(refresh_token, token_type="refresh")
@@ -300,6 +295,9 @@ async def refresh_token(refresh_data: TokenRefresh):
                 detail="Invalid refresh token",
             )
         
+        # Check if token was revoked (logout, logout-all or already exchanged)
+        await refresh_token_store.check(payload, refresh_token)
+        
         # Get user to check if still active
         user = await user_service.get_user_by_id(user_id)
         if not user or not user.is_active:
@@ -308,11 +306,13 @@ async def refresh_token(refresh_data: TokenRefresh):
                 detail="User not found or inactive",
             )
         
-        # Create new tokens
-        tokens = auth_service.create_tokens(user_id, email, user.role)
+        # Rotate: the old refresh token cannot be used again
+        await refresh_token_store.rotate(payload, refresh_token)
         
-        # Blacklist the old refresh token (optional)
-        refresh_token_blacklist.add(refresh_token)
+        # Create new tokens in the same family
+        tokens = auth_service.create_tokens(
+            user_id, email, user.role, family=payload.get("fam"), **auth_service.profile_claims(user)
+        )
         
         # Add expiration time
         from app.config import get_settings
@@ -328,6 +328,11 @@ async def refresh_token(refresh_data: TokenRefresh):
         
     except HTTPException:
         raise
+    except TokenRevoked:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token is invalid",
+        )
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -340,17 +345,23 @@ async def logout(
     current_user: Dict = Depends(get_current_user)
 ):
     """
-    Logout user by blacklisting refresh token (optional)
+    Logout user by revoking the refresh token's session (optional)
     
     Args:
-        token_refresh: Refresh token to blacklist (optional)
+        token_refresh: Refresh token to revoke (optional); every token
+            rotated from the same sign-in is revoked with it
         current_user: Current authenticated user
         
     Returns:
         Success message
     """
     if token_refresh and token_refresh.refresh_token:
-        refresh_token_blacklist.add(token_refresh.refresh_token)
+        try:
+            payload = auth_service.verify_token(token_refresh.refresh_token, token_type="refresh")
+        except HTTPException:
+            payload = None  # Expired or invalid: nothing left to revoke
+        if payload is not None and payload.get("user_id") == current_user.get("id"):
+            await refresh_token_store.revoke(payload, token_refresh.refresh_token)
     
     return JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -361,22 +372,18 @@ async def logout(
 async def logout_all(current_user: Dict = Depends(get_current_active_user)):
     """
     Logout user from all devices (by user ID)
-    Note: In production, you'd want to track refresh tokens per user
+    
+    Revokes every refresh token issued to the user so far. Access tokens
+    already issued stay valid until they expire.
     
     Returns:
         Success message
     """
-    # In a production system, you would:
-    # 1. Store refresh tokens in a database with user_id
-    # 2. Invalidate all refresh tokens for this user_id
-    # 3. Or use a Redis blacklist with expiration
+    await refresh_token_store.revoke_user(current_user["id"])
     
     return JSONResponse(
         status_code=status.HTTP_200_OK,
-        content={
-            "message": "Logged out from all devices",
-            "note": "In production, this would invalidate all refresh tokens"
-        }
+        content={"message": "Logged out from all devices"}
     )
 
 
@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form
 from typing import List, Optional
 from datetime import datetime
@@ -6,14 +7,11 @@ from bson import ObjectId
 from app.dependencies.auth import get_current_user, get_current_admin_user  
 from app.models.forum_model import PostCreate
 from app.services.forum_service import ForumService
-from app.services.cloudinary_service import CloudinaryService
+from app.services.storage_service import storage_service
 from app.services.notification_service import NotificationService
 
 router = APIRouter(prefix="/api/v1/forum", tags=["forum"])
 
-# Create instances
-cloudinary_service = CloudinaryService()
-
 # Dependency for ForumService
 def get_forum_service():
     return ForumService()
@@ -77,24 +75,23 @@ async def create_post(
     """
     print(f"📸 Creating post with {len(images)} images")
     
-    # Upload images to Cloudinary if provided
+    # Upload images to storage concurrently if provided
+    file_contents = [await image.read() for image in images]
+    upload_results = await asyncio.gather(
+        *(storage_service.upload_image(content) for content in file_contents),
+        return_exceptions=True,
+    )
+
     image_urls = []
-    for i, image in enumerate(images):
-        try:
-            print(f"📤 Processing image {i+1}: {image.filename}")
-            file_content = await image.read()
-            print(f"📊 File size: {len(file_content)} bytes")
-            
-            upload_result = cloudinary_service.upload_image(file_content)
-            image_url = upload_result["url"] if isinstance(upload_result, dict) else upload_result
-            image_urls.append(image_url)
-            print(f"✅ Uploaded to Cloudinary: {image_url}")
-        except Exception as e:
-            print(f"❌ Upload failed for image {i+1}: {str(e)}")
+    for i, (image, upload_result) in enumerate(zip(images, upload_results)):
+        if isinstance(upload_result, Exception):
+            print(f"❌ Upload failed for image {i+1}: {str(upload_result)}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Failed to upload image {image.filename}: {str(e)}"
+                detail=f"Failed to upload image {image.filename}: {str(upload_result)}"
             )
+        image_urls.append(upload_result["url"])
+        print(f"✅ Uploaded to storage: {upload_result['url']} ({len(file_contents[i])} bytes)")
     
     # Create post data
     post_dict = {
@@ -315,14 +312,13 @@ async def upload_post_images(
             detail="Not authorized to update this post"
         )
     
-    # Upload all images to Cloudinary
-    image_urls = []
+    # Upload all images to storage concurrently
     try:
-        for image in images:
-            file_content = await image.read()
-            upload_result = cloudinary_service.upload_image(file_content)
-            image_url = upload_result["url"] if isinstance(upload_result, dict) else upload_result
-            image_urls.append(image_url)
+        file_contents = [await image.read() for image in images]
+        upload_results = await asyncio.gather(
+            *(storage_service.upload_image(content) for content in file_contents)
+        )
+        image_urls = [upload_result["url"] for upload_result in upload_results]
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
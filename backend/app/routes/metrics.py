@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.utils.queue import ml_queue
+from app.utils.telemetry import telemetry
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    body = telemetry.render_prometheus(extra_gauges={"ml_queued": ml_queue.qsize()})
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
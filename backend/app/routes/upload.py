@@ -1,11 +1,27 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from typing import Optional
+
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Header
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from app.services.cloudinary_service import cloudinary_service
+from app.services.storage_service import storage_service, LocalStorageBackend
 from app.dependencies.auth import get_current_active_user
 
 router = APIRouter()
 
+# Chunk size used when streaming stored objects
+STREAM_CHUNK_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "gif": "image/gif",
+    "bmp": "image/bmp",
+    "tiff": "image/tiff",
+}
+
+
 @router.get("/api/config/cloudinary")
 async def get_cloudinary_config():
     config = cloudinary_service.get_upload_config()
@@ -18,18 +34,18 @@ async def upload_image(
     current_user: dict = Depends(get_current_active_user)
 ):
     """
-    Upload an image to Cloudinary (for profile pictures, etc.)
+    Upload an image to the configured storage backend (for profile pictures, etc.)
     """
     # Validate file type
     if not file.content_type or not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image")
-    
+
     # Read file content
     contents = await file.read()
-    
-    # Upload to Cloudinary
+
+    # Upload to storage
     try:
-        result = cloudinary_service.upload_image(contents)
+        result = await storage_service.upload_image(contents)
         return {
             "url": result["url"],
             "public_id": result["public_id"],
@@ -38,4 +54,85 @@ async def upload_image(
             "height": result.get("height")
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+
+def _parse_range(range_header: str, size: int) -> Optional[tuple]:
+    """
+    Parse a single 'bytes=' range into an inclusive (start, end) tuple.
+    Returns None when the header is not satisfiable.
+    """
+    if not range_header.startswith("bytes=") or "," in range_header:
+        return None
+    start_str, _, end_str = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if start_str == "":
+            # Suffix range: last N bytes
+            length = int(end_str)
+            if length <= 0:
+                return None
+            return max(0, size - length), size - 1
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _iter_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@router.get("/api/v1/storage/{object_name}")
+async def get_stored_object(object_name: str, range: Optional[str] = Header(None)):
+    """
+    Serve an object from the local content-addressed store.
+    Supports single byte-range requests (HTTP 206).
+    """
+    if not isinstance(storage_service, LocalStorageBackend):
+        raise HTTPException(status_code=404, detail="Local storage is not enabled")
+
+    found = storage_service.stat(object_name)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Object not found")
+    path, size = found
+
+    extension = object_name.rsplit(".", 1)[-1]
+    headers = {
+        "Accept-Ranges": "bytes",
+        # Content-addressed objects never change
+        "ETag": f'"{object_name.split(".")[0]}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    media_type = CONTENT_TYPES.get(extension, "application/octet-stream")
+
+    if range:
+        byte_range = _parse_range(range, size)
+        if byte_range is None:
+            return Response(
+                status_code=416,
+                headers={**headers, "Content-Range": f"bytes */{size}"},
+            )
+        start, end = byte_range
+        length = end - start + 1
+        headers.update({
+            "Content-Range": f"bytes {start}-{end}/{size}",
+            "Content-Length": str(length),
+        })
+        return StreamingResponse(
+            _iter_file(path, start, length), status_code=206,
+            media_type=media_type, headers=headers,
+        )
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(_iter_file(path, 0, size), media_type=media_type, headers=headers)
@@ -1,12 +1,22 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
+from pymongo import ReturnDocument
+import asyncio
 import logging
+import re
+import time
 
+from app.services.analytics_rollups import ROLLUP_SOURCE_FIELDS, AnalyticsRollupService
+from app.services.user_stats import USER_STATS_SOURCE_FIELDS, UserStatsService, stats_summary
+from app.services.write_behind import analysis_write_buffer
+from app.utils.pagination import KEYSET_SORT, keyset_filter, next_cursor
+from app.utils.telemetry import telemetry
+from app.utils.tracing import traced
 from app.models.analysis_model import (
-    AnalysisRecord, 
     AnalysisCreate, 
+    AnalysisMetadata,
     AnalysisResponse,
     AnalysisSearchFilters,
     AnalysisSummary,
@@ -15,6 +25,89 @@ from app.models.analysis_model import (
 
 logger = logging.getLogger(__name__)
 
+# Version of the analysis document layout; bumped when canonical fields change
+ANALYSIS_SCHEMA_VERSION = 2
+
+# ML output lives under analysis_result.analysis.* or analysis_result.* (see canonical_fields)
+_ML_ROOTS = ("analysis_result.analysis", "analysis_result")
+
+# Bulky parts of the ML output: base64 images and raw probability vectors
+HEAVY_ANALYSIS_FIELDS = [
+    f"{root}.{path}"
+    for root in _ML_ROOTS
+    for path in (
+        "spot_detection.annotated_image",
+        "spot_detection.original_image",
+        "annotated_image",
+        "disease_detection.all_predictions",
+        "part_detection.all_predictions",
+        "regions.disease_detection.all_predictions",
+        "regions.part_detection.all_predictions",
+    )
+]
+
+# Projections for the read views of an analysis (None = whole document)
+ANALYSIS_VIEWS: Dict[str, Optional[Dict[str, int]]] = {
+    # What list screens render: the canonical summary fields
+    "summary": {
+        "user_id": 1, "image_url": 1, "created_at": 1, "is_favorite": 1, "disease": 1,
+        "confidence": 1, "plant_part": 1, "severity": 1, "notes": 1, "tags": 1,
+    },
+    # What the detail screen renders: everything but the images and probability vectors
+    "detail": {field: 0 for field in HEAVY_ANALYSIS_FIELDS},
+    "full": None,
+}
+
+_FIELD_PATH = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+
+def analysis_projection(view: str = "full", fields: Optional[List[str]] = None) -> Optional[Dict[str, int]]:
+    """
+    Mongo projection for a read view, or for an explicit list of (dotted)
+    fields, which takes precedence. Raises ValueError for an unknown view,
+    a malformed field path or overlapping paths (MongoDB rejects a
+    projection of both `a` and `a.b`).
+    """
+    if fields:
+        bad = [f for f in fields if not _FIELD_PATH.match(f)]
+        if bad:
+            raise ValueError(f"Invalid field path(s): {', '.join(bad)}")
+        nested = sorted({f for f in fields if any(f.startswith(g + ".") for g in fields)})
+        if nested:
+            raise ValueError(f"Field path(s) overlap a parent also requested: {', '.join(nested)}")
+        return {field: 1 for field in fields}
+    if view not in ANALYSIS_VIEWS:
+        raise ValueError(f"Unknown view '{view}' (expected one of {', '.join(ANALYSIS_VIEWS)})")
+    return ANALYSIS_VIEWS[view]
+
+
+def canonical_fields(analysis_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Top-level, indexable summary fields for an analysis document.
+
+    The upload routes store the ML output under analysis_result.analysis.*
+    while the URL route stores it under analysis_result.*; this reads
+    either so queries never have to.
+    """
+    ml_result = analysis_result.get('analysis')
+    if not isinstance(ml_result, dict):
+        ml_result = analysis_result
+
+    disease_detection = ml_result.get('disease_detection') or {}
+    part_detection = ml_result.get('part_detection') or {}
+    severity = (ml_result.get('spot_detection') or {}).get('severity') or {}
+
+    confidence = disease_detection.get('confidence')
+    part = part_detection.get('part')
+    return {
+        'disease': disease_detection.get('disease'),
+        'confidence': float(confidence) if confidence is not None else None,
+        'plant_part': part.lower() if isinstance(part, str) else None,
+        'severity': severity.get('level'),
+        'schema_version': ANALYSIS_SCHEMA_VERSION,
+    }
+
+
 class AnalysisService:
     """Service for managing analysis records in MongoDB"""
     
@@ -24,91 +117,135 @@ class AnalysisService:
         self.users_collection = database.users
     
     async def create_indexes(self):
-        """Create database indexes for performance"""
-        try:
-            # User-based indexes
-            await self.analyses_collection.create_index([("user_id", 1)])
-            await self.analyses_collection.create_index([("user_id", 1), ("created_at", -1)])
-            await self.analyses_collection.create_index([("user_id", 1), ("is_favorite", -1)])
-            
-            # Search indexes
-            await self.analyses_collection.create_index([("analysis_result.disease_detection.disease", 1)])
-            await self.analyses_collection.create_index([("analysis_result.part_detection.part", 1)])
-            await self.analyses_collection.create_index([("tags", 1)])
-            
-            # Text search index
-            await self.analyses_collection.create_index([
-                ("notes", "text"),
-                ("tags", "text"),
-                ("analysis_result.disease_detection.disease", "text"),
-                ("analysis_result.part_detection.part", "text")
-            ])
-            
-            logger.info("✅ Analysis database indexes created successfully")
-        except Exception as e:
-            logger.error(f"❌ Failed to create indexes: {e}")
+        """Ensure the registered analysis indexes (see app/services/indexes.py)"""
+        from app.services.indexes import index_manager
+        await index_manager.ensure(self.db, collections=["analyses"])
     
-    async def save_analysis(self, analysis_data: AnalysisCreate) -> AnalysisResponse:
-        """Save a new analysis record to the database"""
+    @traced("db.save_analysis")
+    async def save_analysis(
+        self, analysis_data: AnalysisCreate, pending_upload: Optional[bytes] = None
+    ) -> AnalysisResponse:
+        """
+        Save a new analysis record to the database.
+
+        When pending_upload is given the image has not been stored yet: the
+        record is saved with image_status="pending" together with an upload
+        outbox entry, and the outbox worker fills in image_url later.
+        """
         try:
-            # Create analysis record
-            analysis_record = AnalysisRecord(**analysis_data.dict())
-            
-            # Extract metadata from analysis result if available
-            if 'model_info' in analysis_data.analysis_result:
-                metadata_dict = {
-                    'processing_time': analysis_data.analysis_result.get('performance', {}).get('total_processing_time'),
-                    'model_version': analysis_data.analysis_result.get('model_info', {}).get('analysis_timestamp'),
-                    'preprocessing_method': analysis_data.analysis_result.get('model_info', {}).get('preprocessing_method'),
-                    'bounding_boxes_enabled': analysis_data.analysis_result.get('model_info', {}).get('bounding_boxes_enabled')
-                }
-                analysis_record.metadata = metadata_dict
-            
-            # Convert to dict for MongoDB
-            analysis_dict = analysis_record.dict()
-            analysis_dict.pop('id', None)  # Remove id field, MongoDB will generate
-            
-            # Insert into database
-            result = await self.analyses_collection.insert_one(analysis_dict)
-            
-            # Get the inserted record
-            created_analysis = await self.analyses_collection.find_one({"_id": result.inserted_id})
-            
-            if created_analysis:
-                # Convert _id to id for Pydantic model
-                created_analysis["id"] = str(created_analysis["_id"])
-                del created_analysis["_id"]
-                
-                logger.info(f"✅ Analysis saved for user {analysis_data.user_id}")
-                return AnalysisResponse(**created_analysis)
+            analysis_dict = self.build_analysis_document(analysis_data)
+
+            # Insert into database (insert_one / the outbox / the buffer set _id in place)
+            save_start = time.perf_counter()
+            write_status = "saved"
+            if pending_upload is not None:
+                # Needs the transaction with its outbox entry, so never batched
+                from app.services.upload_outbox import upload_outbox
+                await upload_outbox.insert_with_record(
+                    self.db, self.analyses_collection, analysis_dict, pending_upload
+                )
+            elif analysis_write_buffer.enabled:
+                write_status = await analysis_write_buffer.submit(analysis_dict)
             else:
-                raise Exception("Failed to retrieve created analysis")
-                
+                await self.analyses_collection.insert_one(analysis_dict)
+            telemetry.observe("db_save", time.perf_counter() - save_start)
+
+            # Spooled records are counted when they are replayed into MongoDB
+            if write_status == "saved":
+                await asyncio.gather(
+                    AnalyticsRollupService(self.db).record(analysis_dict),
+                    UserStatsService(self.db).record(analysis_dict),
+                )
+
+            logger.info(f"✅ Analysis {write_status} for user {analysis_data.user_id}")
+            response = self.response_from_document(analysis_dict)
+            response.write_status = write_status
+            return response
+
         except Exception as e:
             logger.error(f"❌ Failed to save analysis: {e}")
             raise
+
+    @staticmethod
+    def build_analysis_document(analysis_data: AnalysisCreate) -> Dict[str, Any]:
+        """
+        Build the MongoDB document for a new analysis.
+
+        AnalysisCreate has already run the profanity validators, so the
+        document is assembled directly instead of going through
+        AnalysisRecord and back to a dict (which copies analysis_result
+        twice and filters notes/tags a second time).
+        """
+        result = analysis_data.analysis_result
+        if 'model_info' in result:
+            model_info = result.get('model_info', {})
+            metadata = {
+                'processing_time': result.get('performance', {}).get('total_processing_time'),
+                'model_version': model_info.get('analysis_timestamp'),
+                'preprocessing_method': model_info.get('preprocessing_method'),
+                'bounding_boxes_enabled': model_info.get('bounding_boxes_enabled')
+            }
+        elif analysis_data.metadata is not None:
+            metadata = analysis_data.metadata.dict()
+        else:
+            metadata = None
+
+        # BSON dates have millisecond precision; truncate so the response
+        # matches what a later read of the document returns
+        now = datetime.utcnow()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        return {
+            'user_id': analysis_data.user_id,
+            'image_url': analysis_data.image_url,
+            'cloudinary_public_id': analysis_data.cloudinary_public_id,
+            'analysis_result': result,
+            'created_at': now,
+            'updated_at': now,
+            'is_favorite': False,
+            'notes': analysis_data.notes,
+            'tags': list(analysis_data.tags),
+            'metadata': metadata,
+            'image_status': None,
+            **canonical_fields(result),
+        }
+
+    @staticmethod
+    def response_from_document(document: Dict[str, Any]) -> AnalysisResponse:
+        """Wrap a document we just wrote without re-reading or re-validating it"""
+        fields = {k: v for k, v in document.items() if k != '_id'}
+        metadata = fields.get('metadata')
+        if isinstance(metadata, dict):
+            fields['metadata'] = AnalysisMetadata.model_construct(**metadata)
+        return AnalysisResponse.model_construct(id=str(document['_id']), **fields)
     
-    async def get_user_analyses(self, user_id: str, filters: AnalysisSearchFilters) -> List[AnalysisSummary]:
-        """Get user's analyses with filtering and pagination"""
+    async def get_user_analyses(
+        self, user_id: str, filters: AnalysisSearchFilters
+    ) -> Tuple[List[AnalysisSummary], Optional[str]]:
+        """
+        Get user's analyses with filtering and pagination.
+
+        Newest first. Returns the page and the continuation token to pass as
+        filters.cursor for the next one (None on the last page).
+        """
         try:
             # Build query
             query = {"user_id": user_id}
             
             # Apply filters
             if filters.disease:
-                query["analysis_result.disease_detection.disease"] = filters.disease
+                query["disease"] = filters.disease
             
             if filters.plant_part:
-                query["analysis_result.part_detection.part"] = filters.plant_part
+                query["plant_part"] = filters.plant_part.lower()
             
             if filters.is_favorite is not None:
                 query["is_favorite"] = filters.is_favorite
             
             if filters.has_disease is not None:
                 if filters.has_disease:
-                    query["analysis_result.disease_detection.disease"] = {"$ne": "Healthy"}
+                    query["disease"] = {"$ne": "Healthy"}
                 else:
-                    query["analysis_result.disease_detection.disease"] = "Healthy"
+                    query["disease"] = "Healthy"
             
             if filters.tags:
                 query["tags"] = {"$in": filters.tags}
@@ -124,22 +261,26 @@ class AnalysisService:
             
             # Severity filter
             if filters.severity:
-                query["analysis_result.spot_detection.severity.level"] = filters.severity
+                query["severity"] = filters.severity
+            
+            # Keyset position; offset is only honoured without a cursor
+            query.update(keyset_filter(filters.cursor))
+            skip = [] if filters.cursor or not filters.offset else [{"$skip": filters.offset}]
             
             # Build pipeline for summaries
             pipeline = [
                 {"$match": query},
-                {"$sort": {"created_at": -1}},
-                {"$skip": filters.offset},
+                {"$sort": dict(KEYSET_SORT)},
+                *skip,
                 {"$limit": filters.limit},
                 {
                     "$project": {
                         "id": {"$toString": "$_id"},
                         "image_url": 1,
-                        "disease": "$analysis_result.disease_detection.disease",
-                        "confidence": "$analysis_result.disease_detection.confidence",
-                        "plant_part": "$analysis_result.part_detection.part",
-                        "severity": "$analysis_result.spot_detection.severity.level",
+                        "disease": 1,
+                        "confidence": 1,
+                        "plant_part": 1,
+                        "severity": 1,
                         "created_at": 1,
                         "is_favorite": 1,
                         "notes": 1,
@@ -151,35 +292,52 @@ class AnalysisService:
             cursor = self.analyses_collection.aggregate(pipeline)
             analyses = await cursor.to_list(length=filters.limit)
             
-            return [AnalysisSummary(**analysis) for analysis in analyses]
+            token = next_cursor(analyses, filters.limit)
+            return [AnalysisSummary(**analysis) for analysis in analyses], token
             
         except Exception as e:
             logger.error(f"❌ Failed to get user analyses: {e}")
             raise
     
-    async def get_analysis_by_id(self, analysis_id: str, user_id: str) -> Optional[AnalysisResponse]:
-        """Get a specific analysis by ID (user-specific)"""
+    async def get_analysis_document(
+        self,
+        analysis_id: str,
+        user_id: str,
+        view: str = "full",
+        fields: Optional[List[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get a specific analysis (user-specific) as a plain dict with only
+        the fields of `view` / `fields` fetched from MongoDB (see
+        analysis_projection); `_id` is returned as `id`.
+        """
+        projection = analysis_projection(view, fields)
         try:
-            # Convert string ID to ObjectId
-            object_id = ObjectId(analysis_id)
-            
-            # Find analysis for this user
-            analysis = await self.analyses_collection.find_one({
-                "_id": object_id,
-                "user_id": user_id
-            })
-            
+            analysis = await self.analyses_collection.find_one(
+                {"_id": ObjectId(analysis_id), "user_id": user_id},
+                projection,
+            )
             if analysis:
-                # Convert _id to id for Pydantic model
-                analysis["id"] = str(analysis["_id"])
-                del analysis["_id"]
-                return AnalysisResponse(**analysis)
-            return None
+                analysis["id"] = str(analysis.pop("_id"))
+            return analysis
             
         except Exception as e:
             logger.error(f"❌ Failed to get analysis by ID: {e}")
             raise
     
+    async def get_analysis_by_id(self, analysis_id: str, user_id: str, view: str = "full") -> Optional[AnalysisResponse]:
+        """
+        Get a specific analysis by ID (user-specific).
+
+        view="detail" leaves the base64 images and probability vectors out
+        of analysis_result; "summary" lacks analysis_result altogether and
+        cannot be returned as an AnalysisResponse (use get_analysis_document).
+        """
+        if view == "summary":
+            raise ValueError("The summary view has no analysis_result; use get_analysis_document")
+        analysis = await self.get_analysis_document(analysis_id, user_id, view)
+        return AnalysisResponse(**analysis) if analysis else None
+    
     async def update_analysis(self, analysis_id: str, user_id: str, update_data: Dict[str, Any]) -> Optional[AnalysisResponse]:
         """Update an analysis record"""
         try:
@@ -218,12 +376,16 @@ class AnalysisService:
         try:
             object_id = ObjectId(analysis_id)
             
-            result = await self.analyses_collection.delete_one({
-                "_id": object_id,
-                "user_id": user_id
-            })
+            deleted = await self.analyses_collection.find_one_and_delete(
+                {"_id": object_id, "user_id": user_id},
+                projection={**ROLLUP_SOURCE_FIELDS, **USER_STATS_SOURCE_FIELDS},
+            )
             
-            if result.deleted_count > 0:
+            if deleted:
+                await asyncio.gather(
+                    AnalyticsRollupService(self.db).record(deleted, sign=-1),
+                    UserStatsService(self.db).record(deleted, sign=-1),
+                )
                 logger.info(f"✅ Analysis {analysis_id} deleted for user {user_id}")
                 return True
             
@@ -236,148 +398,44 @@ class AnalysisService:
     async def toggle_favorite(self, analysis_id: str, user_id: str) -> Optional[AnalysisResponse]:
         """Toggle favorite status of an analysis"""
         try:
-            # Get current analysis
-            analysis = await self.get_analysis_by_id(analysis_id, user_id)
+            # Get current status
+            analysis = await self.get_analysis_document(analysis_id, user_id, fields=["is_favorite"])
             if not analysis:
                 return None
             
             # Toggle favorite status
-            new_favorite_status = not analysis.is_favorite
-            
-            # Update
-            updated = await self.update_analysis(
-                analysis_id, 
-                user_id, 
-                {"is_favorite": new_favorite_status}
+            new_favorite_status = not analysis.get("is_favorite", False)
+            
+            # Only flip it if nobody else did meanwhile, so the favorites
+            # counter in user_stats moves exactly once per actual change
+            updated = await self.analyses_collection.find_one_and_update(
+                {"_id": ObjectId(analysis_id), "user_id": user_id,
+                 "is_favorite": {"$ne": new_favorite_status}},
+                {"$set": {"is_favorite": new_favorite_status, "updated_at": datetime.utcnow()}},
+                projection=ANALYSIS_VIEWS["detail"],
+                return_document=ReturnDocument.AFTER,
             )
+            if updated is None:
+                return await self.get_analysis_by_id(analysis_id, user_id, view="detail")
             
-            return updated
+            await UserStatsService(self.db).favorite_changed(user_id, 1 if new_favorite_status else -1)
+            updated["id"] = str(updated.pop("_id"))
+            return AnalysisResponse(**updated)
             
         except Exception as e:
             logger.error(f"❌ Failed to toggle favorite: {e}")
             raise
     
     async def get_user_statistics(self, user_id: str) -> UserAnalysisStats:
-        """Get comprehensive statistics for a user"""
+        """
+        Get comprehensive statistics for a user.
+
+        Served from the user's counters in user_stats (one _id lookup),
+        which save / delete / favorite keep up to date.
+        """
         try:
-            # Total analyses
-            total_analyses = await self.analyses_collection.count_documents({"user_id": user_id})
-            
-            # Disease frequency aggregation
-            disease_pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$group": {
-                    "_id": "$analysis_result.disease_detection.disease",
-                    "count": {"$sum": 1}
-                }},
-                {"$sort": {"count": -1}}
-            ]
-            
-            disease_cursor = self.analyses_collection.aggregate(disease_pipeline)
-            disease_results = await disease_cursor.to_list(length=None)
-            disease_frequency = {result["_id"]: result["count"] for result in disease_results}
-            
-            # Healthy vs diseased ratio
-            healthy_count = disease_frequency.get("Healthy", 0)
-            diseased_count = total_analyses - healthy_count
-            healthy_vs_diseased_ratio = healthy_count / max(total_analyses, 1)
-            
-            # Most common diseases (excluding healthy)
-            most_common_diseases = [
-                {"disease": disease, "count": count}
-                for disease, count in disease_frequency.items()
-                if disease != "Healthy"
-            ][:5]
-            
-            # Analyses by month
-            monthly_pipeline = [
-                {"$match": {"user_id": user_id}},
-                {
-                    "$group": {
-                        "_id": {
-                            "year": {"$year": "$created_at"},
-                            "month": {"$month": "$created_at"}
-                        },
-                        "count": {"$sum": 1}
-                    }
-                },
-                {"$sort": {"_id.year": -1, "_id.month": -1}},
-                {"$limit": 12}
-            ]
-            
-            monthly_cursor = self.analyses_collection.aggregate(monthly_pipeline)
-            monthly_results = await monthly_cursor.to_list(length=None)
-            analyses_by_month = [
-                {
-                    "month": f"{result['_id']['year']}-{result['_id']['month']:02d}",
-                    "count": result["count"]
-                }
-                for result in monthly_results
-            ]
-            
-            # Favorite analyses count
-            favorite_count = await self.analyses_collection.count_documents({
-                "user_id": user_id,
-                "is_favorite": True
-            })
-            
-            # Average processing time
-            avg_time_pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$group": {
-                    "_id": None,
-                    "avg_time": {"$avg": "$metadata.processing_time"}
-                }}
-            ]
-            
-            avg_time_cursor = self.analyses_collection.aggregate(avg_time_pipeline)
-            avg_time_result = await avg_time_cursor.to_list(length=1)
-            average_processing_time = avg_time_result[0]["avg_time"] if avg_time_result else None
-            
-            # Most analyzed plant parts
-            parts_pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$group": {
-                    "_id": "$analysis_result.part_detection.part",
-                    "count": {"$sum": 1}
-                }},
-                {"$sort": {"count": -1}},
-                {"$limit": 5}
-            ]
-            
-            parts_cursor = self.analyses_collection.aggregate(parts_pipeline)
-            parts_results = await parts_cursor.to_list(length=None)
-            most_analyzed_plant_parts = [
-                {"part": result["_id"], "count": result["count"]}
-                for result in parts_results
-            ]
-            
-            # Severity distribution
-            severity_pipeline = [
-                {"$match": {"user_id": user_id}},
-                {"$match": {"analysis_result.spot_detection.severity.level": {"$exists": true}}},
-                {"$group": {
-                    "_id": "$analysis_result.spot_detection.severity.level",
-                    "count": {"$sum": 1}
-                }},
-                {"$sort": {"count": -1}}
-            ]
-            
-            severity_cursor = self.analyses_collection.aggregate(severity_pipeline)
-            severity_results = await severity_cursor.to_list(length=None)
-            severity_distribution = {result["_id"]: result["count"] for result in severity_results}
-            
-            return UserAnalysisStats(
-                total_analyses=total_analyses,
-                disease_frequency=disease_frequency,
-                healthy_vs_diseased_ratio=healthy_vs_diseased_ratio,
-                most_common_diseases=most_common_diseases,
-                analyses_by_month=analyses_by_month,
-                favorite_analyses_count=favorite_count,
-                average_processing_time=average_processing_time,
-                most_analyzed_plant_parts=most_analyzed_plant_parts,
-                severity_distribution=severity_distribution
-            )
+            stats = await UserStatsService(self.db).get(user_id)
+            return UserAnalysisStats(**stats_summary(stats))
             
         except Exception as e:
             logger.error(f"❌ Failed to get user statistics: {e}")
@@ -406,10 +464,10 @@ class AnalysisService:
                     "$project": {
                         "id": {"$toString": "$_id"},
                         "image_url": 1,
-                        "disease": "$analysis_result.disease_detection.disease",
-                        "confidence": "$analysis_result.disease_detection.confidence",
-                        "plant_part": "$analysis_result.part_detection.part",
-                        "severity": "$analysis_result.spot_detection.severity.level",
+                        "disease": 1,
+                        "confidence": 1,
+                        "plant_part": 1,
+                        "severity": 1,
                         "created_at": 1,
                         "is_favorite": 1,
                         "notes": 1,
@@ -0,0 +1,158 @@
+"""
+Analytics rollups.
+
+One document per (day, plant_part, disease) in `analytics_rollups` holds
+the number of analyses, the sum and count of their confidences and a
+confidence histogram (CONFIDENCE_BOUNDARIES, same buckets as the admin
+confidence chart). Rows are updated with $inc whenever an analysis is
+saved or deleted, so the dashboard KPIs read a few hundred rollup rows
+instead of aggregating every analysis.
+
+Increments are best effort: a failure is logged and the analysis write
+still succeeds. rebuild() recomputes every row from the analyses
+collection (scripts/rebuild_analytics_rollups.py) to backfill or repair
+drift; it relies on the canonical top-level fields, so run
+scripts/migrate_analysis_schema.py first on older data.
+"""
+import bisect
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "analytics_rollups"
+
+# Lower bounds of the confidence buckets; the last bucket ends at 1.01
+CONFIDENCE_BOUNDARIES = [0, 0.3, 0.5, 0.6, 0.7, 0.8, 0.9]
+CONFIDENCE_UPPER = 1.01
+BUCKET_FIELDS = [f"b{i}" for i in range(len(CONFIDENCE_BOUNDARIES))]
+LOW_CONFIDENCE_BUCKETS = BUCKET_FIELDS[:3]   # < 0.6
+HIGH_CONFIDENCE_BUCKETS = BUCKET_FIELDS[6:]  # >= 0.9
+
+# Projection with everything a rollup update needs from an analysis
+ROLLUP_SOURCE_FIELDS = {"created_at": 1, "plant_part": 1, "disease": 1, "confidence": 1}
+
+
+def day_key(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%d")
+
+
+def confidence_bucket(confidence: Optional[float]) -> Optional[str]:
+    if confidence is None or confidence < CONFIDENCE_BOUNDARIES[0] or confidence >= CONFIDENCE_UPPER:
+        return None
+    return BUCKET_FIELDS[bisect.bisect_right(CONFIDENCE_BOUNDARIES, confidence) - 1]
+
+
+def rollup_operation(document: Dict[str, Any], sign: int = 1) -> UpdateOne:
+    """The upsert adding (sign=1) or removing (sign=-1) one analysis"""
+    created_at = document.get("created_at") or datetime.utcnow()
+    confidence = document.get("confidence")
+
+    increments: Dict[str, Any] = {"count": sign}
+    if confidence is not None:
+        increments["confidence_sum"] = sign * confidence
+        increments["confidence_count"] = sign
+        bucket = confidence_bucket(confidence)
+        if bucket:
+            increments[f"buckets.{bucket}"] = sign
+
+    return UpdateOne(
+        {
+            "day": day_key(created_at),
+            "plant_part": document.get("plant_part"),
+            "disease": document.get("disease"),
+        },
+        {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+class AnalyticsRollupService:
+    """Keeps analytics_rollups in step with the analyses collection"""
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.db = database
+        self.rollups = database[ROLLUP_COLLECTION]
+
+    async def record(self, document: Dict[str, Any], sign: int = 1) -> None:
+        await self.record_many([document], sign)
+
+    async def record_many(self, documents: Iterable[Dict[str, Any]], sign: int = 1) -> None:
+        operations = [rollup_operation(document, sign) for document in documents]
+        if not operations:
+            return
+        try:
+            await self.rollups.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"❌ Failed to update analytics rollups (rebuild to repair): {e}")
+
+        from app.services.analytics_service import analytics_cache
+        analytics_cache.invalidate()
+
+    async def rebuild(self) -> int:
+        """
+        Recompute every rollup row from the analyses collection.
+
+        Rows are built into a scratch collection and swapped in with a
+        rename, so readers never see a half-built table. Increments made
+        while the aggregation runs can be lost; run it when traffic is low.
+        """
+        scratch = f"{ROLLUP_COLLECTION}_rebuild"
+        has_confidence = {"$ne": [{"$ifNull": ["$confidence", None]}, None]}
+
+        bucket_sums = {}
+        bounds = CONFIDENCE_BOUNDARIES + [CONFIDENCE_UPPER]
+        for i, field in enumerate(BUCKET_FIELDS):
+            bucket_sums[field] = {"$sum": {"$cond": [
+                {"$and": [
+                    has_confidence,
+                    {"$gte": ["$confidence", bounds[i]]},
+                    {"$lt": ["$confidence", bounds[i + 1]]},
+                ]},
+                1, 0,
+            ]}}
+
+        pipeline: List[Dict[str, Any]] = [
+            {"$group": {
+                "_id": {
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "plant_part": "$plant_part",
+                    "disease": "$disease",
+                },
+                "count": {"$sum": 1},
+                "confidence_sum": {"$sum": "$confidence"},
+                "confidence_count": {"$sum": {"$cond": [has_confidence, 1, 0]}},
+                **bucket_sums,
+            }},
+            {"$project": {
+                "_id": 0,
+                "day": "$_id.day",
+                "plant_part": "$_id.plant_part",
+                "disease": "$_id.disease",
+                "count": 1,
+                "confidence_sum": 1,
+                "confidence_count": 1,
+                "buckets": {field: f"${field}" for field in BUCKET_FIELDS},
+                "updated_at": "$$NOW",
+            }},
+            {"$out": scratch},
+        ]
+        await self.db.analyses.aggregate(pipeline).to_list(length=None)
+
+        rows = await self.db[scratch].count_documents({})
+        if rows:
+            await self.db[scratch].rename(ROLLUP_COLLECTION, dropTarget=True)
+        else:
+            await self.rollups.delete_many({})
+
+        # The rename replaced the collection together with its indexes
+        from app.services.indexes import index_manager
+        await index_manager.ensure(self.db, collections=[ROLLUP_COLLECTION])
+        from app.services.analytics_service import analytics_cache
+        analytics_cache.clear()
+        logger.info(f"✅ Rebuilt {rows} analytics rollup rows")
+        return rows
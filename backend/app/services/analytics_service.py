@@ -2,11 +2,26 @@
 ML Analytics Service
 Aggregates data from analyses collection for the admin dashboard.
 """
-from typing import Dict, Any, List
+import asyncio
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorDatabase
 import logging
 
+from app.config import get_settings
+from app.utils.cache import AsyncCache, cached
+from app.utils.pagination import KEYSET_SORT, keyset_filter, next_cursor
+from app.services.analytics_rollups import (
+    BUCKET_FIELDS,
+    HIGH_CONFIDENCE_BUCKETS,
+    LOW_CONFIDENCE_BUCKETS,
+    ROLLUP_COLLECTION,
+    ROLLUP_SOURCE_FIELDS,
+    AnalyticsRollupService,
+    day_key,
+)
+from app.services.user_stats import USER_STATS_SOURCE_FIELDS, UserStatsService
+
 logger = logging.getLogger(__name__)
 
 # All known diseases per model (used to guarantee 0-fill)
@@ -66,162 +81,215 @@ MODEL_EVALUATION = {
     },
 }
 
+# Per-endpoint cache lifetimes: (fresh seconds, extra seconds served stale while refreshing)
+CACHE_TTLS = {
+    "rollup_kpis":          (30, 300),
+    "overview":             (30, 300),
+    "disease_stats":        (60, 600),
+    "detection_trends":     (120, 900),
+    "confidence":           (60, 600),
+    "part_distribution":    (60, 600),
+    "recent_analyses":      (10, 60),
+    "scatter_plot":         (60, 600),
+    "spotlight":            (300, 3600),
+}
+
+# What get_analysis_detail renders, from either analysis_result layout
+DETAIL_PROJECTION = {
+    "user_id": 1, "image_url": 1, "created_at": 1,
+    **{
+        f"{root}.{section}": 1
+        for root in ("analysis_result.analysis", "analysis_result")
+        for section in ("disease_detection", "part_detection", "spot_detection", "recommendations")
+    },
+}
+
+# Invalidated by AnalyticsRollupService whenever analyses are saved or deleted.
+# Invalidation is debounced rather than scoped: every entry reflects the
+# analyses, but one younger than ANALYTICS_CACHE_MIN_FRESH_SECONDS stays
+# fresh until that age, so under steady upload traffic each dashboard query
+# reruns at most once per that interval instead of on every read.
+analytics_cache = AsyncCache(
+    "analytics_cache",
+    enabled=get_settings().analytics_cache_enabled,
+    min_fresh=get_settings().analytics_cache_min_fresh_seconds,
+)
+
+
+def _cached(name: str):
+    return cached(analytics_cache, name, *CACHE_TTLS[name])
+
 
 class AnalyticsService:
-    """Aggregation queries for ML analytics dashboard"""
+    """
+    Aggregation queries for ML analytics dashboard.
+
+    Queries read the canonical top-level disease / plant_part / confidence
+    fields (see analysis_service.canonical_fields); documents written
+    before they existed are converted by scripts/migrate_analysis_schema.py.
+    Counts, confidence and trend KPIs come from the per-day rollups in
+    analytics_rollups (see analytics_rollups.py) instead of the analyses;
+    get_full_ml_analytics computes all of them in one $facet pass.
+    """
 
     def __init__(self, database: AsyncIOMotorDatabase):
         self.db = database
         self.analyses = database.analyses
+        self.rollups = database[ROLLUP_COLLECTION]
 
+    # ------------------------------------------------------------------
+    # Rollup sections
+    #
+    # Each KPI section is one $facet sub-pipeline over analytics_rollups,
+    # so a single aggregate can compute any subset of them in one pass.
+    # The individual endpoints request just their own facets, the combined
+    # endpoint requests all of them at once.
+    # ------------------------------------------------------------------
     @staticmethod
-    def _normalize_stage() -> dict:
-        """
-        Normalization stage that handles BOTH storage formats:
-          • Upload route stores ML result under  analysis_result.analysis.*
-          • URL    route stores ML result under  analysis_result.*
-        This $addFields picks whichever path exists.
-        """
-        return {
-            "$addFields": {
-                "_disease": {
-                    "$ifNull": [
-                        "$analysis_result.analysis.disease_detection.disease",
-                        "$analysis_result.disease_detection.disease",
-                    ]
-                },
-                "_confidence": {
-                    "$ifNull": [
-                        "$analysis_result.analysis.disease_detection.confidence",
-                        "$analysis_result.disease_detection.confidence",
-                    ]
-                },
-                "_part": {
-                    "$ifNull": [
-                        "$analysis_result.analysis.part_detection.part",
-                        "$analysis_result.part_detection.part",
-                    ]
-                },
-            }
+    def _rollup_facet(group_id: Any, match: Dict[str, Any] = None,
+                      extra: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Sub-pipeline summing rollup rows per group_id"""
+        group: Dict[str, Any] = {
+            "_id": group_id,
+            "count": {"$sum": "$count"},
+            "confidence_sum": {"$sum": "$confidence_sum"},
+            "confidence_count": {"$sum": "$confidence_count"},
+            **(extra or {}),
         }
+        pipeline: List[Dict[str, Any]] = [{"$match": match}] if match else []
+        return pipeline + [{"$group": group}, {"$match": {"count": {"$gt": 0}}}]
+
+    def _totals_facet(self) -> List[Dict[str, Any]]:
+        today = day_key(datetime.utcnow())
+        return self._rollup_facet(None, extra={
+            "today": {"$sum": {"$cond": [{"$eq": ["$day", today]}, "$count", 0]}},
+            "healthy": {"$sum": {"$cond": [{"$eq": ["$disease", "Healthy"]}, "$count", 0]}},
+            **{field: {"$sum": f"$buckets.{field}"} for field in BUCKET_FIELDS},
+        })
+
+    def _trends_facet(self, since: datetime) -> List[Dict[str, Any]]:
+        return self._rollup_facet(
+            {"date": "$day", "part": "$plant_part"},
+            match={"day": {"$gte": day_key(since)}},
+        )
+
+    async def _rollup_facets(self, facets: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Run several rollup groupings in one $facet pass; adds avg_confidence to every row"""
+        rows = await self.rollups.aggregate([{"$facet": facets}]).to_list(1)
+        sections = rows[0] if rows else {name: [] for name in facets}
+        for groups in sections.values():
+            for r in groups:
+                r["avg_confidence"] = (
+                    r["confidence_sum"] / r["confidence_count"] if r.get("confidence_count") else None
+                )
+        return sections
+
+    @_cached("rollup_kpis")
+    async def _rollup_kpis(self, trend_days: int = 30) -> Dict[str, Any]:
+        """Every rollup-backed section of the dashboard from a single aggregate"""
+        try:
+            since = datetime.utcnow() - timedelta(days=trend_days)
+            facets = await self._rollup_facets({
+                "totals": self._totals_facet(),
+                "by_part_disease": self._rollup_facet({"part": "$plant_part", "disease": "$disease"}),
+                "by_disease": self._rollup_facet("$disease"),
+                "by_part": self._rollup_facet("$plant_part"),
+                "trends": self._trends_facet(since),
+            })
+            return {
+                "overview": self._build_overview(facets),
+                "disease_stats": self._build_disease_stats(facets),
+                "detection_trends": self._build_detection_trends(facets, trend_days, since),
+                "confidence_distribution": self._build_confidence_distribution(facets),
+                "part_distribution": self._build_part_distribution(facets),
+            }
+        except Exception as e:
+            logger.error(f"❌ analytics KPIs failed: {e}")
+            raise
 
     # ------------------------------------------------------------------
     # 1. Overview numbers
     # ------------------------------------------------------------------
+    @_cached("overview")
     async def get_overview(self) -> Dict[str, Any]:
         """High-level KPIs for the overview cards."""
         try:
-            total = await self.analyses.count_documents({})
+            return self._build_overview(await self._rollup_facets({"totals": self._totals_facet()}))
+        except Exception as e:
+            logger.error(f"❌ analytics overview failed: {e}")
+            raise
 
-            today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-            today_count = await self.analyses.count_documents({"created_at": {"$gte": today_start}})
+    @staticmethod
+    def _build_overview(facets: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        row = facets["totals"][0] if facets["totals"] else {}
 
-            norm = self._normalize_stage()
+        total = row.get("count", 0)
+        today_count = row.get("today", 0)
+        healthy = row.get("healthy", 0)
+        diseased = total - healthy
+        avg_confidence = row.get("avg_confidence") or 0
 
-            # Healthy count
-            healthy_pipeline = [
-                norm,
-                {"$match": {"_disease": "Healthy"}},
-                {"$count": "count"},
-            ]
-            healthy_result = await self.analyses.aggregate(healthy_pipeline).to_list(1)
-            healthy = healthy_result[0]["count"] if healthy_result else 0
-            diseased = total - healthy
-
-            # Average confidence
-            avg_conf_pipeline = [
-                norm,
-                {"$group": {
-                    "_id": None,
-                    "avg_confidence": {"$avg": "$_confidence"},
-                }}
-            ]
-            avg_conf_result = await self.analyses.aggregate(avg_conf_pipeline).to_list(1)
-            avg_confidence = avg_conf_result[0]["avg_confidence"] if avg_conf_result else 0
-
-            # Low-confidence (< 0.6)
-            low_conf_pipeline = [
-                norm,
-                {"$match": {"_confidence": {"$lt": 0.6}}},
-                {"$count": "count"},
-            ]
-            low_conf_result = await self.analyses.aggregate(low_conf_pipeline).to_list(1)
-            low_conf = low_conf_result[0]["count"] if low_conf_result else 0
-
-            # High-confidence (>= 0.9)
-            high_conf_pipeline = [
-                norm,
-                {"$match": {"_confidence": {"$gte": 0.9}}},
-                {"$count": "count"},
-            ]
-            high_conf_result = await self.analyses.aggregate(high_conf_pipeline).to_list(1)
-            high_conf = high_conf_result[0]["count"] if high_conf_result else 0
+        # Low-confidence (< 0.6) / high-confidence (>= 0.9)
+        low_conf = sum(row.get(field, 0) for field in LOW_CONFIDENCE_BUCKETS)
+        high_conf = sum(row.get(field, 0) for field in HIGH_CONFIDENCE_BUCKETS)
 
-            return {
-                "total_analyses": total,
-                "today_analyses": today_count,
-                "healthy_count": healthy,
-                "diseased_count": diseased,
-                "avg_confidence": round(avg_confidence, 4) if avg_confidence else 0,
-                "low_confidence_count": low_conf,
-                "high_confidence_count": high_conf,
-            }
-        except Exception as e:
-            logger.error(f"❌ analytics overview failed: {e}")
-            raise
+        return {
+            "total_analyses": total,
+            "today_analyses": today_count,
+            "healthy_count": healthy,
+            "diseased_count": diseased,
+            "avg_confidence": round(avg_confidence, 4) if avg_confidence else 0,
+            "low_confidence_count": low_conf,
+            "high_confidence_count": high_conf,
+        }
 
     # ------------------------------------------------------------------
     # 2. Disease detection statistics (0-filled for every known disease)
     # ------------------------------------------------------------------
+    @_cached("disease_stats")
     async def get_disease_detection_stats(self) -> Dict[str, Any]:
         """Detection counts for every disease, grouped by plant part."""
         try:
-            total = await self.analyses.count_documents({})
-
-            pipeline = [
-                self._normalize_stage(),
-                {"$group": {
-                    "_id": {
-                        "part": "$_part",
-                        "disease": "$_disease",
-                    },
-                    "count": {"$sum": 1},
-                    "avg_confidence": {"$avg": "$_confidence"},
-                }},
-                {"$sort": {"count": -1}},
-            ]
-            raw = await self.analyses.aggregate(pipeline).to_list(length=None)
-
-            # Index counts by (part, disease)
-            counts_map: Dict[str, Dict[str, Dict[str, Any]]] = {}
-            for r in raw:
-                part = (r["_id"].get("part") or "unknown").lower()
-                disease = r["_id"].get("disease") or "Unknown"
-                counts_map.setdefault(part, {})[disease] = {
-                    "count": r["count"],
-                    "avg_confidence": round(r["avg_confidence"], 4) if r["avg_confidence"] else 0,
-                }
-
-            # Build 0-filled result
-            result: Dict[str, List[Dict[str, Any]]] = {}
-            for part, diseases in ALL_DISEASES.items():
-                part_list = []
-                for d in diseases:
-                    data = counts_map.get(part, {}).get(d, {"count": 0, "avg_confidence": 0})
-                    pct = round(data["count"] / total * 100, 2) if total > 0 else 0
-                    part_list.append({
-                        "disease": d,
-                        "count": data["count"],
-                        "percentage": pct,
-                        "avg_confidence": data["avg_confidence"],
-                    })
-                result[part] = part_list
-
-            return {"total": total, "by_part": result}
+            facets = await self._rollup_facets({
+                "by_part_disease": self._rollup_facet({"part": "$plant_part", "disease": "$disease"}),
+            })
+            return self._build_disease_stats(facets)
         except Exception as e:
             logger.error(f"❌ disease stats failed: {e}")
             raise
 
+    @staticmethod
+    def _build_disease_stats(facets: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        raw = facets["by_part_disease"]
+        total = sum(r["count"] for r in raw)
+
+        # Index counts by (part, disease)
+        counts_map: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for r in raw:
+            part = (r["_id"].get("part") or "unknown").lower()
+            disease = r["_id"].get("disease") or "Unknown"
+            counts_map.setdefault(part, {})[disease] = {
+                "count": r["count"],
+                "avg_confidence": round(r["avg_confidence"], 4) if r["avg_confidence"] else 0,
+            }
+
+        # Build 0-filled result
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for part, diseases in ALL_DISEASES.items():
+            part_list = []
+            for d in diseases:
+                data = counts_map.get(part, {}).get(d, {"count": 0, "avg_confidence": 0})
+                pct = round(data["count"] / total * 100, 2) if total > 0 else 0
+                part_list.append({
+                    "disease": d,
+                    "count": data["count"],
+                    "percentage": pct,
+                    "avg_confidence": data["avg_confidence"],
+                })
+            result[part] = part_list
+
+        return {"total": total, "by_part": result}
+
     # ------------------------------------------------------------------
     # 3. Model evaluation (static – from your training evaluation files)
     # ------------------------------------------------------------------
@@ -242,154 +310,132 @@ class AnalyticsService:
     # ------------------------------------------------------------------
     # 4. Detection trend – daily counts per model (last 30 days)
     # ------------------------------------------------------------------
+    @_cached("detection_trends")
     async def get_detection_trends(self, days: int = 30) -> Dict[str, Any]:
         """Daily analysis counts per plant part for the last N days."""
         try:
             since = datetime.utcnow() - timedelta(days=days)
-
-            pipeline = [
-                self._normalize_stage(),
-                {"$match": {"created_at": {"$gte": since}}},
-                {"$group": {
-                    "_id": {
-                        "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
-                        "part": "$_part",
-                    },
-                    "count": {"$sum": 1},
-                }},
-                {"$sort": {"_id.date": 1}},
-            ]
-            raw = await self.analyses.aggregate(pipeline).to_list(length=None)
-
-            # Build date-indexed structure
-            all_dates = [(since + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)]
-            parts = ["fruit", "leaf", "stem"]
-
-            trends: Dict[str, List[Dict[str, Any]]] = {p: [] for p in parts}
-            trends["total"] = []
-
-            # Index raw data
-            data_map: Dict[str, Dict[str, int]] = {}
-            for r in raw:
-                date = r["_id"]["date"]
-                part = (r["_id"].get("part") or "unknown").lower()
-                data_map.setdefault(date, {})[part] = r["count"]
-
-            for date in all_dates:
-                day_data = data_map.get(date, {})
-                day_total = 0
-                for p in parts:
-                    c = day_data.get(p, 0)
-                    trends[p].append({"date": date, "count": c})
-                    day_total += c
-                trends["total"].append({"date": date, "count": day_total})
-
-            return {"days": days, "trends": trends}
+            facets = await self._rollup_facets({"trends": self._trends_facet(since)})
+            return self._build_detection_trends(facets, days, since)
         except Exception as e:
             logger.error(f"❌ detection trends failed: {e}")
             raise
 
+    @staticmethod
+    def _build_detection_trends(facets: Dict[str, List[Dict[str, Any]]], days: int,
+                                since: datetime) -> Dict[str, Any]:
+        # Build date-indexed structure
+        all_dates = [(since + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)]
+        parts = ["fruit", "leaf", "stem"]
+
+        trends: Dict[str, List[Dict[str, Any]]] = {p: [] for p in parts}
+        trends["total"] = []
+
+        # Index raw data
+        data_map: Dict[str, Dict[str, int]] = {}
+        for r in facets["trends"]:
+            date = r["_id"]["date"]
+            part = (r["_id"].get("part") or "unknown").lower()
+            data_map.setdefault(date, {})[part] = r["count"]
+
+        for date in all_dates:
+            day_data = data_map.get(date, {})
+            day_total = 0
+            for p in parts:
+                c = day_data.get(p, 0)
+                trends[p].append({"date": date, "count": c})
+                day_total += c
+            trends["total"].append({"date": date, "count": day_total})
+
+        return {"days": days, "trends": trends}
+
     # ------------------------------------------------------------------
     # 5. Confidence distribution buckets
     # ------------------------------------------------------------------
+    @_cached("confidence")
     async def get_confidence_distribution(self) -> Dict[str, Any]:
         """Bucket confidences and per-disease avg confidence."""
         try:
-            norm = self._normalize_stage()
-
-            # Buckets
-            bucket_pipeline = [
-                norm,
-                {"$bucket": {
-                    "groupBy": "$_confidence",
-                    "boundaries": [0, 0.3, 0.5, 0.6, 0.7, 0.8, 0.9, 1.01],
-                    "default": "unknown",
-                    "output": {"count": {"$sum": 1}},
-                }}
-            ]
-            buckets_raw = await self.analyses.aggregate(bucket_pipeline).to_list(length=None)
-
-            labels = ["0-30%", "30-50%", "50-60%", "60-70%", "70-80%", "80-90%", "90-100%"]
-            boundaries = [0, 0.3, 0.5, 0.6, 0.7, 0.8, 0.9]
-            buckets = []
-            bucket_map = {r["_id"]: r["count"] for r in buckets_raw if r["_id"] != "unknown"}
-            for i, b in enumerate(boundaries):
-                buckets.append({"label": labels[i], "count": bucket_map.get(b, 0)})
-
-            # Per-disease average confidence
-            per_disease_pipeline = [
-                norm,
-                {"$group": {
-                    "_id": "$_disease",
-                    "avg_confidence": {"$avg": "$_confidence"},
-                    "count": {"$sum": 1},
-                }},
-                {"$sort": {"avg_confidence": -1}},
-            ]
-            per_disease_raw = await self.analyses.aggregate(per_disease_pipeline).to_list(length=None)
-            per_disease = [
-                {
-                    "disease": r["_id"],
-                    "avg_confidence": round(r["avg_confidence"], 4) if r["avg_confidence"] else 0,
-                    "count": r["count"],
-                }
-                for r in per_disease_raw
-            ]
-
-            return {"buckets": buckets, "per_disease": per_disease}
+            facets = await self._rollup_facets({
+                "totals": self._totals_facet(),
+                "by_disease": self._rollup_facet("$disease"),
+            })
+            return self._build_confidence_distribution(facets)
         except Exception as e:
             logger.error(f"❌ confidence distribution failed: {e}")
             raise
 
+    @staticmethod
+    def _build_confidence_distribution(facets: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        # Buckets
+        bucket_totals = facets["totals"][0] if facets["totals"] else {}
+
+        labels = ["0-30%", "30-50%", "50-60%", "60-70%", "70-80%", "80-90%", "90-100%"]
+        buckets = [
+            {"label": label, "count": bucket_totals.get(field, 0)}
+            for label, field in zip(labels, BUCKET_FIELDS)
+        ]
+
+        # Per-disease average confidence
+        per_disease_raw = sorted(facets["by_disease"], key=lambda r: r["avg_confidence"] or 0, reverse=True)
+        per_disease = [
+            {
+                "disease": r["_id"],
+                "avg_confidence": round(r["avg_confidence"], 4) if r["avg_confidence"] else 0,
+                "count": r["count"],
+            }
+            for r in per_disease_raw
+        ]
+
+        return {"buckets": buckets, "per_disease": per_disease}
+
     # ------------------------------------------------------------------
     # 6. Plant part distribution
     # ------------------------------------------------------------------
+    @_cached("part_distribution")
     async def get_part_distribution(self) -> List[Dict[str, Any]]:
         """Count of analyses per plant part."""
         try:
-            pipeline = [
-                self._normalize_stage(),
-                {"$group": {
-                    "_id": "$_part",
-                    "count": {"$sum": 1},
-                }},
-                {"$sort": {"count": -1}},
-            ]
-            raw = await self.analyses.aggregate(pipeline).to_list(length=None)
-
-            total = sum(r["count"] for r in raw) if raw else 0
-            parts = ["fruit", "leaf", "stem"]
-            part_map = {(r["_id"] or "unknown").lower(): r["count"] for r in raw}
-
-            return [
-                {
-                    "part": p,
-                    "count": part_map.get(p, 0),
-                    "percentage": round(part_map.get(p, 0) / total * 100, 2) if total > 0 else 0,
-                }
-                for p in parts
-            ]
+            facets = await self._rollup_facets({"by_part": self._rollup_facet("$plant_part")})
+            return self._build_part_distribution(facets)
         except Exception as e:
             logger.error(f"❌ part distribution failed: {e}")
             raise
 
+    @staticmethod
+    def _build_part_distribution(facets: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        raw = facets["by_part"]
+
+        total = sum(r["count"] for r in raw) if raw else 0
+        parts = ["fruit", "leaf", "stem"]
+        part_map = {(r["_id"] or "unknown").lower(): r["count"] for r in raw}
+
+        return [
+            {
+                "part": p,
+                "count": part_map.get(p, 0),
+                "percentage": round(part_map.get(p, 0) / total * 100, 2) if total > 0 else 0,
+            }
+            for p in parts
+        ]
+
     # ------------------------------------------------------------------
     # 8. Recent analyses feed
     # ------------------------------------------------------------------
+    @_cached("recent_analyses")
     async def get_recent_analyses(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Last N analyses with key fields."""
         try:
             pipeline = [
-                self._normalize_stage(),
                 {"$sort": {"created_at": -1}},
                 {"$limit": limit},
                 {"$project": {
                     "id": {"$toString": "$_id"},
                     "user_id": 1,
                     "image_url": 1,
-                    "disease": "$_disease",
-                    "confidence": "$_confidence",
-                    "plant_part": "$_part",
+                    "disease": 1,
+                    "confidence": 1,
+                    "plant_part": 1,
                     "created_at": 1,
                 }},
             ]
@@ -403,28 +449,37 @@ class AnalyticsService:
             logger.error(f"❌ recent analyses failed: {e}")
             raise
 
-    async def get_analysis_history(self, page: int = 1, page_size: int = 20) -> Dict[str, Any]:
-        """Paginated analysis history for admin dashboard."""
+    async def get_analysis_history(self, page: int = 1, page_size: int = 20,
+                                   cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Paginated analysis history for admin dashboard.
+
+        With `cursor` (next_cursor of the previous page) the page is a keyset
+        range scan and `page` is informational; without it `page` is
+        skipped to. The total is the collection's estimated count
+        (metadata, not a scan), so it can lag a concurrent write.
+        """
         try:
-            skip = (page - 1) * page_size
-            total = await self.analyses.count_documents({})
+            total = await self.analyses.estimated_document_count()
 
+            match = keyset_filter(cursor)
             pipeline = [
-                self._normalize_stage(),
-                {"$sort": {"created_at": -1}},
-                {"$skip": skip},
+                *([{"$match": match}] if match else []),
+                {"$sort": dict(KEYSET_SORT)},
+                *([] if cursor or page <= 1 else [{"$skip": (page - 1) * page_size}]),
                 {"$limit": page_size},
                 {"$project": {
                     "id": {"$toString": "$_id"},
                     "user_id": 1,
                     "image_url": 1,
-                    "disease": "$_disease",
-                    "confidence": "$_confidence",
-                    "plant_part": "$_part",
+                    "disease": 1,
+                    "confidence": 1,
+                    "plant_part": 1,
                     "created_at": 1,
                 }},
             ]
             results = await self.analyses.aggregate(pipeline).to_list(length=page_size)
+            token = next_cursor(results, page_size)
             for r in results:
                 r.pop("_id", None)
                 if r.get("created_at"):
@@ -436,6 +491,7 @@ class AnalyticsService:
                 "page": page,
                 "page_size": page_size,
                 "total_pages": (total + page_size - 1) // page_size,
+                "next_cursor": token,
             }
         except Exception as e:
             logger.error(f"❌ analysis history failed: {e}")
@@ -445,8 +501,15 @@ class AnalyticsService:
         """Delete a single analysis record by ID."""
         try:
             from bson import ObjectId
-            result = await self.analyses.delete_one({"_id": ObjectId(analysis_id)})
-            if result.deleted_count > 0:
+            deleted = await self.analyses.find_one_and_delete(
+                {"_id": ObjectId(analysis_id)},
+                projection={**ROLLUP_SOURCE_FIELDS, **USER_STATS_SOURCE_FIELDS},
+            )
+            if deleted:
+                await asyncio.gather(
+                    AnalyticsRollupService(self.db).record(deleted, sign=-1),
+                    UserStatsService(self.db).record(deleted, sign=-1),
+                )
                 logger.info(f"✅ Deleted analysis {analysis_id}")
                 return True
             return False
@@ -458,7 +521,7 @@ class AnalyticsService:
         """Get full analysis detail by ID, including spot detection images."""
         try:
             from bson import ObjectId
-            doc = await self.analyses.find_one({"_id": ObjectId(analysis_id)})
+            doc = await self.analyses.find_one({"_id": ObjectId(analysis_id)}, DETAIL_PROJECTION)
             if not doc:
                 return None
 
@@ -477,14 +540,6 @@ class AnalyticsService:
             annotated_image = spot_detection.get("annotated_image")
             original_image = spot_detection.get("original_image")
 
-            logger.info(f"📋 Analysis detail for {analysis_id}: "
-                        f"has_analysis_key={'analysis' in result}, "
-                        f"spot_detection_keys={list(spot_detection.keys()) if spot_detection else 'None'}, "
-                        f"has_annotated={annotated_image is not None and len(str(annotated_image)) > 0}, "
-                        f"has_original={original_image is not None and len(str(original_image)) > 0}, "
-                        f"annotated_len={len(str(annotated_image)) if annotated_image else 0}, "
-                        f"original_len={len(str(original_image)) if original_image else 0}")
-
             return {
                 "id": str(doc["_id"]),
                 "user_id": doc.get("user_id"),
@@ -506,23 +561,23 @@ class AnalyticsService:
             logger.error(f"❌ analysis detail failed: {e}")
             raise
 
+    @_cached("scatter_plot")
     async def get_scatter_plot_data(self, limit: int = 500) -> List[Dict[str, Any]]:
         """Get individual analysis points for scatter plot visualization."""
         try:
             pipeline = [
-                self._normalize_stage(),
                 {"$match": {
-                    "_confidence": {"$exists": True, "$ne": None},
-                    "_disease": {"$exists": True, "$ne": None},
-                    "_part": {"$exists": True, "$ne": None}
+                    "confidence": {"$ne": None},
+                    "disease": {"$ne": None},
+                    "plant_part": {"$ne": None}
                 }},
                 {"$sort": {"created_at": -1}},
                 {"$limit": limit},
                 {"$project": {
                     "id": {"$toString": "$_id"},
-                    "disease": "$_disease",
-                    "confidence": "$_confidence",
-                    "plant_part": "$_part",
+                    "disease": 1,
+                    "confidence": 1,
+                    "plant_part": 1,
                     "created_at": 1,
                     "days_ago": {
                         "$divide": [
@@ -548,94 +603,97 @@ class AnalyticsService:
     # ------------------------------------------------------------------
     # Featured Disease Spotlight – top-1 per part + overall for Trends
     # ------------------------------------------------------------------
+    @_cached("spotlight")
     async def get_featured_disease_spotlight(self, days: int = 30) -> Dict[str, Any]:
         """
         Return the #1 most-detected disease **overall** and for each
         plant part (leaf, fruit, stem) in the given period.
+
+        Everything (ranking, previous-period comparison, peak week, daily
+        trend) is derived from one read of the daily rollups covering the
+        period and the one before it. The common windows are kept warm by
+        SpotlightWarmer.
         """
         from app.services.recommendations import RECOMMENDATIONS_DB
 
         now = datetime.utcnow()
         period_start = now - timedelta(days=days)
         prev_start = period_start - timedelta(days=days)
-        norm = self._normalize_stage()
-
-        # ── 1. Get top disease per (part, disease) in period ─────
-        top_pipeline = [
-            norm,
-            {"$match": {
-                "created_at": {"$gte": period_start},
-                "_disease": {"$nin": [None, "Healthy"]},
-            }},
-            {"$group": {
-                "_id": {"disease": "$_disease", "part": "$_part"},
-                "count": {"$sum": 1},
-                "avg_confidence": {"$avg": "$_confidence"},
-            }},
-            {"$sort": {"count": -1}},
-        ]
-        all_groups = await self.analyses.aggregate(top_pipeline).to_list(length=None)
-
+        period_key, prev_key = day_key(period_start), day_key(prev_start)
+
+        rows = await self.rollups.find(
+            {"day": {"$gte": prev_key}, "disease": {"$nin": [None, "Healthy"]}, "count": {"$gt": 0}},
+            {"_id": 0, "day": 1, "plant_part": 1, "disease": 1, "count": 1,
+             "confidence_sum": 1, "confidence_count": 1},
+        ).to_list(length=None)
+
+        # ── 1. Per (disease, part): period totals, previous count, daily counts
+        groups: Dict[tuple, Dict[str, Any]] = {}
+        for r in rows:
+            key = (r["disease"], (r.get("plant_part") or "unknown").lower())
+            g = groups.setdefault(key, {
+                "disease": key[0], "part": key[1], "count": 0, "prev_count": 0,
+                "confidence_sum": 0.0, "confidence_count": 0, "daily": {},
+            })
+            if r["day"] < period_key:
+                g["prev_count"] += r["count"]
+                continue
+            g["count"] += r["count"]
+            g["confidence_sum"] += r.get("confidence_sum") or 0
+            g["confidence_count"] += r.get("confidence_count") or 0
+            g["daily"][r["day"]] = g["daily"].get(r["day"], 0) + r["count"]
+
+        all_groups = sorted(
+            (g for g in groups.values() if g["count"] > 0),
+            key=lambda g: (-g["count"], g["disease"], g["part"]),
+        )
         if not all_groups:
             return {"has_data": False}
 
+        # Fill every date in the period so the chart has no gaps
+        all_dates = [
+            (period_start + timedelta(days=i)).strftime("%Y-%m-%d")
+            for i in range(days + 1)
+        ]
+
         # ── Helper: pick the top hit for a given part (or overall) ──
-        def _pick_top(groups, part_filter=None):
-            for g in groups:
-                p = (g["_id"].get("part") or "unknown").lower()
-                if part_filter is None or p == part_filter:
+        def _pick_top(part_filter=None):
+            for g in all_groups:
+                if part_filter is None or g["part"] == part_filter:
                     return g
             return None
 
+        # ── Helper: busiest ISO week, shown as its first – last active day
+        def _peak_week(daily: Dict[str, int]) -> str:
+            weeks: Dict[tuple, Dict[str, Any]] = {}
+            for day, count in sorted(daily.items()):
+                date = datetime.strptime(day, "%Y-%m-%d")
+                w = weeks.setdefault(date.isocalendar()[:2], {"count": 0, "min_date": date})
+                w["count"] += count
+                w["max_date"] = date
+            if not weeks:
+                return "N/A"
+            wd = max(weeks.values(), key=lambda w: w["count"])
+            return f"{wd['min_date'].strftime('%b %d')} – {wd['max_date'].strftime('%b %d, %Y')}"
+
         # ── Helper: build one spotlight dict ────────────────────
-        async def _build_spotlight(group) -> Dict[str, Any]:
-            disease_name = group["_id"]["disease"]
-            plant_part = (group["_id"]["part"] or "unknown").lower()
+        def _build_spotlight(group) -> Dict[str, Any]:
+            disease_name = group["disease"]
+            plant_part = group["part"]
             current_count = group["count"]
-            avg_conf = round(group["avg_confidence"], 4) if group["avg_confidence"] else 0
+            avg_conf = (
+                round(group["confidence_sum"] / group["confidence_count"], 4)
+                if group["confidence_count"] else 0
+            )
 
             # Previous period comparison
-            prev_pipeline = [
-                norm,
-                {"$match": {
-                    "created_at": {"$gte": prev_start, "$lt": period_start},
-                    "_disease": disease_name,
-                    "_part": {"$regex": f"^{plant_part}$", "$options": "i"},
-                }},
-                {"$count": "count"},
-            ]
-            prev_result = await self.analyses.aggregate(prev_pipeline).to_list(1)
-            prev_count = prev_result[0]["count"] if prev_result else 0
+            prev_count = group["prev_count"]
             if prev_count > 0:
                 trend_pct = round((current_count - prev_count) / prev_count * 100, 1)
             else:
                 trend_pct = 100.0 if current_count > 0 else 0.0
             trend_dir = "up" if trend_pct >= 0 else "down"
 
-            # Peak week
-            weekly_pipeline = [
-                norm,
-                {"$match": {
-                    "created_at": {"$gte": period_start},
-                    "_disease": disease_name,
-                    "_part": {"$regex": f"^{plant_part}$", "$options": "i"},
-                }},
-                {"$group": {
-                    "_id": {"$isoWeek": "$created_at"},
-                    "count": {"$sum": 1},
-                    "min_date": {"$min": "$created_at"},
-                    "max_date": {"$max": "$created_at"},
-                }},
-                {"$sort": {"count": -1}},
-                {"$limit": 1},
-            ]
-            week_result = await self.analyses.aggregate(weekly_pipeline).to_list(1)
-            if week_result:
-                wd = week_result[0]
-                peak_week = f"{wd['min_date'].strftime('%b %d')} – {wd['max_date'].strftime('%b %d, %Y')}"
-            else:
-                peak_week = "N/A"
-
             # Enrich from RECOMMENDATIONS_DB
             recs = RECOMMENDATIONS_DB.get(plant_part, {}).get(disease_name, {})
             cause = recs.get("causal_agent", "Unknown pathogen")
@@ -661,30 +719,8 @@ class AnalyticsService:
 
             prevention_tips = recs.get("prevention", recs.get("immediate", []))[:3]
 
-            # Daily trend – day-by-day detection count for this disease
-            daily_pipeline = [
-                norm,
-                {"$match": {
-                    "created_at": {"$gte": period_start},
-                    "_disease": disease_name,
-                    "_part": {"$regex": f"^{plant_part}$", "$options": "i"},
-                }},
-                {"$group": {
-                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
-                    "count": {"$sum": 1},
-                }},
-                {"$sort": {"_id": 1}},
-            ]
-            daily_raw = await self.analyses.aggregate(daily_pipeline).to_list(length=None)
-            daily_map = {r["_id"]: r["count"] for r in daily_raw}
-
-            # Fill every date in the period so the chart has no gaps
-            all_dates = [
-                (period_start + timedelta(days=i)).strftime("%Y-%m-%d")
-                for i in range(days + 1)
-            ]
             daily_trend = [
-                {"date": d, "count": daily_map.get(d, 0)}
+                {"date": d, "count": group["daily"].get(d, 0)}
                 for d in all_dates
             ]
 
@@ -701,20 +737,19 @@ class AnalyticsService:
                     "avg_confidence": avg_conf,
                     "vs_last_period_pct": abs(trend_pct),
                     "trend": trend_dir,
-                    "peak_week": peak_week,
+                    "peak_week": _peak_week(group["daily"]),
                 },
                 "daily_trend": daily_trend,
             }
 
         # ── 2. Build overall + per-part spotlights ───────────────
-        overall_group = all_groups[0]  # already sorted desc
-        overall = await _build_spotlight(overall_group)
+        overall = _build_spotlight(all_groups[0])  # already sorted desc
 
         per_part: Dict[str, Any] = {}
         for part in ("leaf", "fruit", "stem"):
-            grp = _pick_top(all_groups, part)
+            grp = _pick_top(part)
             if grp:
-                per_part[part] = await _build_spotlight(grp)
+                per_part[part] = _build_spotlight(grp)
             else:
                 per_part[part] = {"has_data": False, "plant_part": part}
 
@@ -729,22 +764,64 @@ class AnalyticsService:
     # ------------------------------------------------------------------
     async def get_full_ml_analytics(self, trend_days: int = 30) -> Dict[str, Any]:
         """Aggregate all ML analytics into a single response."""
-        overview = await self.get_overview()
-        disease_stats = await self.get_disease_detection_stats()
-        model_eval = self.get_model_evaluation()
-        trends = await self.get_detection_trends(days=trend_days)
-        confidence = await self.get_confidence_distribution()
-        parts = await self.get_part_distribution()
-        recent = await self.get_recent_analyses()
-        scatter_data = await self.get_scatter_plot_data()
+        # One $facet pass over the rollups for every KPI section, run
+        # concurrently with the two feeds that read the analyses themselves
+        kpis, recent, scatter_data = await asyncio.gather(
+            self._rollup_kpis(trend_days),
+            self.get_recent_analyses(),
+            self.get_scatter_plot_data(),
+        )
 
         return {
-            "overview": overview,
-            "disease_stats": disease_stats,
-            "model_evaluation": model_eval,
-            "detection_trends": trends,
-            "confidence_distribution": confidence,
-            "part_distribution": parts,
+            "overview": kpis["overview"],
+            "disease_stats": kpis["disease_stats"],
+            "model_evaluation": self.get_model_evaluation(),
+            "detection_trends": kpis["detection_trends"],
+            "confidence_distribution": kpis["confidence_distribution"],
+            "part_distribution": kpis["part_distribution"],
             "recent_analyses": recent,
             "scatter_plot_data": scatter_data,
         }
+
+
+class SpotlightWarmer:
+    """
+    Recomputes the featured-disease spotlight for the common `days`
+    windows every few minutes, so the Trends tab (open to every user)
+    is served from the cache instead of triggering the computation.
+    Other windows are still computed on demand and cached.
+    """
+
+    def __init__(self, windows: List[int], interval: float):
+        self.windows = windows
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        if self._task is None and self.windows and analytics_cache.enabled:
+            self._task = asyncio.create_task(self._run(db), name="spotlight-warmer")
+            logger.info(f"🔦 Spotlight warmer started (windows {self.windows}, every {self.interval:.0f}s)")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, db: AsyncIOMotorDatabase) -> None:
+        service = AnalyticsService(db)
+        while True:
+            for days in self.windows:
+                try:
+                    # Same keyword form as the route, so it refreshes the entry requests read
+                    await AnalyticsService.get_featured_disease_spotlight.refresh(service, days=days)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"❌ Spotlight refresh for {days} days failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+spotlight_warmer = SpotlightWarmer(
+    get_settings().spotlight_windows, get_settings().spotlight_refresh_seconds
+)
@@ -1,15 +1,20 @@
+import time
+import uuid
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
 
 from app.config import get_settings
 from app.schemas.token import Token, TokenData
+from app.utils.password_hasher import PasswordHasherBusy, password_hasher
 from app.utils.security import verify_password, get_password_hash
 
 settings = get_settings()
 
+REFRESH_TOKEN_LIFETIME = timedelta(days=30)
+
 
 class AuthService:
     """Service for authentication and JWT token management"""
@@ -38,7 +43,7 @@ class AuthService:
                 minutes=settings.access_token_expire_minutes
             )
         
-        to_encode.update({"exp": expire, "type": "access"})
+        to_encode.update({"exp": expire, "iat": datetime.utcnow(), "type": "access"})
         
         encoded_jwt = jwt.encode(
             to_encode,
@@ -50,22 +55,36 @@ class AuthService:
     @staticmethod
     def create_refresh_token(
         data: Dict[str, Any],
-        expires_delta: timedelta = timedelta(days=30)
+        expires_delta: timedelta = REFRESH_TOKEN_LIFETIME
     ) -> str:
         """
         Create a JWT refresh token (longer expiration)
         
+        Every refresh token has its own id (jti) and belongs to a family
+        (fam): the chain of tokens rotated from one sign-in, which is what
+        logout revokes (see services/token_revocation.py).
+        
         Args:
-            data: Data to encode in token
+            data: Data to encode in token (a "fam" claim continues that family)
             expires_delta: Expiration time (default 30 days)
             
         Returns:
             JWT refresh token string
         """
         to_encode = data.copy()
-        expire = datetime.utcnow() + expires_delta
+        issued = time.time()
+        now = datetime.utcfromtimestamp(issued)
+        expire = now + expires_delta
         
-        to_encode.update({"exp": expire, "type": "refresh"})
+        to_encode.setdefault("fam", uuid.uuid4().hex)
+        to_encode.update({
+            "exp": expire,
+            "iat": now,
+            # iat is whole seconds; revocation cutoffs need finer ordering
+            "iat_ms": int(issued * 1000),
+            "jti": uuid.uuid4().hex,
+            "type": "refresh",
+        })
         
         encoded_jwt = jwt.encode(
             to_encode,
@@ -121,7 +140,13 @@ class AuthService:
             raise credentials_exception
     
     @staticmethod
-    def create_tokens(user_id: str, email: str, role: str = "user") -> Dict[str, str]:
+    def create_tokens(
+        user_id: str,
+        email: str,
+        role: str = "user",
+        family: Optional[str] = None,
+        **claims: Any
+    ) -> Dict[str, str]:
         """
         Create both access and refresh tokens for a user
         
@@ -129,14 +154,18 @@ class AuthService:
             user_id: User's MongoDB ID
             email: User's email
             role: User's role (default: "user")
+            family: Refresh-token family to continue (None starts a new one)
+            **claims: Extra profile claims for the access token only
+                (see profile_claims)
             
         Returns:
             Dictionary with access_token and refresh_token
         """
         token_data = {"user_id": user_id, "email": email, "role": role}
         
-        access_token = AuthService.create_access_token(data=token_data)
-        refresh_token = AuthService.create_refresh_token(data=token_data)
+        access_token = AuthService.create_access_token(data={**token_data, **claims})
+        refresh_data = {**token_data, "fam": family} if family else token_data
+        refresh_token = AuthService.create_refresh_token(data=refresh_data)
         
         return {
             "access_token": access_token,
@@ -144,6 +173,25 @@ class AuthService:
             "token_type": "bearer",
         }
     
+    @staticmethod
+    def profile_claims(user) -> Dict[str, Any]:
+        """
+        Claims that let get_current_user answer from the access token alone
+        (when AUTH_TRUST_TOKEN_CLAIMS_SECONDS allows it)
+        
+        Args:
+            user: UserRead the tokens are issued for
+            
+        Returns:
+            Keyword arguments for create_tokens
+        """
+        return {
+            "full_name": user.full_name,
+            "profile_picture": user.profile_picture,
+            "is_active": user.is_active,
+            "created_at": user.created_at.isoformat() if user.created_at else None,
+        }
+    
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a plain password against a hashed password"""
@@ -153,6 +201,40 @@ class AuthService:
     def get_password_hash(password: str) -> str:
         """Hash a password"""
         return get_password_hash(password)
+    
+    @staticmethod
+    async def hash_password(password: str) -> str:
+        """Hash a password in the password-hashing pool, off the event loop"""
+        try:
+            return await password_hasher.hash(password)
+        except PasswordHasherBusy:
+            raise _busy_exception()
+    
+    @staticmethod
+    async def verify_and_update_password(
+        plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password in the password-hashing pool
+        
+        Returns:
+            (matches, new_hash) - new_hash replaces a stored hash with outdated parameters
+            
+        Raises:
+            HTTPException: 503 when too many logins are already waiting
+        """
+        try:
+            return await password_hasher.verify_and_update(plain_password, hashed_password)
+        except PasswordHasherBusy:
+            raise _busy_exception()
+
+
+def _busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in attempts in progress, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
 
 
 # Create singleton instance
@@ -1,11 +1,22 @@
+import asyncio
 import os
+import random
+import time
+from typing import Optional
+
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
+import httpx
+from cloudinary.utils import api_sign_request
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Responses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
 class CloudinaryService:
     def __init__(self):
         cloudinary.config(
@@ -15,7 +26,15 @@ class CloudinaryService:
             secure=True
         )
         self.upload_folder = os.getenv('CLOUDINARY_UPLOAD_FOLDER', 'tomato_guard')
-    
+
+        # Async uploader settings
+        self.max_concurrent_uploads = int(os.getenv('CLOUDINARY_MAX_CONCURRENT_UPLOADS', '8'))
+        self.max_retries = int(os.getenv('CLOUDINARY_UPLOAD_RETRIES', '3'))
+        self.retry_base_delay = float(os.getenv('CLOUDINARY_RETRY_BASE_DELAY', '0.5'))
+        self.retry_max_delay = float(os.getenv('CLOUDINARY_RETRY_MAX_DELAY', '8.0'))
+        self._client: Optional[httpx.AsyncClient] = None
+        self._upload_semaphore = asyncio.Semaphore(self.max_concurrent_uploads)
+
     def upload_image(self, file):
         """Upload image to Cloudinary"""
         try:
@@ -24,16 +43,94 @@ class CloudinaryService:
                 folder=self.upload_folder,
                 resource_type="image"
             )
-            return {
-                "public_id": upload_result["public_id"],
-                "url": upload_result["secure_url"],
-                "format": upload_result["format"],
-                "width": upload_result["width"],
-                "height": upload_result["height"]
-            }
+            return self._format_upload_result(upload_result)
         except Exception as e:
             raise Exception(f"Cloudinary upload failed: {str(e)}")
-    
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Lazily create the pooled HTTP client (reused across uploads)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrent_uploads,
+                    max_keepalive_connections=self.max_concurrent_uploads,
+                    keepalive_expiry=60.0,
+                ),
+            )
+        return self._client
+
+    def _retry_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+
+    async def upload_image_async(self, file: bytes, public_id: Optional[str] = None):
+        """
+        Upload image bytes to Cloudinary without blocking the event loop.
+
+        Uses a persistent connection pool, caps concurrent uploads per
+        process and retries transient failures with jittered backoff.
+        When public_id is given the upload does not overwrite an existing
+        asset, so re-uploading identical content is a no-op.
+        """
+        config = cloudinary.config()
+        url = f"https://api.cloudinary.com/v1_1/{config.cloud_name}/image/upload"
+
+        params = {"timestamp": int(time.time()), "folder": self.upload_folder}
+        if public_id:
+            params.update({"public_id": public_id, "overwrite": "false"})
+        data = {
+            **params,
+            "signature": api_sign_request(params, config.api_secret),
+            "api_key": config.api_key,
+        }
+
+        client = self._get_client()
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._upload_semaphore:
+                    response = await client.post(
+                        url, data=data, files={"file": ("upload", file)}
+                    )
+                if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                    last_error = f"HTTP {response.status_code}"
+                    await asyncio.sleep(self._retry_delay(attempt))
+                    continue
+                response.raise_for_status()
+                return self._format_upload_result(response.json())
+            except httpx.TransportError as e:
+                last_error = str(e) or e.__class__.__name__
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self._retry_delay(attempt))
+                    continue
+            except httpx.HTTPStatusError as e:
+                raise Exception(
+                    f"Cloudinary upload failed: HTTP {e.response.status_code} {e.response.text[:200]}"
+                )
+            except Exception as e:
+                raise Exception(f"Cloudinary upload failed: {str(e)}")
+
+        raise Exception(
+            f"Cloudinary upload failed after {self.max_retries + 1} attempts: {last_error}"
+        )
+
+    async def aclose(self):
+        """Close the pooled HTTP client (called on application shutdown)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    @staticmethod
+    def _format_upload_result(upload_result):
+        return {
+            "public_id": upload_result["public_id"],
+            "url": upload_result["secure_url"],
+            "format": upload_result["format"],
+            "width": upload_result["width"],
+            "height": upload_result["height"]
+        }
+
     def get_upload_config(self):
         """Get configuration for frontend upload"""
         return {
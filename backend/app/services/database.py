@@ -22,7 +22,17 @@ async def connect_to_mongo() -> None:
     print(f"📡 Connecting to MongoDB: {safe_uri}")
     
     try:
-        _client = AsyncIOMotorClient(uri)
+        if uri.startswith("mongomock://"):
+            # In-memory Motor-compatible fake for load tests / offline runs
+            try:
+                from mongomock_motor import AsyncMongoMockClient
+            except ImportError:
+                raise ValueError(
+                    "mongomock:// URIs require the mongomock-motor package (pip install -r requirements-dev.txt)"
+                )
+            _client = AsyncMongoMockClient()
+        else:
+            _client = AsyncIOMotorClient(uri)
         
         # Test connection
         await _client.admin.command('ping')
@@ -0,0 +1,246 @@
+"""
+Streaming bulk export of analyses.
+
+Analyses matching an AnalysisExportFilters selection are read with one
+MongoDB cursor (server-side projection of the export columns, oldest
+first on (created_at, _id)) and encoded batch by batch as NDJSON, CSV or
+Parquet, so memory stays flat however many rows are exported. The admin
+endpoint streams the chunks with chunked transfer encoding; the CLI
+(scripts/export_analyses.py) writes them to a file.
+
+Every row can carry a `cursor` column: the continuation token of that
+row. Passing the last one received as AnalysisExportFilters.cursor
+resumes an interrupted export right after it.
+
+Parquet needs pyarrow (pip install pyarrow), which is optional; each
+batch becomes one row group.
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.models.analysis_model import AnalysisExportFilters
+from app.utils.pagination import KEYSET_SORT_ASC, encode_cursor, keyset_filter
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+EXPORT_COLUMNS = [
+    "id", "created_at", "user_id", "plant_part", "disease", "confidence", "severity",
+    "is_favorite", "processing_time", "image_url", "tags", "notes",
+]
+
+EXPORT_PROJECTION = {
+    "created_at": 1, "user_id": 1, "plant_part": 1, "disease": 1, "confidence": 1, "severity": 1,
+    "is_favorite": 1, "metadata.processing_time": 1, "image_url": 1, "tags": 1, "notes": 1,
+}
+
+
+class ExportUnavailable(Exception):
+    """The requested export format needs an optional dependency that is not installed"""
+
+
+def export_query(filters: AnalysisExportFilters) -> Dict[str, Any]:
+    """MongoDB filter for a selection; raises ValueError for a bad cursor"""
+    query: Dict[str, Any] = {}
+    if filters.plant_part:
+        query["plant_part"] = filters.plant_part.lower()
+    if filters.disease:
+        query["disease"] = filters.disease
+
+    created_at: Dict[str, Any] = {}
+    if filters.date_from:
+        created_at["$gte"] = filters.date_from
+    if filters.date_to:
+        created_at["$lte"] = filters.date_to
+    if created_at:
+        query["created_at"] = created_at
+
+    confidence: Dict[str, Any] = {}
+    if filters.min_confidence is not None:
+        confidence["$gte"] = filters.min_confidence
+    if filters.max_confidence is not None:
+        confidence["$lte"] = filters.max_confidence
+    if confidence:
+        query["confidence"] = confidence
+
+    query.update(keyset_filter(filters.cursor, ascending=True))
+    return query
+
+
+def export_row(document: Dict[str, Any], with_cursor: bool = False) -> Dict[str, Any]:
+    row = {
+        "id": str(document["_id"]),
+        "created_at": document.get("created_at"),
+        "user_id": document.get("user_id"),
+        "plant_part": document.get("plant_part"),
+        "disease": document.get("disease"),
+        "confidence": document.get("confidence"),
+        "severity": document.get("severity"),
+        "is_favorite": bool(document.get("is_favorite", False)),
+        "processing_time": (document.get("metadata") or {}).get("processing_time"),
+        "image_url": document.get("image_url"),
+        "tags": list(document.get("tags") or []),
+        "notes": document.get("notes"),
+    }
+    if with_cursor:
+        row["cursor"] = encode_cursor(document["created_at"], document["_id"]) if document.get("created_at") else None
+    return row
+
+
+class AnalysisExporter:
+    """Encodes a filtered analyses cursor as a stream of byte chunks"""
+
+    def __init__(self, database: AsyncIOMotorDatabase, batch_size: int = 1000):
+        self.analyses = database.analyses
+        self.batch_size = batch_size
+
+    async def batches(self, filters: AnalysisExportFilters, with_cursor: bool = False,
+                      limit: Optional[int] = None,
+                      on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                      ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Export rows, batch_size at a time, oldest first; on_batch sees each batch first"""
+        cursor = self.analyses.find(export_query(filters), EXPORT_PROJECTION) \
+            .sort(KEYSET_SORT_ASC).batch_size(self.batch_size)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        batch: List[Dict[str, Any]] = []
+        exported = 0
+        async for document in cursor:
+            batch.append(export_row(document, with_cursor))
+            if len(batch) >= self.batch_size:
+                exported += len(batch)
+                if on_batch:
+                    on_batch(batch)
+                yield batch
+                batch = []
+        if batch:
+            exported += len(batch)
+            if on_batch:
+                on_batch(batch)
+            yield batch
+        logger.info(f"📦 Exported {exported} analyses")
+
+    def stream(
+        self,
+        fmt: str,
+        filters: AnalysisExportFilters,
+        with_cursor: bool = False,
+        limit: Optional[int] = None,
+        header: bool = True,
+        on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Byte chunks of the export in `fmt` (see EXPORT_FORMATS). NDJSON and
+        CSV yield one chunk per batch, after on_batch has seen it; header=False
+        leaves out the CSV header (for appending to an earlier export).
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(EXPORT_FORMATS)})")
+        export_query(filters)  # validate the cursor before the response starts
+        columns = EXPORT_COLUMNS + (["cursor"] if with_cursor else [])
+        batches = self.batches(filters, with_cursor, limit, on_batch)
+
+        if fmt == "ndjson":
+            return self._ndjson(batches)
+        if fmt == "csv":
+            return self._csv(batches, columns, header)
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ExportUnavailable("Parquet export needs pyarrow (pip install pyarrow)") from e
+        return self._parquet(batches, columns)
+
+    @staticmethod
+    async def _ndjson(batches) -> AsyncIterator[bytes]:
+        async for batch in batches:
+            yield "".join(json.dumps(row, default=_json_default) + "\n" for row in batch).encode()
+
+    @staticmethod
+    async def _csv(batches, columns: List[str], header: bool = True) -> AsyncIterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns)
+        if header:
+            writer.writeheader()
+        async for batch in batches:
+            for row in batch:
+                writer.writerow({
+                    **row,
+                    "created_at": row["created_at"].isoformat() if row["created_at"] else "",
+                    "tags": ";".join(row["tags"]),
+                })
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    @staticmethod
+    async def _parquet(batches, columns: List[str]) -> AsyncIterator[bytes]:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {
+            "created_at": pa.timestamp("ms"),
+            "confidence": pa.float64(),
+            "processing_time": pa.float64(),
+            "is_favorite": pa.bool_(),
+            "tags": pa.list_(pa.string()),
+        }
+        schema = pa.schema([(c, types.get(c, pa.string())) for c in columns])
+
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        try:
+            async for batch in batches:
+                # Encoding and compressing a row group is CPU work: keep it off the loop
+                table = pa.Table.from_pylist(batch, schema=schema)
+                await asyncio.to_thread(writer.write_table, table)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        finally:
+            writer.close()
+        yield sink.drain()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain()"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
@@ -32,7 +32,10 @@ class GeminiService:
     def __init__(self):
         self.api_key = os.getenv("GROQ_API_KEY")
         self.model = "llama-3.1-8b-instant"
-        self.base_url = "https://api.groq.com/openai/v1/chat/completions"
+        # Overridable so load tests can point at a local stub endpoint
+        self.base_url = os.getenv(
+            "GROQ_BASE_URL", "https://api.groq.com/openai/v1/chat/completions"
+        )
 
         if not self.api_key:
             raise ValueError("GROQ_API_KEY not found in environment variables")
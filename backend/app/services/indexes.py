@@ -0,0 +1,190 @@
+"""
+Declarative index registry.
+
+Every index the app relies on is listed in INDEXES, per collection. On
+startup the registry is ensured in a background task (create_index is
+idempotent, and existing indexes are skipped), so a slow build on a large
+collection never delays the app coming up. Indexes that cannot be created
+(e.g. a key conflict with an older definition, or duplicates preventing a
+unique index) are logged and reported, never dropped automatically.
+
+IndexManager.report() compares the registry with the live indexes: registered
+indexes that are missing, live indexes nobody registered, and indexes
+with no recorded accesses ($indexStats, counted since the last mongod
+restart). Query plans for the hot queries are checked by
+scripts/check_query_plans.py.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "analyses": [
+        # History / per-user listings, keyset-paginated on (created_at, _id)
+        # (user_id alone is covered by the prefix)
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("is_favorite", DESCENDING)]),
+        # Canonical summary fields (see analysis_service.canonical_fields)
+        IndexModel([("disease", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("plant_part", ASCENDING), ("disease", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("confidence", ASCENDING)]),
+        IndexModel([("severity", ASCENDING)]),
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("schema_version", ASCENDING)]),
+        IndexModel([("tags", ASCENDING)]),
+        IndexModel(
+            [("notes", TEXT), ("tags", TEXT), ("disease", TEXT), ("plant_part", TEXT)],
+            name="analysis_text",
+        ),
+    ],
+    "analytics_rollups": [
+        IndexModel([("day", ASCENDING), ("plant_part", ASCENDING), ("disease", ASCENDING)], unique=True),
+    ],
+    "notifications": [
+        IndexModel([("recipient_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("recipient_id", ASCENDING), ("is_read", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "posts": [
+        IndexModel([("created_at", DESCENDING)]),
+        IndexModel([("category", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("author_id", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("likes", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel(
+            [("firebase_uid", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"firebase_uid": {"$type": "string"}},
+        ),
+    ],
+    "refresh_token_revocations": [
+        # Dropped once the tokens they revoke have expired anyway
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        # Incremental sync of each worker's revocation filter
+        IndexModel([("revoked_at", ASCENDING)]),
+    ],
+    "upload_outbox": [
+        # The two branches of the worker's claim query
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)]),
+    ],
+}
+
+
+def _spec(model: IndexModel) -> Dict[str, Any]:
+    document = model.document
+    return {"name": document["name"], "key": list(document["key"].items())}
+
+
+class IndexManager:
+    """Ensures the registry in the background and reports on index health"""
+
+    def __init__(self, registry: Dict[str, List[IndexModel]] = INDEXES):
+        self.registry = registry
+        self.last_result: Dict[str, Dict[str, str]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Ensure indexes without blocking startup (called from on_startup)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._ensure_logged(db), name="ensure-indexes")
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _ensure_logged(self, db: AsyncIOMotorDatabase) -> None:
+        try:
+            await self.ensure(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Index ensure failed: {e}")
+
+    async def ensure(
+        self, db: AsyncIOMotorDatabase, collections: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, str]]:
+        """Create every missing registered index. Returns {collection: {name: outcome}}"""
+        results: Dict[str, Dict[str, str]] = {}
+        for collection_name, models in self.registry.items():
+            if collections is not None and collection_name not in collections:
+                continue
+            collection = db[collection_name]
+            existing = await collection.index_information()
+            outcomes: Dict[str, str] = {}
+            for model in models:
+                name = model.document["name"]
+                if name in existing:
+                    outcomes[name] = "exists"
+                    continue
+                try:
+                    await collection.create_indexes([model])
+                    outcomes[name] = "created"
+                    logger.info(f"🗂️ Created index {collection_name}.{name}")
+                except OperationFailure as e:
+                    outcomes[name] = f"failed: {e.details.get('errmsg', str(e)) if e.details else e}"
+                    logger.error(f"❌ Could not create index {collection_name}.{name}: {e}")
+            results[collection_name] = outcomes
+        self.last_result.update(results)
+
+        created = sum(1 for o in results.values() for v in o.values() if v == "created")
+        failed = sum(1 for o in results.values() for v in o.values() if v.startswith("failed"))
+        logger.info(f"✅ Indexes ensured ({created} created, {failed} failed)")
+        return results
+
+    async def report(self, db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        """Registered vs live indexes per collection, with access counts when available"""
+        report: Dict[str, Any] = {}
+        for collection_name, models in self.registry.items():
+            collection = db[collection_name]
+            live = await collection.index_information()
+
+            try:
+                stats = await collection.aggregate([{"$indexStats": {}}]).to_list(length=None)
+                usage = {s["name"]: s["accesses"] for s in stats}
+            except Exception:
+                usage = None  # not supported (e.g. mongomock) or not permitted
+
+            registered = {}
+            for model in models:
+                spec = _spec(model)
+                name = spec["name"]
+                entry = {"key": spec["key"], "present": name in live}
+                if usage is not None and name in usage:
+                    entry["ops"] = usage[name]["ops"]
+                    entry["since"] = usage[name]["since"]
+                if name in self.last_result.get(collection_name, {}):
+                    entry["last_ensure"] = self.last_result[collection_name][name]
+                registered[name] = entry
+
+            unregistered = {
+                name: {"key": info["key"]}
+                for name, info in live.items()
+                if name != "_id_" and name not in registered
+            }
+            for name, entry in unregistered.items():
+                if usage is not None and name in usage:
+                    entry["ops"] = usage[name]["ops"]
+
+            report[collection_name] = {
+                "indexes": registered,
+                "missing": [n for n, e in registered.items() if not e["present"]],
+                "unregistered": unregistered,
+                "unused": None if usage is None else sorted(
+                    name for name, accesses in usage.items()
+                    if name != "_id_" and accesses["ops"] == 0
+                ),
+            }
+        return report
+
+
+index_manager = IndexManager()
@@ -1,4 +1,3 @@
-import tensorflow as tf
 import numpy as np
 from PIL import Image, ImageEnhance, ImageOps
 import io
@@ -225,6 +224,85 @@ class TomatoValidator:
         }
 
 
+class PlantRegionProposer:
+    """
+    Proposes candidate plant-part regions (leaves, fruits, stems) in a photo
+    so that several parts can be classified from a single upload.
+
+    Uses the same HSV colour ranges as TomatoValidator, computed on a
+    downscaled copy of the image so proposal cost stays small even for
+    12 MP phone photos.
+    """
+
+    WORKING_SIZE = 512              # Longest side used for segmentation
+    MIN_REGION_AREA_RATIO = 0.02    # Ignore blobs smaller than 2 % of the frame
+    MAX_REGIONS = 8                 # Upper bound on crops sent to the models
+    BOX_PADDING = 0.10              # Grow each box by 10 % for context
+
+    def propose(self, image) -> List[Dict[str, Any]]:
+        """
+        Return candidate regions as boxes in original image coordinates,
+        largest first.
+
+        Args:
+            image: BGR numpy array (as returned by cv2.imdecode)
+        """
+        height, width = image.shape[:2]
+        scale = min(1.0, self.WORKING_SIZE / max(height, width))
+        if scale < 1.0:
+            small = cv2.resize(
+                image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                interpolation=cv2.INTER_AREA
+            )
+        else:
+            small = image
+
+        # Union of all plant-like colour masks
+        hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+        mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
+        for color_range in TomatoValidator.PLANT_COLOR_RANGES:
+            mask |= cv2.inRange(hsv, color_range['lower'], color_range['upper'])
+
+        # Remove speckle, then merge nearby fragments of the same leaf/fruit
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7, 7))
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel, iterations=2)
+
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        small_h, small_w = mask.shape[:2]
+        frame_area = float(small_h * small_w)
+        min_area = self.MIN_REGION_AREA_RATIO * frame_area
+
+        candidates = []
+        for contour in contours:
+            area = cv2.contourArea(contour)
+            if area < min_area:
+                continue
+            x, y, w, h = cv2.boundingRect(contour)
+            candidates.append((area, x, y, w, h))
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+
+        regions = []
+        for area, x, y, w, h in candidates[:self.MAX_REGIONS]:
+            pad_x = int(w * self.BOX_PADDING)
+            pad_y = int(h * self.BOX_PADDING)
+            x0 = max(0, int((x - pad_x) / scale))
+            y0 = max(0, int((y - pad_y) / scale))
+            x1 = min(width, int((x + w + pad_x) / scale))
+            y1 = min(height, int((y + h + pad_y) / scale))
+            regions.append({
+                'x': x0,
+                'y': y0,
+                'width': x1 - x0,
+                'height': y1 - y0,
+                'area_ratio': round(area / frame_area, 4),
+            })
+
+        return regions
+
+
 class TomatoImagePreprocessor:
     """Preprocess user-uploaded images to match training data characteristics"""
     def __init__(self):
@@ -302,13 +380,14 @@ class TomatoImagePreprocessor:
         }
 
 class MLService:
-    def __init__(self, model_path: str = "models/"):
+    def __init__(self, model_path: str = "models/", autoload: bool = True):
         self.model_path = model_path
         self.models = {}
         self.loaded_models_info = []  # Track loaded models
         self.preprocessor = TomatoImagePreprocessor()  # NEW: Add preprocessor
         self.spot_detector = DiseaseSpotDetector()
         self.validator = TomatoValidator()  # NEW: Add tomato validator
+        self.region_proposer = PlantRegionProposer()
         # Updated class names to match your evaluation results
         self.class_names = {
             'part': ['fruit', 'leaf','non_tomato', 'stem'],
@@ -316,7 +395,9 @@ class MLService:
             'leaf': ['Bacterial Spot', 'Early Blight', 'Healthy', 'Late Blight', 'Septoria Leaf Spot', 'Yellow Leaf Curl'],
             'stem': ['Blight', 'Healthy', 'Wilt']  # Fixed order to match your confusion matrix
         }
-        self.load_models()
+        # autoload=False lets benchmarks attach their own (e.g. stub) models
+        if autoload:
+            self.load_models()
     
     def load_models(self):
         """Load all trained models with verification"""
@@ -341,7 +422,9 @@ class MLService:
                 print(f"📦 Loading {model_name} model from: {filename}")
                 start_time = time.time()
                 
-                # Load the model
+                # Load the model (TensorFlow is imported lazily so the
+                # service can be built with stub models where TF is absent)
+                import tensorflow as tf
                 model = tf.keras.models.load_model(model_path)
                 self.models[model_name] = model
                 
@@ -538,6 +621,10 @@ class MLService:
             raise ValueError("Part classifier model not loaded")
             
         predictions = self.models['part'].predict(image_array, verbose=0)[0]
+        return self._part_from_scores(predictions)
+
+    def _part_from_scores(self, predictions):
+        """Build a part_detection dict from one row of part classifier output"""
         part_idx = np.argmax(predictions)
         confidence = float(predictions[part_idx])
         part_name = self.class_names['part'][part_idx]
@@ -594,6 +681,203 @@ class MLService:
                 'tta_used': result.get('tta_used', False)
             }
     
+    def _disease_from_scores(self, predictions, part):
+        """
+        Build a disease_detection dict from one row of disease model output.
+        Mirrors the single-pass (no TTA) result of predict_disease.
+        """
+        class_names = self.class_names[part]
+        predicted_idx = np.argmax(predictions)
+        confidence = float(predictions[predicted_idx])
+
+        if confidence < 0.6:
+            top_indices = np.argsort(predictions)[-2:][::-1]
+            primary, secondary = class_names[top_indices[0]], class_names[top_indices[1]]
+            primary_conf = float(predictions[top_indices[0]])
+            return {
+                'disease': primary,
+                'confidence': primary_conf,
+                'alternative_disease': secondary,
+                'alternative_confidence': float(predictions[top_indices[1]]),
+                'is_low_confidence': True,
+                'warning': f"Low confidence ({primary_conf:.1%}). Could also be: {secondary}",
+                'tta_used': False
+            }
+        return {
+            'disease': class_names[predicted_idx],
+            'confidence': confidence,
+            'is_low_confidence': False,
+            'tta_used': False
+        }
+
+    def analyze_image_regions(self, image_bytes, max_regions=None) -> Dict[str, Any]:
+        """
+        Multi-object analysis: propose plant regions, then classify every
+        crop in one batched pass through the part model and one batched pass
+        per detected part through the disease models.
+
+        Returns per-region results with boxes. The top-level part_detection /
+        disease_detection mirror the primary region so records stay
+        compatible with single-object analyses.
+        """
+        import time as _time
+        from .recommendations import get_recommendations
+
+        timings = {}
+        pipeline_start = _time.perf_counter()
+        loaded_models = [info['name'] for info in self.loaded_models_info]
+
+        if 'part' not in self.models:
+            raise ValueError("Part classifier model not loaded")
+
+        # ── Decode once, propose regions ──
+        t0 = _time.perf_counter()
+        nparr = np.frombuffer(image_bytes, np.uint8)
+        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        if image is None:
+            raise Exception("Image preprocessing failed: could not decode image")
+        height, width = image.shape[:2]
+
+        boxes = self.region_proposer.propose(image)
+        if max_regions:
+            boxes = boxes[:max_regions]
+        if not boxes:
+            # Nothing segmented - fall back to the whole frame as one region
+            boxes = [{'x': 0, 'y': 0, 'width': width, 'height': height, 'area_ratio': 1.0}]
+        timings['region_proposal'] = round(_time.perf_counter() - t0, 3)
+
+        # ── Preprocess every crop into one batch ──
+        t0 = _time.perf_counter()
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        crops = []
+        for box in boxes:
+            crop = rgb[box['y']:box['y'] + box['height'], box['x']:box['x'] + box['width']]
+            crop_array, _ = self.preprocessor.preprocess_for_prediction(Image.fromarray(crop))
+            crops.append(crop_array)
+        batch = np.concatenate(crops, axis=0)
+        timings['preprocessing'] = round(_time.perf_counter() - t0, 3)
+
+        # ── Step 1: part classification, single batched inference ──
+        t0 = _time.perf_counter()
+        part_scores = self.models['part'].predict(batch, verbose=0)
+        part_results = [self._part_from_scores(scores) for scores in part_scores]
+        timings['part_classification'] = round(_time.perf_counter() - t0, 3)
+
+        # ── Step 2: disease classification, one batch per plant part ──
+        t0 = _time.perf_counter()
+        disease_results: Dict[int, Dict[str, Any]] = {}
+        rejections: Dict[int, str] = {}
+        indices_by_part: Dict[str, List[int]] = {}
+        for idx, part_result in enumerate(part_results):
+            if part_result['part'] == 'non_tomato':
+                rejections[idx] = 'Region classified as non_tomato'
+                continue
+            validation = self.validator.validate(image_bytes, part_result)
+            if not validation['is_valid']:
+                rejections[idx] = validation['rejection_reason']
+                continue
+            if part_result['part'] not in self.models:
+                rejections[idx] = f"No model available for part: {part_result['part']}"
+                continue
+            indices_by_part.setdefault(part_result['part'], []).append(idx)
+
+        for part, indices in indices_by_part.items():
+            scores = self.models[part].predict(batch[indices], verbose=0)
+            for idx, row in zip(indices, scores):
+                disease_results[idx] = self._disease_from_scores(row, part)
+        timings['disease_classification'] = round(_time.perf_counter() - t0, 3)
+
+        # ── Step 3: assemble per-region results ──
+        recommendations_cache: Dict[tuple, Dict[str, Any]] = {}
+        regions = []
+        for idx, box in enumerate(boxes):
+            part_result = part_results[idx]
+            disease_result = disease_results.get(idx)
+            region = {
+                'region_id': idx,
+                'box': box,
+                'is_tomato': disease_result is not None,
+                'part_detection': part_result,
+                'disease_detection': disease_result,
+            }
+            if disease_result is None:
+                region['rejection_reason'] = rejections.get(idx)
+            else:
+                key = (part_result['part'], disease_result['disease'])
+                if key not in recommendations_cache:
+                    try:
+                        recommendations_cache[key] = get_recommendations(
+                            key[0], key[1], disease_result['confidence']
+                        )
+                    except Exception as e:
+                        recommendations_cache[key] = {
+                            "error": f"Failed to get recommendations: {str(e)}",
+                            "disease": key[1],
+                            "plant_part": key[0],
+                        }
+                region['recommendations'] = recommendations_cache[key]
+            regions.append(region)
+
+        # Primary region: most confident diseased region, else largest tomato region
+        tomato_regions = [r for r in regions if r['is_tomato']]
+        diseased = [r for r in tomato_regions if r['disease_detection']['disease'] != 'Healthy']
+        if diseased:
+            primary = max(diseased, key=lambda r: r['disease_detection']['confidence'])
+        elif tomato_regions:
+            primary = tomato_regions[0]
+        else:
+            primary = regions[0]
+
+        # ── Step 4: one annotated image with every region ──
+        t0 = _time.perf_counter()
+        annotated = image.copy()
+        for region in regions:
+            box = region['box']
+            color = (0, 165, 255) if region['is_tomato'] else (128, 128, 128)
+            if region['disease_detection']:
+                label = f"{region['region_id'] + 1}: {region['disease_detection']['disease']}"
+            else:
+                label = f"{region['region_id'] + 1}: {region['part_detection']['part']}"
+            cv2.rectangle(annotated, (box['x'], box['y']),
+                          (box['x'] + box['width'], box['y'] + box['height']), color, 3)
+            cv2.putText(annotated, label, (box['x'], max(20, box['y'] - 10)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+        annotated_base64 = self.spot_detector.image_to_base64(annotated)
+        timings['annotation'] = round(_time.perf_counter() - t0, 3)
+
+        timings['total'] = round(_time.perf_counter() - pipeline_start, 3)
+
+        return {
+            'mode': 'multi_object',
+            'is_tomato': bool(tomato_regions),
+            'part_detection': primary['part_detection'],
+            'disease_detection': primary['disease_detection'],
+            'spot_detection': None,
+            'recommendations': primary.get('recommendations'),
+            'primary_region_id': primary['region_id'],
+            'regions': regions,
+            'total_regions': len(regions),
+            'annotated_image': annotated_base64,
+            'image_info': {
+                'original_size': (width, height),
+                'target_size': self.preprocessor.target_size,
+                'method': 'enhanced',
+            },
+            'model_info': {
+                'loaded_models': loaded_models,
+                'total_models': len(self.loaded_models_info),
+                'analysis_timestamp': datetime.now().isoformat(),
+                'preprocessing_method': 'enhanced',
+                'bounding_boxes_enabled': True,
+                'validation_gate': 'per_region',
+            },
+            'performance': {
+                'timings': timings,
+                'total_seconds': timings.get('total', 0),
+                'summary': f"Total: {timings.get('total', 0)}s for {len(regions)} regions (proposal: {timings.get('region_proposal', 0)}s, part: {timings.get('part_classification', 0)}s, disease: {timings.get('disease_classification', 0)}s)"
+            },
+        }
+
     def analyze_image(self, image_bytes, use_enhanced_preprocessing=True) -> Dict[str, Any]:
         """
         Complete analysis pipeline with validation gate and bounding boxes.
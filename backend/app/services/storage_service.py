@@ -0,0 +1,191 @@
+"""
+Image Storage Service
+Pluggable storage backends for uploaded images.
+
+  • cloudinary – hosted storage (default)
+  • local      – content-addressed filesystem store for offline use,
+                 benchmarks and air-gapped installs
+  • memory     – keeps only object metadata in-process; for load tests
+
+Select with STORAGE_BACKEND=cloudinary|local|memory.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, Tuple
+
+from PIL import Image
+
+from app.config import get_settings, Settings
+from app.services.cloudinary_service import cloudinary_service
+
+
+def probe_image(data: bytes) -> Tuple[str, Optional[int], Optional[int]]:
+    """(format, width, height) from the image header, without decoding pixels"""
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return (img.format or "bin").lower(), img.size[0], img.size[1]
+    except Exception:
+        return "bin", None, None
+
+
+class StorageBackend(ABC):
+    """Interface every image storage backend implements"""
+
+    name = "base"
+
+    @abstractmethod
+    async def upload_image(self, data: bytes) -> Dict[str, Any]:
+        """
+        Store image bytes.
+
+        Returns:
+            dict with public_id, url, format, width and height
+            (same shape as CloudinaryService.upload_image)
+        """
+
+    async def aclose(self) -> None:
+        """Release any pooled resources (called on application shutdown)"""
+
+    @staticmethod
+    def content_hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+
+class CloudinaryStorageBackend(StorageBackend):
+    """Stores images on Cloudinary, keyed by content hash to avoid duplicates"""
+
+    name = "cloudinary"
+
+    def __init__(self, service=cloudinary_service):
+        self.service = service
+
+    async def upload_image(self, data: bytes) -> Dict[str, Any]:
+        return await self.service.upload_image_async(data, public_id=self.content_hash(data))
+
+    async def aclose(self) -> None:
+        await self.service.aclose()
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Content-addressed filesystem store.
+
+    Objects are named <sha256>.<ext> and sharded into two directory levels
+    (ab/cd/abcd….jpg) so no directory grows too large. Writing content that
+    already exists is a no-op, which deduplicates identical uploads.
+    """
+
+    name = "local"
+    OBJECT_NAME_RE = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]{1,5}$")
+
+    def __init__(self, root: str, public_url: str):
+        self.root = os.path.abspath(root)
+        self.public_url = public_url.rstrip("/")
+        os.makedirs(self.root, exist_ok=True)
+
+    def object_path(self, object_name: str) -> Optional[str]:
+        """Filesystem path for an object name, or None if the name is invalid"""
+        if not self.OBJECT_NAME_RE.match(object_name):
+            return None
+        return os.path.join(self.root, object_name[:2], object_name[2:4], object_name)
+
+    def object_url(self, object_name: str) -> str:
+        return f"{self.public_url}/api/v1/storage/{object_name}"
+
+    def _write(self, data: bytes) -> Dict[str, Any]:
+        digest = self.content_hash(data)
+        fmt, width, height = probe_image(data)
+        ext = "jpg" if fmt == "jpeg" else fmt
+
+        object_name = f"{digest}.{ext}"
+        path = self.object_path(object_name)
+        deduplicated = os.path.exists(path)
+
+        if not deduplicated:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file then rename so readers never see partial objects.
+            # The temp name is unique per write: identical images may be stored
+            # concurrently (threads of one process, or several workers)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.chmod(tmp_path, 0o644)  # mkstemp creates it owner-only
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+
+        return {
+            "public_id": f"local/{object_name}",
+            "url": self.object_url(object_name),
+            "format": fmt,
+            "width": width,
+            "height": height,
+            "bytes": len(data),
+            "deduplicated": deduplicated,
+        }
+
+    async def upload_image(self, data: bytes) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._write, data)
+
+    def stat(self, object_name: str) -> Optional[Tuple[str, int]]:
+        """Return (path, size) for a stored object, or None if missing"""
+        path = self.object_path(object_name)
+        if path is None or not os.path.isfile(path):
+            return None
+        return path, os.path.getsize(path)
+
+
+class MemoryStorageBackend(StorageBackend):
+    """
+    Fake store for load tests: records object metadata only and returns
+    placeholder URLs. An optional delay simulates network upload latency.
+    """
+
+    name = "memory"
+
+    def __init__(self, public_url: str, latency_ms: float = 0.0):
+        self.public_url = public_url.rstrip("/")
+        self.latency_ms = latency_ms
+        self.objects: Dict[str, int] = {}
+
+    async def upload_image(self, data: bytes) -> Dict[str, Any]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+        digest = self.content_hash(data)
+        fmt, width, height = probe_image(data)
+        deduplicated = digest in self.objects
+        self.objects[digest] = len(data)
+        return {
+            "public_id": f"memory/{digest}",
+            "url": f"{self.public_url}/memory/{digest}",
+            "format": fmt,
+            "width": width,
+            "height": height,
+            "bytes": len(data),
+            "deduplicated": deduplicated,
+        }
+
+
+def create_storage_backend(settings: Settings) -> StorageBackend:
+    """Build the storage backend selected for this deployment"""
+    if settings.storage_backend == "local":
+        return LocalStorageBackend(settings.local_storage_dir, settings.storage_public_url)
+    if settings.storage_backend == "cloudinary":
+        return CloudinaryStorageBackend()
+    if settings.storage_backend == "memory":
+        return MemoryStorageBackend(settings.storage_public_url, settings.storage_fake_latency_ms)
+    raise ValueError(
+        f"Unknown STORAGE_BACKEND '{settings.storage_backend}' "
+        "(expected 'cloudinary', 'local' or 'memory')"
+    )
+
+
+storage_service = create_storage_backend(get_settings())
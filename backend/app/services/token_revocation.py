@@ -0,0 +1,270 @@
+"""
+Refresh-token revocation store.
+
+Refresh tokens are rotated on every /refresh and revoked by logout (the
+token's whole family: every token rotated from the same sign-in) or by
+logout-all (every token of the user issued up to that moment). A
+revocation is a document in refresh_token_revocations, shared by all
+workers and kept only until the tokens it covers would have expired
+anyway (TTL index on expires_at):
+
+    _id "jti:<jti>"       one token: rotated, or logged out without a family
+        "tok:<sha256>"    the same, for tokens issued before tokens had an id
+        "fam:<family>"    a sign-in's whole family
+        "user:<user_id>"  logout-all: tokens issued up to not_before (compared
+                          to the millisecond iat_ms claim, so a sign-in right
+                          after logout-all is not caught by it)
+
+Fast path: every worker keeps a Bloom filter of the revoked keys and the
+per-user logout-all cutoffs in memory, fully loaded at start and topped
+up every TOKEN_REVOCATION_SYNC_SECONDS with what the other workers
+revoked. A token none of whose keys are in the filter is accepted without
+a database read; a filter hit is confirmed against the collection (the
+filter has false positives). A logout made through another worker is
+therefore seen here within one sync interval.
+
+Rotation does not depend on the filter: exchanging a refresh token
+inserts its key, so a second use of the same token fails on the unique
+_id whichever worker it reaches. That is treated as a stolen token and
+the whole family is revoked.
+"""
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from app.config import get_settings
+from app.services.auth_service import REFRESH_TOKEN_LIFETIME
+from app.services.database import get_database
+from app.utils.bloom import BloomFilter
+from app.utils.telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+REVOCATIONS_COLLECTION = "refresh_token_revocations"
+# Revocations from other workers are re-read with this overlap (clock skew between hosts)
+SYNC_OVERLAP = timedelta(seconds=30)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class TokenRevoked(Exception):
+    """The refresh token was revoked or has already been exchanged"""
+
+
+def token_key(payload: Dict[str, Any], token: str) -> str:
+    if payload.get("jti"):
+        return f"jti:{payload['jti']}"
+    return "tok:" + hashlib.sha256(token.encode()).hexdigest()
+
+
+def _epoch(moment: datetime) -> float:
+    return (moment - _EPOCH).total_seconds()
+
+
+def _issued_at(payload: Dict[str, Any]) -> float:
+    """Issue time in epoch seconds, to the millisecond for current tokens"""
+    if payload.get("iat_ms") is not None:
+        return payload["iat_ms"] / 1000
+    if payload.get("iat") is not None:
+        return float(payload["iat"])
+    # Tokens issued before refresh tokens had an iat
+    return float(payload["exp"]) - REFRESH_TOKEN_LIFETIME.total_seconds()
+
+
+class RefreshTokenStore:
+    def __init__(self, sync_interval: float = 5.0, capacity: int = 100_000):
+        self.sync_interval = sync_interval
+        self.capacity = capacity
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._filter = BloomFilter(capacity)
+        self._reloading: Optional[BloomFilter] = None
+        self._cutoffs: Dict[str, float] = {}  # user_id -> logout-all time (epoch seconds)
+        self._synced_until: Optional[datetime] = None
+        self._loaded = False
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"fast_path": 0, "db_checks": 0, "revoked": 0, "rotated": 0, "reuse_detected": 0, "sync_errors": 0}
+
+        for stat in self.stats:
+            telemetry.register_counter(f"token_revocation_{stat}_total", lambda stat=stat: self.stats[stat])
+        telemetry.register_gauge("token_revocation_filter_entries", lambda: self._filter.count)
+
+    # ── Lifecycle ────────────────────────────────────────────────
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Load the revocations and keep them in sync (called from on_startup)"""
+        self._db = db
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="token-revocation-sync")
+            logger.info(f"🔑 Token revocation sync started (every {self.sync_interval:.0f}s)")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    @property
+    def collection(self):
+        db = self._db if self._db is not None else get_database()
+        return db[REVOCATIONS_COLLECTION]
+
+    # ── Tokens ───────────────────────────────────────────────────
+    async def check(self, payload: Dict[str, Any], token: str) -> None:
+        """Raise TokenRevoked when a (verified) refresh token may no longer be used"""
+        found = await self._revoked_key(payload, token)
+        if found is None:
+            return
+        if found.startswith(("jti:", "tok:")) and payload.get("fam"):
+            # An exchanged token presented again: somebody else holds a copy
+            self.stats["reuse_detected"] += 1
+            await self._revoke_family(payload)
+        raise TokenRevoked(f"Refresh token revoked ({found.split(':', 1)[0]})")
+
+    async def rotate(self, payload: Dict[str, Any], token: str) -> None:
+        """Mark a refresh token as exchanged; raises TokenRevoked if it already was"""
+        key = token_key(payload, token)
+        try:
+            await self.collection.insert_one({
+                "_id": key,
+                "kind": "token",
+                "user_id": payload.get("user_id"),
+                "family": payload.get("fam"),
+                "revoked_at": datetime.utcnow(),
+                "expires_at": datetime.utcfromtimestamp(payload["exp"]),
+            })
+        except DuplicateKeyError:
+            self.stats["reuse_detected"] += 1
+            if payload.get("fam"):
+                await self._revoke_family(payload)
+            raise TokenRevoked("Refresh token already used")
+        self.stats["rotated"] += 1
+        self._remember(key)
+
+    async def revoke(self, payload: Dict[str, Any], token: str) -> None:
+        """Logout: revoke the token's family (just the token when it has none)"""
+        if payload.get("fam"):
+            await self._revoke_family(payload)
+        else:
+            await self._upsert(
+                token_key(payload, token), "token", payload.get("user_id"),
+                datetime.utcfromtimestamp(payload["exp"]),
+            )
+
+    async def revoke_user(self, user_id: str) -> None:
+        """Logout-all: revoke every refresh token of the user issued until now"""
+        now = datetime.utcnow()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)  # as MongoDB stores it
+        await self._upsert(f"user:{user_id}", "user", user_id, now + REFRESH_TOKEN_LIFETIME, not_before=now)
+        self._cutoffs[user_id] = _epoch(now)
+
+    # ── Internals ────────────────────────────────────────────────
+    async def _revoked_key(self, payload: Dict[str, Any], token: str) -> Optional[str]:
+        user_id = payload.get("user_id")
+        issued_at = _issued_at(payload)
+        cutoff = self._cutoffs.get(user_id)
+        if cutoff is not None and issued_at <= cutoff:
+            return f"user:{user_id}"
+
+        keys = [token_key(payload, token)]
+        if payload.get("fam"):
+            keys.append(f"fam:{payload['fam']}")
+        if self._loaded and not any(key in self._filter for key in keys):
+            self.stats["fast_path"] += 1
+            return None
+
+        # A filter hit (or no filter yet): ask the collection, cutoff included
+        self.stats["db_checks"] += 1
+        keys.append(f"user:{user_id}")
+        documents = await self.collection.find({"_id": {"$in": keys}}, {"not_before": 1}).to_list(len(keys))
+        for document in documents:
+            if "not_before" not in document:
+                return document["_id"]
+            if issued_at <= _epoch(document["not_before"]):
+                return document["_id"]
+        return None
+
+    async def _revoke_family(self, payload: Dict[str, Any]) -> None:
+        # Tokens of the family issued until now expire within one lifetime
+        await self._upsert(
+            f"fam:{payload['fam']}", "family", payload.get("user_id"),
+            datetime.utcnow() + REFRESH_TOKEN_LIFETIME,
+        )
+
+    async def _upsert(self, key: str, kind: str, user_id: Optional[str], expires_at: datetime, **fields: Any) -> None:
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {
+                "kind": kind,
+                "user_id": user_id,
+                "revoked_at": datetime.utcnow(),
+                "expires_at": expires_at,
+                **fields,
+            }},
+            upsert=True,
+        )
+        self.stats["revoked"] += 1
+        self._remember(key)
+
+    def _remember(self, key: str) -> None:
+        self._filter.add(key)
+        if self._reloading is not None:
+            self._reloading.add(key)
+
+    async def sync(self) -> None:
+        """Pull revocations made since the last sync (all of them the first time)"""
+        full = not self._loaded or self._filter.saturated
+        query: Dict[str, Any] = {}
+        target = self._filter
+        if full:
+            count = await self.collection.estimated_document_count()
+            target = self._reloading = BloomFilter(max(self.capacity, 2 * count))
+        elif self._synced_until is not None:
+            query = {"revoked_at": {"$gte": self._synced_until - SYNC_OVERLAP}}
+
+        cutoffs: List[tuple] = []
+        latest = self._synced_until
+        try:
+            cursor = self.collection.find(query, {"kind": 1, "user_id": 1, "not_before": 1, "revoked_at": 1})
+            async for document in cursor:
+                if document.get("kind") == "user":
+                    cutoffs.append((document["user_id"], _epoch(document["not_before"])))
+                else:
+                    target.add(document["_id"])
+                if latest is None or document["revoked_at"] > latest:
+                    latest = document["revoked_at"]
+        finally:
+            self._reloading = None
+
+        horizon = _epoch(datetime.utcnow() - REFRESH_TOKEN_LIFETIME)
+        if full:
+            self._filter = target
+            self._cutoffs = {u: at for u, at in self._cutoffs.items() if at > horizon}
+        for user_id, not_before in cutoffs:
+            if not_before > max(horizon, self._cutoffs.get(user_id, 0.0)):
+                self._cutoffs[user_id] = not_before
+        self._synced_until = latest
+        if full:
+            logger.info(f"🔑 Loaded {target.count} refresh-token revocations, {len(self._cutoffs)} logout-all cutoffs")
+        self._loaded = True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["sync_errors"] += 1
+                logger.error(f"❌ Token revocation sync failed: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+
+_settings = get_settings()
+refresh_token_store = RefreshTokenStore(
+    sync_interval=_settings.token_revocation_sync_seconds,
+    capacity=_settings.token_revocation_bloom_capacity,
+)
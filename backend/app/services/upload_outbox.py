@@ -0,0 +1,228 @@
+"""
+Deferred Upload Outbox
+Lets an analysis be returned as soon as inference finishes. The record is
+saved with image_status="pending" together with an outbox entry holding the
+image bytes; a background worker uploads the image and patches
+image_url / cloudinary_public_id on the record.
+
+Outbox entries live in MongoDB, so pending uploads survive restarts and
+are shared by every uvicorn worker (entries are claimed with a lease).
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from bson import Binary, ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+
+from app.config import get_settings
+from app.services.storage_service import storage_service
+from app.utils.telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_COLLECTION = "upload_outbox"
+
+# Keep well under MongoDB's 16 MB document limit
+MAX_OUTBOX_PAYLOAD_BYTES = 15 * 1024 * 1024
+
+
+class UploadOutbox:
+    """Background worker that drains the upload outbox"""
+
+    def __init__(
+        self,
+        poll_interval: float = 2.0,
+        max_attempts: int = 8,
+        lease_seconds: int = 120,
+        concurrency: int = 2,
+    ):
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.concurrency = concurrency
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._tasks: list = []
+        self._wake = asyncio.Event()
+
+    @staticmethod
+    def accepts(contents: bytes) -> bool:
+        """Whether an image is small enough to be deferred through the outbox"""
+        return len(contents) <= MAX_OUTBOX_PAYLOAD_BYTES
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    async def insert_with_record(
+        self,
+        db: AsyncIOMotorDatabase,
+        records: AsyncIOMotorCollection,
+        record: Dict[str, Any],
+        contents: bytes,
+    ) -> ObjectId:
+        """
+        Insert an analysis record and its outbox entry atomically.
+
+        Uses a transaction when the deployment supports one (Atlas /
+        replica sets). On a standalone mongod the outbox entry is written
+        first, so a crash can at worst leave an entry whose patch matches
+        no record.
+        """
+        record_id = record.get("_id") or ObjectId()
+        record["_id"] = record_id
+        record["image_status"] = "pending"
+
+        now = datetime.utcnow()
+        entry = {
+            "record_id": record_id,
+            "collection": records.name,
+            "payload": Binary(contents),
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        }
+        outbox = db[OUTBOX_COLLECTION]
+
+        try:
+            async with await db.client.start_session() as session:
+                async with session.start_transaction():
+                    await outbox.insert_one(entry, session=session)
+                    await records.insert_one(record, session=session)
+        except OperationFailure as e:
+            # Code 20: transactions are not supported on standalone servers
+            if e.code != 20 and "Transaction numbers" not in str(e):
+                raise
+            await outbox.insert_one(entry)
+            await records.insert_one(record)
+
+        self._wake.set()
+        return record_id
+
+    # ------------------------------------------------------------------
+    # Worker side
+    # ------------------------------------------------------------------
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Start the background workers (called from on_startup)"""
+        if self._tasks:
+            return
+        self._db = db
+        self._tasks = [
+            asyncio.create_task(self._run(), name=f"upload-outbox-{i}")
+            for i in range(self.concurrency)
+        ]
+        logger.info(f"📤 Upload outbox started with {self.concurrency} workers")
+
+    async def stop(self) -> None:
+        """Stop the background workers; unfinished entries stay in the outbox"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.process_next()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Upload outbox worker error: {e}")
+                processed = False
+
+            if not processed:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _retry_at(self, attempts: int) -> datetime:
+        delay = random.uniform(0, min(300, 2 ** attempts))
+        return datetime.utcnow() + timedelta(seconds=delay)
+
+    async def process_next(self) -> bool:
+        """Claim and process one due entry. Returns False if none were due."""
+        outbox = self._db[OUTBOX_COLLECTION]
+        now = datetime.utcnow()
+
+        # Claim a due entry, or one whose lease expired (worker crashed mid-upload)
+        entry = await outbox.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "processing", "lease_until": {"$lt": now}},
+            ]},
+            {
+                "$set": {
+                    "status": "processing",
+                    "lease_until": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if entry is None:
+            return False
+
+        records = self._db[entry["collection"]]
+        try:
+            upload_start = time.perf_counter()
+            upload = await storage_service.upload_image(bytes(entry["payload"]))
+            telemetry.observe("upload", time.perf_counter() - upload_start)
+        except Exception as e:
+            if entry["attempts"] >= self.max_attempts:
+                logger.error(
+                    f"❌ Deferred upload for {entry['record_id']} failed permanently: {e}"
+                )
+                await outbox.update_one(
+                    {"_id": entry["_id"]},
+                    {"$set": {"status": "failed", "last_error": str(e)}, "$unset": {"lease_until": ""}},
+                )
+                await records.update_one(
+                    {"_id": entry["record_id"]}, {"$set": {"image_status": "failed"}}
+                )
+            else:
+                await outbox.update_one(
+                    {"_id": entry["_id"]},
+                    {
+                        "$set": {
+                            "status": "pending",
+                            "last_error": str(e),
+                            "next_attempt_at": self._retry_at(entry["attempts"]),
+                        },
+                        "$unset": {"lease_until": ""},
+                    },
+                )
+            return True
+
+        await records.update_one(
+            {"_id": entry["record_id"]},
+            {"$set": {
+                "image_url": upload["url"],
+                "cloudinary_public_id": upload["public_id"],
+                "image_status": "uploaded",
+                "updated_at": datetime.utcnow(),
+            }},
+        )
+        await outbox.delete_one({"_id": entry["_id"]})
+        logger.info(f"✅ Deferred upload completed for {entry['record_id']}")
+        return True
+
+    async def get_stats(self, db: AsyncIOMotorDatabase) -> Dict[str, int]:
+        """Outbox entry counts by status"""
+        pipeline = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        rows = await db[OUTBOX_COLLECTION].aggregate(pipeline).to_list(length=None)
+        return {row["_id"]: row["count"] for row in rows}
+
+
+_settings = get_settings()
+upload_outbox = UploadOutbox(
+    poll_interval=_settings.upload_outbox_poll_seconds,
+    max_attempts=_settings.upload_outbox_max_attempts,
+)
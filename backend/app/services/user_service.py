@@ -1,10 +1,15 @@
+import time
 from typing import Optional, Dict, Any
 from bson import ObjectId
 from fastapi import HTTPException, status
+from app.config import get_settings
 from app.schemas.user import UserCreate, UserRead
 from app.models.user_model import UserInDB, UserRole
 from app.services.database import get_user_collection
 from app.services.auth_service import auth_service
+from app.utils.cache import AsyncCache
+
+_settings = get_settings()
 
 
 class UserService:
@@ -13,6 +18,15 @@ class UserService:
     def __init__(self):
         # Don't initialize collection in __init__
         self._users_collection = None
+        # Users resolved by get_current_user, by id. Per process: the writes
+        # below invalidate it here, other workers catch up within the TTL
+        self.auth_cache = AsyncCache(
+            "auth_user_cache",
+            max_entries=_settings.auth_user_cache_max_entries,
+            enabled=_settings.auth_user_cache_ttl_seconds > 0,
+        )
+        # user_id -> time.time() of the last change made through this process
+        self._changed_at: Dict[str, float] = {}
     
     @property
     def users_collection(self):
@@ -45,7 +59,7 @@ class UserService:
             )
         
         # Hash password
-        hashed_password = auth_service.get_password_hash(user_create.password)
+        hashed_password = await auth_service.hash_password(user_create.password)
         
         # Create user document
         user_dict = user_create.dict(exclude={"password"})
@@ -80,9 +94,20 @@ class UserService:
         if not user_doc:
             return None
         
-        # Verify password
-        if not auth_service.verify_password(password, user_doc["hashed_password"]):
+        # Verify password (Firebase-only accounts have no password)
+        if not user_doc.get("hashed_password"):
             return None
+        matches, new_hash = await auth_service.verify_and_update_password(
+            password, user_doc["hashed_password"]
+        )
+        if not matches:
+            return None
+        if new_hash:
+            # Stored with outdated hashing parameters: upgrade it now that we know the password
+            await self.users_collection.update_one(
+                {"_id": user_doc["_id"], "hashed_password": user_doc["hashed_password"]},
+                {"$set": {"hashed_password": new_hash}}
+            )
         
         # Convert to UserRead schema
         return UserRead(
@@ -92,6 +117,7 @@ class UserService:
             profile_picture=user_doc.get("profile_picture"),
             role=user_doc.get("role", UserRole.USER),
             is_active=user_doc.get("is_active", True),
+            created_at=user_doc.get("created_at"),
             deactivation_reason=user_doc.get("deactivation_reason")
         )
     
@@ -126,6 +152,32 @@ class UserService:
             deactivation_reason=user_doc.get("deactivation_reason")
         )
     
+    async def get_cached_user(self, user_id: str) -> Optional[UserRead]:
+        """
+        get_user_by_id through the authenticated-user cache
+
+        Args:
+            user_id: User's MongoDB ID string
+
+        Returns:
+            User if found, None otherwise (both cached for the TTL)
+        """
+        return await self.auth_cache.get(
+            user_id, lambda: self.get_user_by_id(user_id), _settings.auth_user_cache_ttl_seconds
+        )
+
+    def invalidate_cached_user(self, user_id: str) -> None:
+        """Forget the cached user after a write to their document"""
+        self.auth_cache.discard(user_id)
+        now = time.time()
+        horizon = now - _settings.auth_trust_token_claims_seconds
+        self._changed_at = {uid: at for uid, at in self._changed_at.items() if at > horizon}
+        self._changed_at[user_id] = now
+
+    def changed_since(self, user_id: str, timestamp: float) -> bool:
+        """Whether this process changed the user at or after `timestamp` (epoch seconds)"""
+        return self._changed_at.get(user_id, 0.0) >= timestamp
+
     async def get_user_by_email(self, email: str) -> Optional[UserRead]:
         """
         Get user by email
@@ -176,6 +228,7 @@ class UserService:
             {"_id": ObjectId(user_id)},
             {"$set": update_data}
         )
+        self.invalidate_cached_user(user_id)
         
         if result.modified_count == 0:
             return None
@@ -195,6 +248,7 @@ class UserService:
         result = await self.users_collection.delete_one(
             {"_id": ObjectId(user_id)}
         )
+        self.invalidate_cached_user(user_id)
         
         return result.deleted_count > 0
     
@@ -248,6 +302,7 @@ class UserService:
             {"_id": ObjectId(user_id)},
             {"$set": {"role": new_role}}
         )
+        self.invalidate_cached_user(user_id)
         
         if result.modified_count == 0:
             return None
@@ -276,6 +331,7 @@ class UserService:
             {"_id": ObjectId(user_id)},
             {"$set": update_fields}
         )
+        self.invalidate_cached_user(user_id)
         
         if result.modified_count == 0:
             return None
@@ -0,0 +1,173 @@
+"""
+Per-user analysis statistics.
+
+One document per user in `user_stats` (_id = user_id) holds the counters
+behind the profile statistics: total and favorite analyses, counts per
+disease, plant part, severity and month, and the processing-time sum.
+They are updated with $inc when an analysis is saved or deleted and when
+its favorite flag flips, so reading a user's statistics is a single _id
+lookup instead of seven aggregations over their analyses.
+
+Like the analytics rollups, increments are best effort: a failure is
+logged and the analysis write still succeeds. rebuild() recomputes a
+user's document from their analyses (scripts/rebuild_user_stats.py) and
+marks it `built`. The increments upsert a document on a user's first
+write but never set that marker, so a document that only holds counters
+applied since deploy is rebuilt on the user's next statistics read,
+which backfills users who analysed before the counters existed.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+USER_STATS_COLLECTION = "user_stats"
+
+# Projection with everything a stats update needs from an analysis
+USER_STATS_SOURCE_FIELDS = {
+    "user_id": 1, "created_at": 1, "disease": 1, "plant_part": 1, "severity": 1,
+    "is_favorite": 1, "metadata.processing_time": 1,
+}
+
+
+def _key(value: Any, default: str) -> str:
+    """Counter names are field names: no dots, no leading $"""
+    text = str(value) if value is not None else default
+    return text.replace(".", "_").lstrip("$") or default
+
+
+def stats_increments(document: Dict[str, Any], sign: int = 1) -> Dict[str, Any]:
+    """The $inc adding (sign=1) or removing (sign=-1) one analysis"""
+    created_at = document.get("created_at") or datetime.utcnow()
+    increments: Dict[str, Any] = {
+        "total": sign,
+        f"diseases.{_key(document.get('disease'), 'Unknown')}": sign,
+        f"parts.{_key(document.get('plant_part'), 'unknown')}": sign,
+        f"months.{created_at:%Y-%m}": sign,
+    }
+    if document.get("severity") is not None:
+        increments[f"severity.{_key(document['severity'], 'unknown')}"] = sign
+    if document.get("is_favorite"):
+        increments["favorites"] = sign
+
+    processing_time = (document.get("metadata") or {}).get("processing_time")
+    if processing_time is not None:
+        increments["processing_time_sum"] = sign * processing_time
+        increments["processing_time_count"] = sign
+    return increments
+
+
+def _top(counts: Dict[str, int], limit: int) -> List[tuple]:
+    live = [(k, v) for k, v in counts.items() if v > 0]
+    return sorted(live, key=lambda kv: (-kv[1], kv[0]))[:limit]
+
+
+def stats_summary(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of UserAnalysisStats from a user_stats document"""
+    total = max(stats.get("total", 0), 0)
+    diseases = stats.get("diseases", {})
+    disease_frequency = dict(_top(diseases, len(diseases)))
+    healthy_count = disease_frequency.get("Healthy", 0)
+
+    months = [(m, c) for m, c in stats.get("months", {}).items() if c > 0]
+    processing_count = stats.get("processing_time_count", 0)
+
+    return {
+        "total_analyses": total,
+        "disease_frequency": disease_frequency,
+        "healthy_vs_diseased_ratio": healthy_count / max(total, 1),
+        "most_common_diseases": [
+            {"disease": d, "count": c} for d, c in disease_frequency.items() if d != "Healthy"
+        ][:5],
+        "analyses_by_month": [
+            {"month": m, "count": c} for m, c in sorted(months, reverse=True)[:12]
+        ],
+        "favorite_analyses_count": max(stats.get("favorites", 0), 0),
+        "average_processing_time": (
+            stats["processing_time_sum"] / processing_count if processing_count > 0 else None
+        ),
+        "most_analyzed_plant_parts": [
+            {"part": p, "count": c} for p, c in _top(stats.get("parts", {}), 5)
+        ],
+        "severity_distribution": dict(_top(stats.get("severity", {}), len(stats.get("severity", {})))),
+    }
+
+
+class UserStatsService:
+    """Keeps user_stats in step with each user's analyses"""
+
+    def __init__(self, database: AsyncIOMotorDatabase):
+        self.db = database
+        self.stats = database[USER_STATS_COLLECTION]
+
+    async def record(self, document: Dict[str, Any], sign: int = 1) -> None:
+        await self.record_many([document], sign)
+
+    async def record_many(self, documents: Iterable[Dict[str, Any]], sign: int = 1) -> None:
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"_id": document["user_id"]},
+                {"$inc": stats_increments(document, sign), "$set": {"updated_at": now}},
+                upsert=True,
+            )
+            for document in documents
+            if document.get("user_id")
+        ]
+        if not operations:
+            return
+        try:
+            await self.stats.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"❌ Failed to update user stats (rebuild to repair): {e}")
+
+    async def favorite_changed(self, user_id: str, delta: int) -> None:
+        try:
+            await self.stats.update_one(
+                {"_id": user_id},
+                {"$inc": {"favorites": delta}, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.error(f"❌ Failed to update favorite count for {user_id}: {e}")
+
+    async def get(self, user_id: str) -> Dict[str, Any]:
+        """The user's stats document, rebuilt from their analyses unless already built"""
+        stats = await self.stats.find_one({"_id": user_id})
+        if stats is None or not stats.get("built"):
+            stats = await self.rebuild(user_id)
+        return stats
+
+    async def rebuild(self, user_id: str) -> Dict[str, Any]:
+        """
+        Recompute one user's document from their analyses and replace it.
+        Increments for that user landing while it runs can be lost.
+        """
+        stats: Dict[str, Any] = {"_id": user_id, "total": 0}
+        cursor = self.db.analyses.find({"user_id": user_id}, USER_STATS_SOURCE_FIELDS)
+        async for document in cursor:
+            for path, value in stats_increments(document).items():
+                parent = stats
+                *parents, leaf = path.split(".")
+                for name in parents:
+                    parent = parent.setdefault(name, {})
+                parent[leaf] = parent.get(leaf, 0) + value
+
+        stats["built"] = True
+        stats["updated_at"] = datetime.utcnow()
+        await self.stats.replace_one({"_id": user_id}, stats, upsert=True)
+        return stats
+
+    async def rebuild_all(self, batch_log: int = 1000) -> int:
+        """Rebuild every user with analyses and drop documents of users without any"""
+        user_ids = [u for u in await self.db.analyses.distinct("user_id") if u]
+        for index, user_id in enumerate(user_ids, 1):
+            await self.rebuild(user_id)
+            if index % batch_log == 0:
+                logger.info(f"📊 Rebuilt user stats for {index}/{len(user_ids)} users")
+        await self.stats.delete_many({"_id": {"$nin": user_ids}})
+        return len(user_ids)
@@ -0,0 +1,277 @@
+"""
+Write-behind buffer for analysis records.
+
+Instead of one insert_one round trip per upload, records are queued and
+written with insert_many once a batch fills up or a short time window
+passes. The request that submitted a record waits for its batch, so it is
+only acknowledged once the record is durable:
+
+  • "saved"   – the batch was acknowledged by MongoDB
+  • "spooled" – MongoDB was unreachable; the record was fsynced to an
+                NDJSON file in the local spool and is replayed into
+                MongoDB in the background once it is reachable again
+
+Records carry their _id from submission, so replaying a spool file that
+was partially inserted before is safe (duplicate keys are ignored).
+Spooled records are not visible to reads until they have been replayed.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId, json_util
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError, ConnectionFailure
+
+from app.config import get_settings
+from app.services.analytics_rollups import AnalyticsRollupService
+from app.services.user_stats import UserStatsService
+from app.utils.telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+SPOOL_JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS  # keeps ObjectId / datetime exact
+
+
+class AnalysisWriteBuffer:
+    """Groups analysis inserts into insert_many batches"""
+
+    def __init__(
+        self,
+        max_batch: int = 50,
+        max_delay: float = 0.025,
+        spool_dir: str = "spool",
+        spool_retry_seconds: float = 30.0,
+        collection_name: str = "analyses",
+    ):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.spool_dir = spool_dir
+        self.spool_retry_seconds = spool_retry_seconds
+        self.collection_name = collection_name
+        self._collection: Optional[AsyncIOMotorCollection] = None
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._wake = asyncio.Event()
+        self._full = asyncio.Event()
+        self._stopping = False
+        self._flusher: Optional[asyncio.Task] = None
+        self._replayer: Optional[asyncio.Task] = None
+        self.stats = {"batches": 0, "saved": 0, "spooled": 0, "replayed": 0, "failed": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._flusher is not None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Start the flusher and spool replayer (called from on_startup)"""
+        if self._flusher is not None:
+            return
+        self._collection = db[self.collection_name]
+        self._stopping = False
+        self._flusher = asyncio.create_task(self._run(), name="write-behind-flusher")
+        self._replayer = asyncio.create_task(self._replay_loop(), name="write-behind-replayer")
+
+        telemetry.register_gauge("write_buffer_pending", lambda: len(self._pending))
+        telemetry.register_counter("write_buffer_spooled_total", lambda: self.stats["spooled"])
+        logger.info(
+            f"🧺 Write-behind buffer started (batch {self.max_batch}, "
+            f"window {self.max_delay * 1000:.0f}ms, spool {self.spool_dir}/)"
+        )
+
+    async def stop(self) -> None:
+        """Flush everything still queued, then stop (called from on_shutdown)"""
+        if self._flusher is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._full.set()
+        await self._flusher
+        self._flusher = None
+        if self._pending:
+            # Queued between the flusher's last batch and it returning
+            leftover, self._pending = self._pending, []
+            await self._write(leftover)
+
+        if self._replayer is not None:
+            self._replayer.cancel()
+            await asyncio.gather(self._replayer, return_exceptions=True)
+            self._replayer = None
+        logger.info(f"🧺 Write-behind buffer flushed and stopped ({self.stats})")
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+    async def submit(self, document: Dict[str, Any]) -> str:
+        """
+        Queue a record and wait until it is durable. Sets document["_id"].
+        Returns "saved" or "spooled".
+        """
+        document.setdefault("_id", ObjectId())
+        future = asyncio.get_running_loop().create_future()
+
+        if self._flusher is None or self._stopping:
+            # Not started, or stopping (the flusher may already have exited): write through
+            await self._write([(document, future)])
+            return future.result()
+
+        self._pending.append((document, future))
+        self._wake.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await future
+
+    # ------------------------------------------------------------------
+    # Flusher
+    # ------------------------------------------------------------------
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            if not self._stopping and len(self._pending) < self.max_batch:
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            if not self._pending:
+                self._wake.clear()
+            if batch:
+                await self._write(batch)
+
+            if self._stopping and not self._pending:
+                return
+
+    async def _write(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        documents = [document for document, _ in batch]
+        errors: Dict[int, Exception] = {}
+        outcome = "saved"
+
+        try:
+            await self._collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Per-record failures; a duplicate key means it was already written
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") != DUPLICATE_KEY:
+                    errors[error["index"]] = Exception(error.get("errmsg", "write error"))
+        except ConnectionFailure as e:
+            logger.warning(f"⚠️ MongoDB unreachable, spooling {len(documents)} analyses: {e}")
+            try:
+                await asyncio.to_thread(self._spool, documents)
+                outcome = "spooled"
+            except Exception as spool_error:
+                logger.error(f"❌ Failed to spool analyses: {spool_error}")
+                errors = {i: spool_error for i in range(len(batch))}
+        except Exception as e:
+            errors = {i: e for i in range(len(batch))}
+
+        self.stats["batches"] += 1
+        for index, (_, future) in enumerate(batch):
+            if index in errors:
+                self.stats["failed"] += 1
+                if not future.done():
+                    future.set_exception(errors[index])
+            else:
+                self.stats[outcome] += 1
+                if not future.done():
+                    future.set_result(outcome)
+
+    # ------------------------------------------------------------------
+    # Disk spool
+    # ------------------------------------------------------------------
+    def _spool(self, documents: List[Dict[str, Any]]) -> None:
+        """Write one spool file per batch; visible only once fully fsynced"""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        name = f"analyses-{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.ndjson"
+        path = os.path.join(self.spool_dir, name)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            for document in documents:
+                f.write(json_util.dumps(document, json_options=SPOOL_JSON_OPTIONS) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _claim_spool_files(self) -> List[str]:
+        """Rename spool files before replaying so only one worker picks each up"""
+        if not os.path.isdir(self.spool_dir):
+            return []
+        claimed = []
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".ndjson"):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            try:
+                os.replace(path, path + f".replaying-{os.getpid()}")
+            except FileNotFoundError:
+                continue  # claimed by another worker
+            claimed.append(path)
+        return claimed
+
+    @staticmethod
+    def _read_spool_file(path: str) -> List[Dict[str, Any]]:
+        with open(path, encoding="utf-8") as f:
+            return [json_util.loads(line) for line in f if line.strip()]
+
+    async def replay_spool(self) -> int:
+        """Insert spooled records into MongoDB. Returns the number replayed."""
+        if self._collection is None:
+            return 0
+        claimed = await asyncio.to_thread(self._claim_spool_files)
+        replayed = 0
+        for index, path in enumerate(claimed):
+            working = path + f".replaying-{os.getpid()}"
+            documents = await asyncio.to_thread(self._read_spool_file, working)
+            try:
+                if documents:
+                    await self._collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+                    logger.error(f"❌ Spool file {path} has records MongoDB rejected; left in place")
+                    os.replace(working, path + ".rejected")
+                    continue
+            except ConnectionFailure:
+                # Still unreachable: put this and the remaining files back
+                for remaining in claimed[index:]:
+                    os.replace(remaining + f".replaying-{os.getpid()}", remaining)
+                break
+            os.remove(working)
+            replayed += len(documents)
+            db = self._collection.database
+            await asyncio.gather(
+                AnalyticsRollupService(db).record_many(documents),
+                UserStatsService(db).record_many(documents),
+            )
+
+        if replayed:
+            self.stats["replayed"] += replayed
+            logger.info(f"✅ Replayed {replayed} spooled analyses into MongoDB")
+        return replayed
+
+    async def _replay_loop(self) -> None:
+        while True:
+            try:
+                await self.replay_spool()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Spool replay error: {e}")
+            await asyncio.sleep(self.spool_retry_seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "pending": len(self._pending), **self.stats}
+
+
+_settings = get_settings()
+analysis_write_buffer = AnalysisWriteBuffer(
+    max_batch=_settings.write_behind_max_batch,
+    max_delay=_settings.write_behind_max_delay_ms / 1000.0,
+    spool_dir=_settings.write_behind_spool_dir,
+    spool_retry_seconds=_settings.write_behind_spool_retry_seconds,
+)
@@ -0,0 +1,178 @@
+"""
+In-process async result cache.
+
+  • TTL              – a value is fresh for `ttl` seconds
+  • stale-while-revalidate
+                     – for a further `stale_ttl` seconds the old value is
+                       returned immediately while one background task
+                       recomputes it
+  • single-flight    – concurrent requests for the same key share one
+                       computation instead of each running it
+  • invalidation     – invalidate() marks every entry stale (they are
+                       still served, but the next read refreshes them);
+                       a computation that started before the invalidation
+                       is stored as already stale. With `min_fresh`, an
+                       entry computed less than that many seconds earlier
+                       stays fresh until it is `min_fresh` old instead, so
+                       a steady stream of writes refreshes each entry at
+                       most once per `min_fresh`; discard(key) drops one
+                       entry outright, and a computation of it already in
+                       flight is not stored at all
+
+The cache is per process: with several uvicorn workers each keeps its own
+copy, and invalidations only reach the worker that handled the write
+(other workers catch up within the TTL).
+"""
+import asyncio
+import functools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Set
+
+from app.utils.telemetry import telemetry
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("value", "computed_at", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, computed_at: float, fresh_until: float, stale_until: float):
+        self.value = value
+        self.computed_at = computed_at
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class AsyncCache:
+    def __init__(self, name: str, max_entries: int = 256, enabled: bool = True, min_fresh: float = 0.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.min_fresh = min_fresh
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._detached: Set[asyncio.Task] = set()
+        self._generation = 0
+        self._invalidated_at = float("-inf")
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refresh_errors": 0, "invalidations": 0}
+
+        for stat in self.stats:
+            telemetry.register_counter(f"{name}_{stat}_total", functools.partial(self.stats.get, stat))
+
+    async def get(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: float,
+        stale_ttl: float = 0.0,
+    ) -> Any:
+        if not self.enabled:
+            return await compute()
+
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now < entry.fresh_until:
+            self.stats["hits"] += 1
+            return entry.value
+        if entry is not None and now < entry.stale_until:
+            self.stats["stale_hits"] += 1
+            self._refresh(key, compute, ttl, stale_ttl)
+            return entry.value
+
+        self.stats["misses"] += 1
+        # Shielded so one cancelled caller does not cancel the shared computation
+        return await asyncio.shield(self._refresh(key, compute, ttl, stale_ttl))
+
+    async def refresh(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: float,
+        stale_ttl: float = 0.0,
+    ) -> Any:
+        """Recompute an entry now (joining a refresh already in flight)"""
+        return await asyncio.shield(self._refresh(key, compute, ttl, stale_ttl))
+
+    def invalidate(self) -> None:
+        """
+        Mark every entry stale (entries younger than min_fresh once they reach
+        that age); values stay servable until their stale window ends
+        """
+        self._invalidated_at = time.monotonic()
+        self.stats["invalidations"] += 1
+        for entry in self._entries.values():
+            entry.fresh_until = min(entry.fresh_until, entry.computed_at + self.min_fresh)
+
+    def discard(self, key: Hashable) -> None:
+        """Forget one entry; the next read recomputes it"""
+        self._entries.pop(key, None)
+        task = self._inflight.pop(key, None)
+        if task is not None:
+            # Callers already waiting still get its result, but it may predate the write
+            self._detached.add(task)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "in_flight": len(self._inflight), **self.stats}
+
+    # ── Internals ────────────────────────────────────────────────
+    def _refresh(self, key, compute, ttl: float, stale_ttl: float) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute(key, compute, ttl, stale_ttl))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._finished, key))
+        return task
+
+    def _finished(self, key, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        self._detached.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["refresh_errors"] += 1
+            logger.error(f"❌ {self.name}: computing {key!r} failed: {task.exception()}")
+
+    async def _compute(self, key, compute, ttl: float, stale_ttl: float) -> Any:
+        generation = self._generation
+        started = time.monotonic()
+        value = await compute()
+        if asyncio.current_task() in self._detached:
+            return value
+
+        now = time.monotonic()
+        fresh_until = now + ttl if generation == self._generation else 0.0
+        if started < self._invalidated_at:
+            # May predate the last invalidation: fresh only as long as invalidate() would allow
+            fresh_until = min(fresh_until, started + self.min_fresh)
+        self._entries.pop(key, None)  # re-insert to keep dict order = age
+        self._entries[key] = _Entry(value, started, fresh_until, now + ttl + stale_ttl)
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        return value
+
+
+def cached(cache: AsyncCache, name: str, ttl: float, stale_ttl: float = 0.0):
+    """
+    Cache an async method's result per (name, arguments) in `cache`.
+    wrapper.refresh(self, ...) recomputes the entry for those arguments,
+    wrapper.uncached is the original method.
+    """
+    def decorator(fn):
+        def key(args, kwargs):
+            return (name, args, tuple(sorted(kwargs.items())))
+
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            return await cache.get(key(args, kwargs), lambda: fn(self, *args, **kwargs), ttl, stale_ttl)
+
+        async def refresh(self, *args, **kwargs):
+            return await cache.refresh(key(args, kwargs), lambda: fn(self, *args, **kwargs), ttl, stale_ttl)
+
+        wrapper.uncached = fn
+        wrapper.refresh = refresh
+        return wrapper
+    return decorator
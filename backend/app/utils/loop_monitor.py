@@ -0,0 +1,136 @@
+"""
+Event-loop lag monitor and blocking detector.
+
+A heartbeat coroutine sleeps for a fixed interval and records how late it
+wakes up (event-loop lag). A watchdog thread watches the heartbeat; when
+the loop has not come back for longer than the threshold it snapshots the
+loop thread's stack, i.e. the code that is blocking. When the loop
+resumes the event is completed with its duration and logged.
+
+Lag is exported on /metrics (tomatoguard_event_loop_lag_seconds) and
+recent blocking events are available from /api/v1/admin/event-loop.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+from app.utils.telemetry import LatencyHistogram, RingBuffer, telemetry
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.1, threshold: float = 0.1, history: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = LatencyHistogram(LAG_BUCKETS)
+        self.blocked_total = 0
+        self.events = RingBuffer(history)
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.perf_counter()
+        self._pending: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    # ── Lifecycle ────────────────────────────────────────────────
+    def start(self) -> None:
+        """Start monitoring the running loop (called from on_startup)"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+        telemetry.register_histogram(
+            "event_loop_lag_seconds", self.lag, "Delay of a fixed-interval heartbeat on the event loop."
+        )
+        telemetry.register_counter("event_loop_blocked_total", lambda: self.blocked_total)
+        logger.info(
+            f"🫀 Event-loop monitor started (interval {self.interval * 1000:.0f}ms, "
+            f"threshold {self.threshold * 1000:.0f}ms)"
+        )
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    # ── Loop side ────────────────────────────────────────────────
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - self._last_beat - self.interval)
+            self._last_beat = now
+            self.lag.observe(lag)
+
+            pending, self._pending = self._pending, None
+            # A capture racing with a wake-up shows up as a short beat; drop it
+            if pending is not None and lag >= self.threshold:
+                self._complete(pending, lag)
+
+    def _complete(self, event: Dict[str, Any], lag: float) -> None:
+        event["blocked_ms"] = round(lag * 1000, 1)
+        self.blocked_total += 1
+        self.events.append(event)
+        logger.warning(
+            f"🐢 Event loop blocked for {event['blocked_ms']:.0f}ms in "
+            f"{event['location']}\n{''.join(event['stack'])}"
+        )
+
+    # ── Watchdog thread ──────────────────────────────────────────
+    def _watch(self) -> None:
+        poll = min(self.interval, self.threshold) / 2
+        captured_beat = None
+        while not self._stop.wait(poll):
+            beat = self._last_beat
+            stalled = time.perf_counter() - beat - self.interval
+            if stalled < self.threshold or captured_beat == beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            captured_beat = beat
+            stack = traceback.format_stack(frame)
+            last = traceback.extract_stack(frame)[-1]
+            if self._last_beat != beat:
+                continue  # the loop resumed while we were capturing
+            self._pending = {
+                "detected_at": datetime.utcnow().isoformat(),
+                "location": f"{last.name} ({last.filename}:{last.lineno})",
+                "stack": stack[-25:],
+            }
+
+    # ── Reporting ────────────────────────────────────────────────
+    def snapshot(self, limit: int = 20) -> Dict[str, Any]:
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "lag_seconds": self.lag.summary(),
+            "blocked_total": self.blocked_total,
+            "recent_blocking_events": list(reversed(self.events.latest(limit))),
+        }
+
+
+_settings = get_settings()
+loop_monitor = LoopMonitor(
+    interval=_settings.loop_monitor_interval_ms / 1000.0,
+    threshold=_settings.loop_block_threshold_ms / 1000.0,
+)
@@ -0,0 +1,55 @@
+"""
+Keyset (cursor) pagination over listings ordered by creation time.
+
+Pages are ordered by (created_at, _id), newest first (oldest first for
+exports); the continuation token is the position of the last item
+returned, so the next page is a range scan on the (…, created_at, _id)
+index starting right after it, however deep into the history it is.
+Tokens are opaque to clients (URL-safe base64 of the position) and stay
+valid while documents are inserted or deleted.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+KEYSET_SORT: List[Tuple[str, int]] = [("created_at", -1), ("_id", -1)]
+KEYSET_SORT_ASC: List[Tuple[str, int]] = [("created_at", 1), ("_id", 1)]
+
+
+def encode_cursor(created_at: datetime, document_id: Union[str, ObjectId]) -> str:
+    position = {"t": created_at.isoformat(), "i": str(document_id)}
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, ObjectId]:
+    """Raises ValueError for a token that was not produced by encode_cursor"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(position["t"]), ObjectId(position["i"])
+    except (ValueError, KeyError, TypeError, InvalidId) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+
+def keyset_filter(token: Optional[str], ascending: bool = False) -> Dict[str, Any]:
+    """Query clause selecting the documents after the cursor position ({} for the first page)"""
+    if not token:
+        return {}
+    created_at, document_id = decode_cursor(token)
+    after = "$gt" if ascending else "$lt"
+    return {"$or": [
+        {"created_at": {after: created_at}},
+        {"created_at": created_at, "_id": {after: document_id}},
+    ]}
+
+
+def next_cursor(documents: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    """Token for the page after `documents`, or None when this was the last page"""
+    if len(documents) < limit or not documents:
+        return None
+    last = documents[-1]
+    return encode_cursor(last["created_at"], last["_id"])
@@ -0,0 +1,158 @@
+"""
+Password hashing off the event loop.
+
+Hashing and verifying a password is a deliberately slow key derivation
+(PBKDF2, see utils/security.py) that holds the CPU for tens of
+milliseconds. Run inline in an async handler it stalls every other
+request on the worker, so a burst of logins becomes a latency spike for
+the whole API. PasswordHasher runs it in a small process pool instead:
+
+  • process pool   – PASSWORD_HASH_WORKERS processes (spawned, not forked,
+                     so they do not inherit the Mongo client's threads);
+                     0 runs hashes in a thread instead
+  • concurrency cap – at most PASSWORD_HASH_MAX_CONCURRENT hashes are
+                     submitted at once, the rest wait their turn
+  • load shedding  – when PASSWORD_HASH_MAX_WAITING hashes are already
+                     waiting, further ones fail fast with PasswordHasherBusy
+                     (a 503 for the client) instead of queueing unboundedly
+  • metrics        – queue wait and hash duration histograms plus
+                     waiting / in-flight gauges and hashed / verified /
+                     rehashed / rejected counters on /metrics
+
+Before start() (scripts, tests) hashes run in a thread, with the same cap.
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+
+from app.config import get_settings
+from app.utils.security import get_password_hash, verify_and_update_password
+from app.utils.telemetry import LatencyHistogram, telemetry
+
+logger = logging.getLogger(__name__)
+
+HASH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PasswordHasherBusy(Exception):
+    """Too many password hashes are already waiting for the pool"""
+
+
+def _warm_up() -> None:
+    """Runs once per worker at start so the first login does not pay for the spawn"""
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = 2, max_concurrent: int = 2, max_waiting: int = 64):
+        self.workers = workers
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.queue_wait = LatencyHistogram(HASH_BUCKETS)
+        self.duration = LatencyHistogram(HASH_BUCKETS)
+        self.waiting = 0
+        self.in_flight = 0
+        self.stats = {"hashed": 0, "verified": 0, "rehashed": 0, "rejected": 0}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+        telemetry.register_histogram(
+            "password_hash_queue_wait_seconds", self.queue_wait, "Time password hashes waited for a pool slot."
+        )
+        telemetry.register_histogram(
+            "password_hash_seconds", self.duration, "Time to hash or verify a password in the pool."
+        )
+        telemetry.register_gauge("password_hash_waiting", lambda: self.waiting)
+        telemetry.register_gauge("password_hash_in_flight", lambda: self.in_flight)
+        for stat in self.stats:
+            telemetry.register_counter(f"password_{stat}_total", lambda stat=stat: self.stats[stat])
+
+    # ── Lifecycle ────────────────────────────────────────────────
+    def start(self) -> None:
+        """Start the worker processes (called from on_startup)"""
+        if self._executor is not None or self.workers <= 0:
+            return
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._executor = self._new_executor()
+        for _ in range(self.workers):
+            self._executor.submit(_warm_up)
+        logger.info(
+            f"🔐 Password hashing pool started ({self.workers} workers, "
+            f"{self.max_concurrent} concurrent, {self.max_waiting} waiting)"
+        )
+
+    async def stop(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+
+    # ── Hashing ──────────────────────────────────────────────────
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(get_password_hash, password)
+        self.stats["hashed"] += 1
+        return hashed
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        (matches, new_hash): new_hash is set when the stored hash uses
+        outdated parameters and should be replaced (see PASSWORD_PBKDF2_ROUNDS)
+        """
+        matches, new_hash = await self._run(verify_and_update_password, password, hashed_password)
+        self.stats["verified"] += 1
+        if new_hash:
+            self.stats["rehashed"] += 1
+        return matches, new_hash
+
+    # ── Internals ────────────────────────────────────────────────
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._slots.locked() and self.waiting >= self.max_waiting:
+            self.stats["rejected"] += 1
+            raise PasswordHasherBusy(f"{self.waiting} password hashes already waiting")
+
+        self.waiting += 1
+        wait_start = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.queue_wait.observe(time.perf_counter() - wait_start)
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await self._submit(fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.duration.observe(time.perf_counter() - started)
+            self._slots.release()
+
+    async def _submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        executor = self._executor
+        if executor is None:
+            return await asyncio.to_thread(fn, *args)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (OOM kill, …): replace the pool once and retry
+            if self._executor is executor:
+                logger.error("❌ Password hashing pool broke; restarting it")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._new_executor()
+            if self._executor is None:
+                raise
+            return await loop.run_in_executor(self._executor, fn, *args)
+
+
+_settings = get_settings()
+password_hasher = PasswordHasher(
+    workers=_settings.password_hash_workers,
+    max_concurrent=_settings.password_hash_max_concurrent,
+    max_waiting=_settings.password_hash_max_waiting,
+)
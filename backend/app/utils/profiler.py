@@ -0,0 +1,257 @@
+"""
+On-demand sampling profiler.
+
+A background thread snapshots every thread's Python stack at a fixed
+interval (sys._current_frames), so it sees the event loop, the ML executor
+and Motor's I/O threads alike without instrumenting any code. Results are
+returned as:
+
+  • collapsed stacks – "thread;frame;frame count" lines, loadable by
+                       flamegraph.pl, speedscope or inferno
+  • top functions    – self / inclusive sample counts per function
+
+Profiles run either for a fixed number of seconds, or for the next K
+requests to a route (samples are only taken while such a request is in
+flight). Only one profile runs at a time.
+"""
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Leaf frames that mean "waiting for work", excluded unless include_idle=True
+IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+}
+
+MAX_STACK_DEPTH = 128
+
+
+def _frame_label(code) -> Tuple[str, str]:
+    return os.path.basename(code.co_filename), code.co_name
+
+
+def _short_path(filename: str) -> str:
+    """Trim site-packages / project prefixes to keep frame labels readable"""
+    for marker in ("site-packages" + os.sep, "backend" + os.sep):
+        index = filename.rfind(marker)
+        if index != -1:
+            return filename[index + len(marker):]
+    return os.path.basename(filename)
+
+
+class SamplingProfiler:
+    """Samples all thread stacks from a daemon thread"""
+
+    def __init__(self, interval: float = 0.005, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.active = True  # sampling gate, toggled for request-scoped profiles
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict[Any, str] = {}
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.time()
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if not self.active:
+                continue
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if not self.include_idle and _frame_label(frame.f_code) in IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    # ── Output ───────────────────────────────────────────────────
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format (one stack per line)"""
+        return "\n".join(
+            f"{';'.join(stack)} {count}"
+            for stack, count in self.stacks.most_common()
+        ) + "\n"
+
+    def top_functions(self, limit: int = 30) -> List[Dict[str, Any]]:
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack[1:]  # drop the thread name
+            if not frames:
+                continue
+            self_counts[frames[-1]] += count
+            for label in set(frames):
+                total_counts[label] += count
+
+        total = sum(self.stacks.values()) or 1
+        ranked = sorted(total_counts, key=lambda f: (self_counts[f], total_counts[f]), reverse=True)
+        return [
+            {
+                "function": label,
+                "self_samples": self_counts[label],
+                "self_pct": round(100 * self_counts[label] / total, 2),
+                "total_samples": total_counts[label],
+                "total_pct": round(100 * total_counts[label] / total, 2),
+            }
+            for label in ranked[:limit]
+        ]
+
+    def thread_breakdown(self) -> Dict[str, int]:
+        breakdown: Counter = Counter()
+        for stack, count in self.stacks.items():
+            breakdown[stack[0]] += count
+        return dict(breakdown.most_common())
+
+
+def route_pattern(route: str) -> "re.Pattern":
+    """Turn a route template like /api/analysis/{id} into a path regex"""
+    parts = re.split(r"(\{[^}]+\})", route)
+    regex = "".join("[^/]+" if p.startswith("{") else re.escape(p) for p in parts)
+    return re.compile(f"^{regex}$")
+
+
+class ProfileSession:
+    """State of the profile currently being captured"""
+
+    def __init__(self, profiler: SamplingProfiler, route: Optional[str] = None, requests: int = 0):
+        self.id = uuid.uuid4().hex[:12]
+        self.profiler = profiler
+        self.route = route
+        self.pattern = route_pattern(route) if route else None
+        self.target_requests = requests
+        self.completed_requests = 0
+        self.in_flight = 0
+        self.done = asyncio.Event()
+
+    def matches(self, path: str) -> bool:
+        return self.pattern is not None and bool(self.pattern.match(path))
+
+    def request_started(self) -> None:
+        self.in_flight += 1
+        self.profiler.active = True
+
+    def request_finished(self) -> None:
+        self.in_flight -= 1
+        self.completed_requests += 1
+        if self.in_flight == 0:
+            self.profiler.active = False
+        if self.completed_requests >= self.target_requests:
+            self.done.set()
+
+
+class ProfilerController:
+    """Runs at most one profile at a time and feeds request events to it"""
+
+    def __init__(self):
+        self.session: Optional[ProfileSession] = None
+
+    @property
+    def busy(self) -> bool:
+        return self.session is not None
+
+    async def profile_for(self, seconds: float, interval: float, include_idle: bool) -> Dict[str, Any]:
+        profiler = SamplingProfiler(interval, include_idle)
+        self.session = ProfileSession(profiler)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.stop()
+            session, self.session = self.session, None
+        return self._result(session, mode="duration")
+
+    async def profile_requests(
+        self, route: str, requests: int, timeout: float, interval: float, include_idle: bool
+    ) -> Dict[str, Any]:
+        profiler = SamplingProfiler(interval, include_idle)
+        profiler.active = False  # only sample while a matching request is in flight
+        self.session = ProfileSession(profiler, route=route, requests=requests)
+        profiler.start()
+        try:
+            await asyncio.wait_for(self.session.done.wait(), timeout=timeout)
+            timed_out = False
+        except asyncio.TimeoutError:
+            timed_out = True
+        finally:
+            profiler.stop()
+            session, self.session = self.session, None
+        result = self._result(session, mode="requests")
+        result["timed_out"] = timed_out
+        return result
+
+    @staticmethod
+    def _result(session: ProfileSession, mode: str) -> Dict[str, Any]:
+        profiler = session.profiler
+        return {
+            "profile_id": session.id,
+            "mode": mode,
+            "route": session.route,
+            "requests_profiled": session.completed_requests,
+            "started_at": profiler.started_at,
+            "duration_s": round((profiler.stopped_at or time.time()) - profiler.started_at, 3),
+            "interval_ms": profiler.interval * 1000,
+            "samples": profiler.samples,
+            "threads": profiler.thread_breakdown(),
+            "top_functions": profiler.top_functions(),
+            "collapsed": profiler.collapsed(),
+        }
+
+
+profiler_controller = ProfilerController()
+
+
+class ProfilingMiddleware:
+    """Reports requests matching the active profile's route to the controller"""
+
+    def __init__(self, app, controller: ProfilerController = profiler_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        session = self.controller.session
+        if scope["type"] != "http" or session is None or not session.matches(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        session.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session.request_finished()
@@ -1,97 +1,114 @@
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import time
 
 from app.services.ml_service import ml_service
-from app.services.cloudinary_service import cloudinary_service
+from app.services.storage_service import storage_service
+from app.utils.telemetry import telemetry, ml_timings
+from app.utils.tracing import span
+
+MAX_CONCURRENT_PREDICTIONS = 3
 
 ml_queue: asyncio.Queue[bytes] = asyncio.Queue()
-ml_semaphore = asyncio.Semaphore(3)  # max 3 concurrent predictions
+ml_semaphore = asyncio.Semaphore(MAX_CONCURRENT_PREDICTIONS)
 
-# Thread pool for blocking I/O (Cloudinary)
+# Thread pool for blocking ML inference (uploads run on the event loop)
 _executor = ThreadPoolExecutor(max_workers=4)
 
-queue_stats: Dict[str, Any] = {
-    "total_processed": 0,
-    "currently_processing": 0,
-    "queued": 0,
-    "requests": {},  # request_id -> status dict
-}
 
+async def _timed_upload(contents: bytes) -> Dict[str, Any]:
+    with span("storage.upload", bytes=len(contents)):
+        upload_start = time.perf_counter()
+        result = await storage_service.upload_image(contents)
+        telemetry.observe("upload", time.perf_counter() - upload_start)
+    return result
+
+
+async def _traced_inference(analyze, contents: bytes) -> Dict[str, Any]:
+    loop = asyncio.get_event_loop()
+    with span("ml.analyze") as ml_span:
+        result = await loop.run_in_executor(_executor, analyze, contents)
+        if ml_span is not None:
+            # Stages run in the executor thread; attach their measured timings
+            ml_span.add_timings(ml_timings(result))
+    return result
 
-async def process_ml_prediction(request_id: str, contents: bytes) -> Dict[str, Any]:
+
+async def process_ml_prediction(
+    request_id: str,
+    contents: bytes,
+    multi_object: bool = False,
+    defer_upload: bool = False,
+) -> Dict[str, Any]:
     """
-    Optimized pipeline: runs Cloudinary upload IN PARALLEL with ML analysis.
+    Optimized pipeline: runs the async storage upload IN PARALLEL with ML
+    analysis, so the inference executor is never occupied by upload I/O.
+    With multi_object=True every plant region in the photo is classified
+    in one batched pass (see MLService.analyze_image_regions).
+    With defer_upload=True the upload is skipped and upload_info is
+    {"status": "pending"}; the caller hands the bytes to the upload outbox.
     """
-    async with ml_semaphore:
-        queue_stats["currently_processing"] += 1
-        queue_stats["requests"][request_id] = {
-            "status": "processing",
-            "started_at": datetime.now().isoformat(),
-        }
-        timings: Dict[str, float] = {}
-        pipeline_start = time.perf_counter()
-
-        try:
-            loop = asyncio.get_event_loop()
-
-            # ── Run Cloudinary upload and ML analysis in PARALLEL ──
-            upload_task = loop.run_in_executor(
-                _executor, cloudinary_service.upload_image, contents
-            )
-            ml_task = loop.run_in_executor(
-                _executor, ml_service.analyze_image, contents
-            )
-
-            # Wait for both to complete
-            upload_result, result = await asyncio.gather(upload_task, ml_task)
-
-            timings["total"] = round(time.perf_counter() - pipeline_start, 3)
-
-            queue_stats["requests"][request_id] = {
-                "status": "completed",
-                "started_at": queue_stats["requests"][request_id]["started_at"],
-                "completed_at": datetime.now().isoformat(),
-                "timings": timings,
-            }
-            queue_stats["total_processed"] += 1
-
-            return {
-                "status": "success",
-                "analysis": result,
-                "upload_info": upload_result,
-                "request_id": request_id,
-                "timings": timings,
-            }
-        except Exception as e:
-            queue_stats["requests"][request_id] = {
-                "status": "error",
-                "error": str(e),
-                "started_at": queue_stats["requests"][request_id]["started_at"],
-                "completed_at": datetime.now().isoformat(),
-            }
-            raise
-        finally:
-            queue_stats["currently_processing"] -= 1
-            if len(queue_stats["requests"]) > 100:
-                oldest = min(
-                    queue_stats["requests"].keys(),
-                    key=lambda k: queue_stats["requests"][k].get("started_at", ""),
-                )
-                del queue_stats["requests"][oldest]
-                del queue_stats["requests"][oldest]
+    with span("ml.pipeline", multi_object=multi_object, defer_upload=defer_upload) as pipeline_span:
+        wait_start = time.perf_counter()
+        async with ml_semaphore:
+            queue_wait = time.perf_counter() - wait_start
+            telemetry.observe("queue_wait", queue_wait)
+            if pipeline_span is not None:
+                pipeline_span.set(queue_wait_ms=round(queue_wait * 1000, 3))
+            record = telemetry.request_started(request_id)
+            timings: Dict[str, float] = {}
+            pipeline_start = time.perf_counter()
+            error: Optional[BaseException] = None
+
+            try:
+                analyze = ml_service.analyze_image_regions if multi_object else ml_service.analyze_image
+                ml_task = asyncio.ensure_future(_traced_inference(analyze, contents))
+
+                if defer_upload:
+                    result = await ml_task
+                    upload_result = {"status": "pending"}
+                else:
+                    # ── Run storage upload and ML analysis in PARALLEL ──
+                    upload_task = asyncio.ensure_future(_timed_upload(contents))
+
+                    # Wait for both to complete
+                    upload_result, result = await asyncio.gather(upload_task, ml_task)
+
+                elapsed = time.perf_counter() - pipeline_start
+                timings["total"] = round(elapsed, 3)
+                telemetry.observe("total", elapsed)
+                telemetry.observe_ml_timings(result)
+
+                return {
+                    "status": "success",
+                    "analysis": result,
+                    "upload_info": upload_result,
+                    "request_id": request_id,
+                    "timings": timings,
+                }
+            except BaseException as e:
+                # Cancellation (client gone, timeout) included
+                error = e
+                raise
+            finally:
+                if error is None:
+                    telemetry.request_finished(record, timings=timings)
+                else:
+                    telemetry.request_finished(record, error=error)
+
 
 def get_queue_status() -> Dict[str, Any]:
-    queue_stats["queued"] = ml_queue.qsize()
     return {
         "queue_status": {
-            "currently_processing": queue_stats["currently_processing"],
-            "queued": queue_stats["queued"],
-            "max_concurrent": 3,
-            "total_processed": queue_stats["total_processed"],
+            "currently_processing": telemetry.currently_processing,
+            "queued": ml_queue.qsize(),
+            "max_concurrent": MAX_CONCURRENT_PREDICTIONS,
+            "total_processed": telemetry.total_processed,
+            "total_failed": telemetry.total_failed,
         },
-        "recent_requests": dict(list(queue_stats["requests"].items())[-10:]),
+        "latency_seconds": telemetry.latency_summary(),
+        "recent_requests": telemetry.recent_requests(10),
         "timestamp": datetime.now().isoformat(),
-    }
\ No newline at end of file
+    }
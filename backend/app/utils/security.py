@@ -1,21 +1,37 @@
+from typing import Optional, Tuple
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 
 from app.config import get_settings
 
+settings = get_settings()
+
 # Use a different approach for password hashing
 pwd_context = CryptContext(
     schemes=["pbkdf2_sha256", "bcrypt"],  # Try pbkdf2 first, fallback to bcrypt
     deprecated="auto",
-    pbkdf2_sha256__default_rounds=30000,
+    pbkdf2_sha256__default_rounds=settings.password_pbkdf2_rounds,
+    # Hashes with fewer rounds (or bcrypt ones) are upgraded on the next login
+    pbkdf2_sha256__min_rounds=settings.password_pbkdf2_rounds,
 )
-settings = get_settings()
 
 # Password utilities
+# These block for the whole key derivation; request handlers go through
+# app.utils.password_hasher, which runs them in a process pool
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and, when its hash uses outdated parameters, rehash it
+
+    Returns:
+        (matches, new_hash) - new_hash is None unless the stored hash should be replaced
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """Hash a password"""
     try:
@@ -0,0 +1,252 @@
+"""
+Queue & pipeline telemetry.
+
+  • RingBuffer        – fixed-size buffer of recent requests (O(1) eviction)
+  • LatencyHistogram  – cumulative buckets with p50/p95/p99 estimates
+  • Telemetry         – counters + per-stage histograms, rendered for
+                        /api/queue/status and the Prometheus /metrics endpoint
+
+All mutation happens on the event-loop thread (executor results are
+recorded after they are awaited), so plain integer updates are atomic
+with respect to each other and no locks are needed.
+"""
+import bisect
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+# Bucket upper bounds in seconds (Prometheus "le" labels)
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# Pipeline stages reported by /api/queue/status and /metrics
+STAGES = ("queue_wait", "preprocess", "part", "disease", "spots", "upload", "db_save", "total")
+
+# MLService timing keys -> telemetry stage names
+ML_TIMING_STAGES = {
+    "preprocessing": "preprocess",
+    "region_proposal": "preprocess",
+    "part_classification": "part",
+    "disease_classification": "disease",
+    "spot_detection": "spots",
+}
+
+
+def ml_timings(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Stage timings from an MLService result (success or rejection shape)"""
+    performance = (analysis or {}).get("performance") or {}
+    return performance.get("timings", performance)
+
+
+class RingBuffer:
+    """Fixed-size buffer that keeps the most recent items"""
+
+    def __init__(self, size: int):
+        self._items: Deque[Any] = deque(maxlen=size)
+
+    def append(self, item: Any) -> None:
+        self._items.append(item)
+
+    def latest(self, n: int) -> List[Any]:
+        if n <= 0:
+            return []
+        start = max(0, len(self._items) - n)
+        return [self._items[i] for i in range(start, len(self._items))]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class LatencyHistogram:
+    """Latency histogram with fixed buckets and interpolated quantiles"""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                fraction = (rank - cumulative) / bucket_count
+                return min(lower + (upper - lower) * fraction, self.max)
+            cumulative += bucket_count
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        def _round(v):
+            return round(v, 4) if v is not None else None
+
+        return {
+            "count": self.count,
+            "mean": _round(self.sum / self.count) if self.count else None,
+            "p50": _round(self.quantile(0.50)),
+            "p95": _round(self.quantile(0.95)),
+            "p99": _round(self.quantile(0.99)),
+            "max": _round(self.max) if self.count else None,
+        }
+
+    def cumulative_buckets(self) -> List[tuple]:
+        """(le, cumulative count) pairs in Prometheus order"""
+        result = []
+        running = 0
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            running += bucket_count
+            result.append((bound, running))
+        result.append(("+Inf", self.count))
+        return result
+
+
+class Telemetry:
+    """Counters, recent-request ring buffer and per-stage latency histograms"""
+
+    def __init__(self, recent_size: int = 100):
+        self.started_at = time.time()
+        self.total_processed = 0
+        self.total_failed = 0
+        self.currently_processing = 0
+        self.recent = RingBuffer(recent_size)
+        self.stages: Dict[str, LatencyHistogram] = {s: LatencyHistogram() for s in STAGES}
+        self._gauges: Dict[str, Any] = {}
+        self._counters: Dict[str, Any] = {}
+        self._histograms: Dict[str, Tuple[LatencyHistogram, str]] = {}
+
+    # ── Recording ────────────────────────────────────────────────
+    def request_started(self, request_id: str) -> Dict[str, Any]:
+        """Create and buffer a record; the caller updates it in place"""
+        record = {
+            "request_id": request_id,
+            "status": "processing",
+            "started_at": datetime.now().isoformat(),
+        }
+        self.recent.append(record)
+        self.currently_processing += 1
+        return record
+
+    def request_finished(
+        self, record: Dict[str, Any], error: Optional[BaseException] = None, **fields: Any
+    ) -> None:
+        self.currently_processing -= 1
+        record["completed_at"] = datetime.now().isoformat()
+        if error is None:
+            record["status"] = "completed"
+            self.total_processed += 1
+        else:
+            record["status"] = "error"
+            record["error"] = str(error) or type(error).__name__
+            self.total_failed += 1
+        record.update(fields)
+
+    def observe(self, stage: str, seconds: Optional[float]) -> None:
+        if seconds is None:
+            return
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        histogram.observe(float(seconds))
+
+    def observe_ml_timings(self, analysis: Dict[str, Any]) -> None:
+        """Record stage latencies from an MLService result's performance block"""
+        timings = ml_timings(analysis)
+        per_stage: Dict[str, float] = {}
+        for key, stage in ML_TIMING_STAGES.items():
+            if isinstance(timings.get(key), (int, float)):
+                per_stage[stage] = per_stage.get(stage, 0.0) + timings[key]
+        for stage, seconds in per_stage.items():
+            self.observe(stage, seconds)
+
+    def register_gauge(self, name: str, read) -> None:
+        """Expose a callable returning a number as a gauge on /metrics"""
+        self._gauges[name] = read
+
+    def register_counter(self, name: str, read) -> None:
+        """Expose a callable returning a monotonically increasing count as a counter on /metrics"""
+        self._counters[name] = read
+
+    def register_histogram(self, name: str, histogram: LatencyHistogram, help_text: str) -> None:
+        """Expose a histogram owned by another component on /metrics"""
+        self._histograms[name] = (histogram, help_text)
+
+    # ── Reporting ────────────────────────────────────────────────
+    def recent_requests(self, n: int = 10) -> Dict[str, Dict[str, Any]]:
+        return {
+            record["request_id"]: {k: v for k, v in record.items() if k != "request_id"}
+            for record in self.recent.latest(n)
+        }
+
+    def latency_summary(self) -> Dict[str, Dict[str, Any]]:
+        return {stage: hist.summary() for stage, hist in self.stages.items()}
+
+    def render_prometheus(self, extra_gauges: Optional[Dict[str, float]] = None) -> str:
+        """Render metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP tomatoguard_ml_requests_total Completed ML pipeline requests.",
+            "# TYPE tomatoguard_ml_requests_total counter",
+            f'tomatoguard_ml_requests_total{{status="success"}} {self.total_processed}',
+            f'tomatoguard_ml_requests_total{{status="error"}} {self.total_failed}',
+            "# HELP tomatoguard_ml_in_progress ML pipeline requests currently processing.",
+            "# TYPE tomatoguard_ml_in_progress gauge",
+            f"tomatoguard_ml_in_progress {self.currently_processing}",
+            "# HELP tomatoguard_uptime_seconds Seconds since telemetry started.",
+            "# TYPE tomatoguard_uptime_seconds gauge",
+            f"tomatoguard_uptime_seconds {time.time() - self.started_at:.3f}",
+        ]
+
+        gauges = dict(extra_gauges or {})
+        for name, read in self._gauges.items():
+            try:
+                gauges[name] = read()
+            except Exception:
+                continue
+        for name, value in gauges.items():
+            lines.append(f"# TYPE tomatoguard_{name} gauge")
+            lines.append(f"tomatoguard_{name} {value}")
+        for name, read in self._counters.items():
+            try:
+                value = read()
+            except Exception:
+                continue
+            lines.append(f"# TYPE tomatoguard_{name} counter")
+            lines.append(f"tomatoguard_{name} {value}")
+
+        lines.append("# HELP tomatoguard_stage_latency_seconds Latency per pipeline stage.")
+        lines.append("# TYPE tomatoguard_stage_latency_seconds histogram")
+        for stage, hist in self.stages.items():
+            for bound, cumulative in hist.cumulative_buckets():
+                lines.append(
+                    f'tomatoguard_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'tomatoguard_stage_latency_seconds_sum{{stage="{stage}"}} {hist.sum:.6f}')
+            lines.append(f'tomatoguard_stage_latency_seconds_count{{stage="{stage}"}} {hist.count}')
+
+        for name, (hist, help_text) in self._histograms.items():
+            lines.append(f"# HELP tomatoguard_{name} {help_text}")
+            lines.append(f"# TYPE tomatoguard_{name} histogram")
+            for bound, cumulative in hist.cumulative_buckets():
+                lines.append(f'tomatoguard_{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f"tomatoguard_{name}_sum {hist.sum:.6f}")
+            lines.append(f"tomatoguard_{name}_count {hist.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+telemetry = Telemetry()
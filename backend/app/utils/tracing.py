@@ -0,0 +1,272 @@
+"""
+Request tracing.
+
+TracingMiddleware opens a root span per HTTP request; code below it opens
+child spans with `span("name")`, which nest through a contextvar so the
+same call works in routes, services and tasks spawned from them.
+Finished traces go to a pluggable exporter:
+
+  • none    – tracing disabled (default, zero overhead beyond a contextvar read)
+  • ndjson  – one JSON line per span appended to TRACING_FILE
+  • log     – one summary log line per trace
+
+Select with TRACING_EXPORTER=none|ndjson|log. Only traces slower than
+TRACING_MIN_DURATION_MS are exported, so production can keep just the
+slow requests.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from fastapi.responses import JSONResponse
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed unit of work; children are nested spans"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "start_time",
+        "_start", "duration", "attributes", "children", "error",
+    )
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None, **attributes: Any):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.attributes: Dict[str, Any] = attributes
+        self.children: List["Span"] = []
+        self.error: Optional[str] = None
+
+    def child(self, name: str, **attributes: Any) -> "Span":
+        span = Span(name, self.trace_id, self.span_id, **attributes)
+        self.children.append(span)
+        return span
+
+    def finish(self) -> None:
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def add_timings(self, timings: Dict[str, Any], skip=("total",)) -> None:
+        """
+        Attach pre-measured stage durations (e.g. MLService timings) as
+        sequential child spans starting at this span's start.
+        """
+        offset = 0.0
+        for name, seconds in timings.items():
+            if name in skip or not isinstance(seconds, (int, float)):
+                continue
+            span = self.child(name)
+            span.start_time = self.start_time + offset
+            span.duration = float(seconds)
+            offset += seconds
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": round(self.start_time, 6),
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    Time a block as a child of the current span.
+    A no-op (yields None) when there is no active trace.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    current = parent.child(name, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = f"{e.__class__.__name__}: {e}"
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+
+
+def traced(name: str):
+    """Decorator that runs an async function inside span(name)"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+# ──────────────────────────────────────────────────────────────────────
+# Exporters
+# ──────────────────────────────────────────────────────────────────────
+class SpanExporter(ABC):
+    """Receives finished root spans. export() may block; it runs off-loop."""
+
+    @abstractmethod
+    def export(self, root: Span) -> None:
+        """Write out a finished root span and its children"""
+
+    def close(self) -> None:
+        pass
+
+
+class NDJSONFileExporter(SpanExporter):
+    """Appends one JSON object per span to a file (for offline analysis)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, root: Span) -> None:
+        lines = "".join(
+            json.dumps(s.to_dict(), default=str) + "\n" for s in root.walk()
+        )
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class LogExporter(SpanExporter):
+    """Logs one line per trace with the top-level stage breakdown"""
+
+    def export(self, root: Span) -> None:
+        stages = ", ".join(
+            f"{c.name}={(c.duration or 0) * 1000:.0f}ms" for c in root.children
+        )
+        logger.info(
+            f"🧭 trace {root.trace_id} {root.name} "
+            f"{(root.duration or 0) * 1000:.0f}ms [{stages}]"
+        )
+
+
+def create_exporter(name: str, path: str) -> Optional[SpanExporter]:
+    if name in ("", "none"):
+        return None
+    if name == "ndjson":
+        return NDJSONFileExporter(path)
+    if name == "log":
+        return LogExporter()
+    raise ValueError(f"Unknown TRACING_EXPORTER '{name}' (expected 'none', 'ndjson' or 'log')")
+
+
+# ──────────────────────────────────────────────────────────────────────
+# Middleware
+# ──────────────────────────────────────────────────────────────────────
+class TracingMiddleware:
+    """ASGI middleware that opens a root span per HTTP request"""
+
+    def __init__(
+        self,
+        app,
+        exporter: Optional[SpanExporter] = None,
+        sample_rate: float = 1.0,
+        min_duration_ms: float = 0.0,
+    ):
+        self.app = app
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.min_duration = min_duration_ms / 1000.0
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or self.exporter is None
+            or random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        root = Span(
+            f"{scope['method']} {scope['path']}",
+            trace_id=uuid.uuid4().hex,
+            method=scope["method"],
+            path=scope["path"],
+        )
+        token = _current_span.set(root)
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                root.set(status_code=message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", root.trace_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        except Exception as e:
+            root.error = f"{e.__class__.__name__}: {e}"
+            raise
+        finally:
+            root.finish()
+            _current_span.reset(token)
+            if root.duration >= self.min_duration:
+                try:
+                    await asyncio.to_thread(self.exporter.export, root)
+                except Exception as e:
+                    logger.warning(f"⚠️ Trace export failed: {e}")
+
+
+class TracedJSONResponse(JSONResponse):
+    """JSONResponse that records serialization time as a json_encode span"""
+
+    def render(self, content: Any) -> bytes:
+        with span("json_encode") as s:
+            body = super().render(content)
+            if s is not None:
+                s.set(bytes=len(body))
+            return body
+
+
+def build_tracing_middleware_kwargs() -> Dict[str, Any]:
+    """Middleware options from settings"""
+    settings = get_settings()
+    return {
+        "exporter": create_exporter(settings.tracing_exporter, settings.tracing_file),
+        "sample_rate": settings.tracing_sample_rate,
+        "min_duration_ms": settings.tracing_min_duration_ms,
+    }
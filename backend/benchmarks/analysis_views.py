@@ -0,0 +1,108 @@
+"""
+Payload size and latency of the analysis read views.
+
+Saves one realistic analysis (stub ML pipeline output, base64 images
+included) and reads it back through AnalysisService.get_analysis_document
+with each view of GET /api/analysis/{id}. "full" is the whole document,
+i.e. what every read returned before views existed. Reports the JSON
+response size and the read latency per view.
+
+Usage (from backend/):
+    python -m benchmarks.analysis_views
+    python -m benchmarks.analysis_views --multi-object --mongo-uri mongodb://localhost:27017 \\
+        --output benchmarks/results/analysis_views.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import print_table, run_metadata, summarize, write_json  # noqa: E402
+from benchmarks.save_analysis import get_client, sample_analysis_result, time_async  # noqa: E402
+
+
+def payload_bytes(document: Dict[str, Any]) -> int:
+    from fastapi.encoders import jsonable_encoder
+
+    return len(json.dumps(jsonable_encoder(document)).encode())
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    from app.models.analysis_model import AnalysisCreate
+    from app.services.analysis_service import ANALYSIS_VIEWS, AnalysisService
+
+    client = get_client(args.mongo_uri)
+    db = client[args.db_name]
+    service = AnalysisService(db)
+
+    saved = await service.save_analysis(AnalysisCreate(
+        user_id="benchmark-user",
+        image_url="http://localhost/storage/benchmark.jpg",
+        cloudinary_public_id="benchmark",
+        analysis_result=sample_analysis_result(args.megapixels, args.multi_object),
+        notes="Benchmark analysis",
+        tags=["benchmark"],
+    ))
+
+    rows = []
+    try:
+        full_size = None
+        for view in reversed(list(ANALYSIS_VIEWS)):  # full first, as the baseline
+            def read(view=view):
+                return service.get_analysis_document(saved.id, "benchmark-user", view=view)
+
+            size = payload_bytes(await read())
+            full_size = full_size or size
+            wall, _ = await time_async(read, args.iterations)
+            rows.append({
+                "view": view,
+                "bytes": size,
+                "vs_full_pct": round(100 * size / full_size, 2),
+                **summarize(wall),
+            })
+    finally:
+        await db.analyses.delete_one({"_id": ObjectId(saved.id)})
+        client.close()
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark payload size of the analysis read views")
+    parser.add_argument("--mongo-uri", default="mongomock://localhost",
+                        help="mongomock://… for the in-memory fake, or a local mongodb:// URI")
+    parser.add_argument("--db-name", default="tomato_guard_benchmark")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--megapixels", type=float, default=1.0,
+                        help="Size of the synthetic image behind the analysis_result")
+    parser.add_argument("--multi-object", action="store_true",
+                        help="Use a multi-region analysis_result")
+    parser.add_argument("--output", help="Write JSON results to this path ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+    rows = asyncio.run(run(args))
+
+    print()
+    print_table(rows, ["view", "bytes", "vs_full_pct", "n", "mean_ms", "p50_ms", "p95_ms"])
+
+    write_json(args.output, {
+        "benchmark": "analysis_views",
+        "meta": run_metadata(
+            mongo_uri=args.mongo_uri.split("@")[-1],
+            iterations=args.iterations,
+            megapixels=args.megapixels,
+            multi_object=args.multi_object,
+        ),
+        "results": rows,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
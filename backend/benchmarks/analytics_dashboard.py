@@ -0,0 +1,165 @@
+"""
+Benchmark for the combined admin analytics payload (GET /api/analytics/full).
+
+Seeds a collection of synthetic analyses (canonical top-level fields,
+spread over the last 90 days), builds the rollups from it, then times:
+
+  • sequential – every section awaited one after the other, each with its
+                 own query (how get_full_ml_analytics used to run)
+  • combined   – get_full_ml_analytics: one $facet pass over the rollups,
+                 gathered concurrently with the recent / scatter feeds
+  • cached     – get_full_ml_analytics with the analytics cache warm
+
+The analytics cache is disabled for the first two variants. Both produce
+the same payload; the benchmark checks that before timing.
+
+Use a local mongod for meaningful numbers; mongomock runs every query in
+Python and is only useful as a smoke test (use --docs 20000 or so).
+
+Usage (from backend/):
+    python -m benchmarks.analytics_dashboard --mongo-uri mongodb://localhost:27017
+    python -m benchmarks.analytics_dashboard --mongo-uri mongodb://localhost:27017 \\
+        --skip-seed --iterations 50 --output benchmarks/results/analytics_dashboard.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import print_table, run_metadata, summarize, write_json  # noqa: E402
+from benchmarks.save_analysis import get_client, time_async  # noqa: E402
+
+SEED_BATCH = 10_000
+
+
+def synthetic_analysis(rng: random.Random, now: datetime) -> Dict[str, Any]:
+    from app.services.analysis_service import ANALYSIS_SCHEMA_VERSION
+    from app.services.analytics_service import ALL_DISEASES
+
+    part = rng.choice(list(ALL_DISEASES))
+    return {
+        "user_id": f"user-{rng.randrange(5000)}",
+        "image_url": "http://localhost/storage/benchmark.jpg",
+        "created_at": now - timedelta(seconds=rng.randrange(90 * 86400)),
+        "plant_part": part,
+        "disease": rng.choice(ALL_DISEASES[part]),
+        "confidence": round(rng.betavariate(8, 2), 4),
+        "severity": rng.choice([None, "mild", "moderate", "severe"]),
+        "schema_version": ANALYSIS_SCHEMA_VERSION,
+        "is_favorite": False,
+        "tags": [],
+    }
+
+
+async def seed(db, docs: int) -> None:
+    from app.services.analytics_rollups import AnalyticsRollupService
+    from app.services.indexes import index_manager
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    await db.analyses.delete_many({})
+    started = time.perf_counter()
+    for offset in range(0, docs, SEED_BATCH):
+        batch = [synthetic_analysis(rng, now) for _ in range(min(SEED_BATCH, docs - offset))]
+        await db.analyses.insert_many(batch, ordered=False)
+    await index_manager.ensure(db, collections=["analyses", "analytics_rollups"])
+    rows = await AnalyticsRollupService(db).rebuild()
+    print(f"🌱 Seeded {docs} analyses ({rows} rollup rows) in {time.perf_counter() - started:.1f}s")
+
+
+async def sequential(service, trend_days: int) -> Dict[str, Any]:
+    """Every section on its own, one at a time (caching bypassed via .uncached)"""
+    cls = type(service)
+    return {
+        "overview": await cls.get_overview.uncached(service),
+        "disease_stats": await cls.get_disease_detection_stats.uncached(service),
+        "model_evaluation": service.get_model_evaluation(),
+        "detection_trends": await cls.get_detection_trends.uncached(service, days=trend_days),
+        "confidence_distribution": await cls.get_confidence_distribution.uncached(service),
+        "part_distribution": await cls.get_part_distribution.uncached(service),
+        "recent_analyses": await cls.get_recent_analyses.uncached(service),
+        "scatter_plot_data": await cls.get_scatter_plot_data.uncached(service),
+    }
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    from app.services.analytics_service import AnalyticsService, analytics_cache
+
+    client = get_client(args.mongo_uri)
+    db = client[args.db_name]
+    service = AnalyticsService(db)
+
+    rows = []
+    try:
+        if not args.skip_seed:
+            await seed(db, args.docs)
+
+        analytics_cache.enabled = False
+        a = await sequential(service, args.trend_days)
+        b = await service.get_full_ml_analytics(trend_days=args.trend_days)
+        for section in ("overview", "disease_stats", "detection_trends",
+                        "confidence_distribution", "part_distribution"):
+            assert a[section] == b[section], f"{section} differs between variants"
+
+        variants = {
+            "sequential": lambda: sequential(service, args.trend_days),
+            "combined": lambda: service.get_full_ml_analytics(trend_days=args.trend_days),
+        }
+        for name, fn in variants.items():
+            wall, cpu = await time_async(fn, args.iterations, warmup=2)
+            rows.append({"variant": name, **summarize(wall),
+                         "cpu_mean_ms": round(1000 * sum(cpu) / len(cpu), 3)})
+
+        analytics_cache.enabled = True
+        wall, cpu = await time_async(
+            lambda: service.get_full_ml_analytics(trend_days=args.trend_days), args.iterations, warmup=2
+        )
+        rows.append({"variant": "cached", **summarize(wall),
+                     "cpu_mean_ms": round(1000 * sum(cpu) / len(cpu), 3)})
+    finally:
+        if args.drop:
+            await db.analyses.delete_many({})
+            await db.analytics_rollups.delete_many({})
+        client.close()
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the combined admin analytics payload")
+    parser.add_argument("--mongo-uri", default="mongomock://localhost",
+                        help="mongomock://… for the in-memory fake, or a local mongodb:// URI")
+    parser.add_argument("--db-name", default="tomato_guard_benchmark")
+    parser.add_argument("--docs", type=int, default=1_000_000, help="Analyses to seed")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the collection from a previous run")
+    parser.add_argument("--drop", action="store_true", help="Delete the seeded data afterwards")
+    parser.add_argument("--trend-days", type=int, default=30)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", help="Write JSON results to this path ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    rows = asyncio.run(run(args))
+
+    print()
+    print_table(rows, ["variant", "n", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "cpu_mean_ms"])
+
+    write_json(args.output, {
+        "benchmark": "analytics_dashboard",
+        "meta": run_metadata(
+            mongo_uri=args.mongo_uri.split("@")[-1],
+            docs=args.docs,
+            trend_days=args.trend_days,
+            iterations=args.iterations,
+        ),
+        "results": rows,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
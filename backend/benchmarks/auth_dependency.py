@@ -0,0 +1,101 @@
+"""
+Cost of authenticating a request in get_current_user.
+
+Creates one user and resolves the same access token repeatedly through
+the get_current_user dependency in three modes:
+
+  • database       – authenticated-user cache disabled: one users.find_one
+                     per request, as before the cache existed
+  • cached         – served from user_service's authenticated-user cache
+  • token_claims   – AUTH_TRUST_TOKEN_CLAIMS_SECONDS on: the user comes
+                     from the access token's own claims
+
+Every mode includes decoding and verifying the JWT.
+
+Usage (from backend/):
+    python -m benchmarks.auth_dependency
+    python -m benchmarks.auth_dependency --mongo-uri mongodb://localhost:27017 \\
+        --output benchmarks/results/auth_dependency.json
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from benchmarks.common import print_table, run_metadata, summarize, write_json  # noqa: E402
+from benchmarks.save_analysis import get_client, time_async  # noqa: E402
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    from app.dependencies import auth as auth_dependency
+    from app.services.auth_service import auth_service
+    from app.services.user_service import user_service
+
+    client = get_client(args.mongo_uri)
+    db = client[args.db_name]
+    user_service._users_collection = db.users
+
+    inserted = await db.users.insert_one({
+        "email": "benchmark@example.com",
+        "full_name": "Benchmark User",
+        "role": "user",
+        "is_active": True,
+        "created_at": datetime.utcnow(),
+    })
+    user_id = str(inserted.inserted_id)
+    user = await user_service.get_user_by_id(user_id)
+    token = auth_service.create_tokens(
+        user_id, user.email, user.role, **auth_service.profile_claims(user)
+    )["access_token"]
+
+    def authenticate():
+        return auth_dependency.get_current_user(token)
+
+    settings = auth_dependency.settings
+    cache_enabled, trust_window = user_service.auth_cache.enabled, settings.auth_trust_token_claims_seconds
+    rows = []
+    try:
+        for mode, enabled, window in (("database", False, 0.0), ("cached", True, 0.0), ("token_claims", True, 3600.0)):
+            user_service.auth_cache.enabled = enabled
+            settings.auth_trust_token_claims_seconds = window
+            user_service.auth_cache.discard(user_id)
+            wall, _ = await time_async(authenticate, args.iterations)
+            rows.append({"mode": mode, **summarize(wall)})
+    finally:
+        user_service.auth_cache.enabled = cache_enabled
+        settings.auth_trust_token_claims_seconds = trust_window
+        await db.users.delete_one({"_id": inserted.inserted_id})
+        client.close()
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark get_current_user with and without the user cache")
+    parser.add_argument("--mongo-uri", default="mongomock://localhost",
+                        help="mongomock://… for the in-memory fake, or a local mongodb:// URI")
+    parser.add_argument("--db-name", default="tomato_guard_benchmark")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", help="Write JSON results to this path ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    rows = asyncio.run(run(args))
+
+    print()
+    print_table(rows, ["mode", "n", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+    write_json(args.output, {
+        "benchmark": "auth_dependency",
+        "meta": run_metadata(mongo_uri=args.mongo_uri.split("@")[-1], iterations=args.iterations),
+        "results": rows,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Shared helpers for the benchmark scripts: timing, percentile summaries,
+run metadata and JSON output so results can be compared across commits.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+def summarize(samples: List[float], items_per_sample: int = 1) -> Dict[str, Any]:
+    """Latency percentiles (ms) and throughput (items/s) for timings in seconds"""
+    if not samples:
+        return {"n": 0}
+    arr = np.asarray(samples, dtype=np.float64)
+    total = float(arr.sum())
+    return {
+        "n": len(samples),
+        "mean_ms": round(float(arr.mean()) * 1000, 3),
+        "p50_ms": round(float(np.percentile(arr, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(arr, 95)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(arr, 99)) * 1000, 3),
+        "max_ms": round(float(arr.max()) * 1000, 3),
+        "throughput_per_s": round(len(samples) * items_per_sample / total, 2) if total > 0 else None,
+    }
+
+
+def time_call(fn: Callable[[], Any], iterations: int, warmup: int = 1) -> List[float]:
+    """Run fn warmup + iterations times and return the timed durations"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def run_metadata(**extra: Any) -> Dict[str, Any]:
+    return {
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        **extra,
+    }
+
+
+def write_json(path: Optional[str], payload: Dict[str, Any]) -> None:
+    """Write results to path, or stdout when path is '-'"""
+    if not path:
+        return
+    text = json.dumps(payload, indent=2, default=str)
+    if path == "-":
+        print(text)
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
+    print(f"💾 Results written to {path}")
+
+
+def print_table(rows: List[Dict[str, Any]], columns: List[str]) -> None:
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in rows)) for c in columns} if rows else {}
+    print("  ".join(c.ljust(widths.get(c, len(c))) for c in columns))
+    for row in rows:
+        print("  ".join(str(row.get(c, "")).ljust(widths[c]) for c in columns))
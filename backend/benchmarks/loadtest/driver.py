@@ -0,0 +1,176 @@
+"""
+Load-test scenario driver.
+
+Replays a traffic mix (see scenarios.MIXES) against a running API with a
+fixed number of concurrent virtual users, then reports per-endpoint
+throughput, error rate and latency percentiles.
+
+Virtual users sign in through /firebase-login with stub tokens, so the
+target must run with the stub verifier (benchmarks.loadtest.server).
+
+Usage (from backend/, with the server running):
+    python -m benchmarks.loadtest.driver --mix mobile --concurrency 32 --duration 60
+    python -m benchmarks.loadtest.driver --mix analyze_heavy --requests 2000 \\
+        --output benchmarks/results/loadtest.json
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from benchmarks.common import print_table, run_metadata, summarize, write_json  # noqa: E402
+from benchmarks.loadtest.scenarios import MIXES, OPERATIONS, upload_images  # noqa: E402
+from benchmarks.loadtest.stubs import ADMIN_EMAIL, ADMIN_PASSWORD, stub_token  # noqa: E402
+
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.outcomes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, seconds: float, outcome) -> None:
+        """outcome is an HTTP status code, or an exception class name"""
+        self.latencies[name].append(seconds)
+        self.outcomes[name][str(outcome)] += 1
+        if not isinstance(outcome, int) or outcome >= 400:
+            self.errors[name] += 1
+
+    def report(self, elapsed: float) -> List[Dict]:
+        rows = []
+        for name in sorted(self.latencies):
+            samples = self.latencies[name]
+            summary = summarize(samples)
+            summary.pop("throughput_per_s", None)
+            rows.append({
+                "endpoint": name,
+                **summary,
+                "errors": self.errors[name],
+                "error_rate": round(self.errors[name] / len(samples), 4),
+                "rps": round(len(samples) / elapsed, 2),
+                "outcomes": dict(self.outcomes[name]),
+            })
+        return rows
+
+
+async def sign_in_users(client: httpx.AsyncClient, count: int) -> List[str]:
+    async def sign_in(i: int) -> str:
+        response = await client.post("/api/v1/auth/firebase-login", json={
+            "firebase_token": stub_token(f"loadtest-{i}", f"loadtest-{i}@example.com"),
+        })
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+    return await asyncio.gather(*(sign_in(i) for i in range(count)))
+
+
+async def sign_in_admin(client: httpx.AsyncClient) -> str:
+    response = await client.post("/api/v1/auth/login", json={
+        "email": ADMIN_EMAIL, "password": ADMIN_PASSWORD,
+    })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run(args) -> Dict:
+    mix = MIXES[args.mix]
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    upload_images()  # generate before the clock starts
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        tokens = await sign_in_users(client, args.users)
+        admin_token = await sign_in_admin(client) if "admin_analytics" in mix else None
+        print(f"👥 Signed in {len(tokens)} users; mix={args.mix} concurrency={args.concurrency}")
+
+        results = Results()
+        issued = 0
+        deadline = time.perf_counter() + args.duration if args.duration else None
+
+        async def worker(worker_id: int) -> None:
+            nonlocal issued
+            rng = random.Random(args.seed + worker_id)
+            token = tokens[worker_id % len(tokens)]
+            while True:
+                if deadline and time.perf_counter() >= deadline:
+                    return
+                if args.requests and issued >= args.requests:
+                    return
+                issued += 1
+
+                name = rng.choices(names, weights)[0]
+                request = OPERATIONS[name](rng)
+                headers = {"Authorization": f"Bearer {admin_token if request.admin else token}"}
+
+                start = time.perf_counter()
+                try:
+                    response = await client.request(request.method, request.url, headers=headers, **request.kwargs)
+                    outcome = response.status_code
+                except httpx.HTTPError as e:
+                    outcome = e.__class__.__name__
+                results.record(name, time.perf_counter() - start, outcome)
+
+                if args.think_ms:
+                    await asyncio.sleep(rng.expovariate(1000.0 / args.think_ms))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    rows = results.report(elapsed)
+    total = sum(len(v) for v in results.latencies.values())
+    overall = summarize([s for v in results.latencies.values() for s in v])
+    overall.pop("throughput_per_s", None)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "total_requests": total,
+        "rps": round(total / elapsed, 2) if elapsed else None,
+        "overall": overall,
+        "endpoints": rows,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a traffic mix against the API")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mobile")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=50, help="Distinct virtual user accounts")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run (0 = until --requests)")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean think time between requests")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this path ('-' for stdout)")
+    args = parser.parse_args(argv)
+    if not args.duration and not args.requests:
+        parser.error("set --duration and/or --requests")
+
+    summary = asyncio.run(run(args))
+
+    print(f"\n⏱️  {summary['total_requests']} requests in {summary['elapsed_s']}s "
+          f"({summary['rps']} req/s)")
+    print_table(summary["endpoints"], ["endpoint", "n", "rps", "p50_ms", "p95_ms", "p99_ms", "errors"])
+
+    write_json(args.output, {
+        "benchmark": "loadtest",
+        "meta": run_metadata(
+            base_url=args.base_url, mix=args.mix, concurrency=args.concurrency,
+            users=args.users, duration=args.duration, requests=args.requests,
+        ),
+        **summary,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
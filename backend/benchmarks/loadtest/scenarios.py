@@ -0,0 +1,99 @@
+"""
+Traffic mixes for the load-test driver.
+
+Each operation builds one HTTP request for a virtual user. Mix weights are
+relative; an operation's name is the endpoint label used in the report.
+"""
+import random
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from benchmarks.ml_pipeline import synthetic_image
+
+
+@dataclass
+class Request:
+    method: str
+    url: str
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    admin: bool = False
+
+
+# A few image sizes typical of phone uploads, generated once
+_UPLOAD_IMAGES: List[bytes] = []
+
+
+def upload_images() -> List[bytes]:
+    if not _UPLOAD_IMAGES:
+        _UPLOAD_IMAGES.extend(synthetic_image(mp, seed=i) for i, mp in enumerate((0.3, 1.0, 3.0)))
+    return _UPLOAD_IMAGES
+
+
+def analyze_upload(rng: random.Random) -> Request:
+    image = rng.choice(upload_images())
+    return Request("POST", "/api/analyze/upload", {
+        "files": {"file": ("leaf.jpg", image, "image/jpeg")},
+    })
+
+
+def history(rng: random.Random) -> Request:
+    return Request("GET", "/api/analysis/history", {"params": {"limit": 20}})
+
+
+def forum_feed(rng: random.Random) -> Request:
+    return Request("GET", "/api/v1/forum/posts", {"params": {"limit": 20}})
+
+
+def notifications_poll(rng: random.Random) -> Request:
+    return Request("GET", "/api/v1/notifications/unread-count")
+
+
+def chatbot(rng: random.Random) -> Request:
+    return Request("POST", "/api/chatbot/message", {
+        "json": {"message": "How do I treat early blight on my tomato leaves?"},
+    })
+
+
+def admin_analytics(rng: random.Random) -> Request:
+    path = rng.choice([
+        "/api/v1/analytics/overview",
+        "/api/v1/analytics/ml-overview",
+        "/api/v1/analytics/featured-disease-spotlight",
+    ])
+    return Request("GET", path, admin=True)
+
+
+OPERATIONS: Dict[str, Callable[[random.Random], Request]] = {
+    "analyze_upload": analyze_upload,
+    "history": history,
+    "forum_feed": forum_feed,
+    "notifications_poll": notifications_poll,
+    "chatbot": chatbot,
+    "admin_analytics": admin_analytics,
+}
+
+MIXES: Dict[str, Dict[str, float]] = {
+    # Typical mobile session: mostly polling and browsing
+    "mobile": {
+        "notifications_poll": 35,
+        "forum_feed": 25,
+        "history": 20,
+        "analyze_upload": 10,
+        "chatbot": 5,
+        "admin_analytics": 5,
+    },
+    # Harvest-season spike of diagnoses
+    "analyze_heavy": {
+        "analyze_upload": 50,
+        "history": 20,
+        "notifications_poll": 20,
+        "forum_feed": 10,
+    },
+    # Read paths only (no ML / storage)
+    "read_only": {
+        "notifications_poll": 40,
+        "forum_feed": 30,
+        "history": 25,
+        "admin_analytics": 5,
+    },
+}
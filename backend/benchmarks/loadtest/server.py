@@ -0,0 +1,113 @@
+"""
+Boot the TomatoGuard API in load-test mode.
+
+External dependencies are replaced with local stand-ins:
+
+  • MongoDB    – in-memory mongomock-motor fake (default) or a local mongod
+  • storage    – STORAGE_BACKEND=memory (metadata only, optional latency)
+  • ML models  – stub models from benchmarks.ml_pipeline
+  • Groq LLM   – stub OpenAI-compatible endpoint served on --llm-port
+  • Firebase   – stub verifier accepting "stub:<uid>:<email>" tokens
+
+An admin account (see stubs.ADMIN_EMAIL) is seeded at startup so the
+driver can exercise admin analytics. mongomock does not implement every
+aggregation operator (e.g. $isoWeek used by detection trends); use a
+local mongod for a full analytics profile.
+
+The mongomock fake is not an app dependency; install it with the other
+benchmark requirements first (pip install -r requirements-dev.txt).
+
+Usage (from backend/):
+    pip install -r requirements-dev.txt
+    python -m benchmarks.loadtest.server
+    python -m benchmarks.loadtest.server --mongo-uri mongodb://localhost:27017/tg_loadtest
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def configure_environment(args) -> None:
+    """Must run before anything under app/ is imported (settings are cached)"""
+    os.environ.update({
+        "DB_URI": args.mongo_uri,
+        "MONGO_DB_URI": args.mongo_uri,
+        "MONGO_DB_NAME": args.db_name,
+        "JWT_SECRET": os.environ.get("JWT_SECRET") or "loadtest-secret",
+        "STORAGE_BACKEND": "memory",
+        "STORAGE_PUBLIC_URL": f"http://{args.host}:{args.port}",
+        "STORAGE_FAKE_LATENCY_MS": str(args.storage_latency_ms),
+        "DEFERRED_UPLOADS": "false",
+        "GROQ_API_KEY": "loadtest",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{args.llm_port}/v1/chat/completions",
+        "CUDA_VISIBLE_DEVICES": "-1",
+    })
+
+
+async def seed_admin() -> None:
+    from app.schemas.user import UserCreate
+    from app.services.user_service import user_service
+    from benchmarks.loadtest.stubs import ADMIN_EMAIL, ADMIN_PASSWORD
+
+    users = user_service.users_collection
+    if not await users.find_one({"email": ADMIN_EMAIL}):
+        await user_service.create_user(UserCreate(
+            email=ADMIN_EMAIL, password=ADMIN_PASSWORD, full_name="Load Test Admin"
+        ))
+    await users.update_one({"email": ADMIN_EMAIL}, {"$set": {"role": "admin", "is_active": True}})
+    print(f"👤 Seeded admin account {ADMIN_EMAIL}")
+
+
+def build_app(args):
+    from app.main import app
+    from app.services.firebase_service import FirebaseService
+    from app.services.ml_service import ml_service
+    from benchmarks.loadtest.stubs import stub_verify_id_token
+    from benchmarks.ml_pipeline import attach_stub_models
+
+    attach_stub_models(ml_service, args.model_latency_ms)
+    FirebaseService.verify_id_token = staticmethod(stub_verify_id_token)
+    app.add_event_handler("startup", seed_admin)
+    return app
+
+
+async def serve(args) -> None:
+    import uvicorn
+    from benchmarks.loadtest.stubs import create_stub_llm_app
+
+    api = uvicorn.Server(uvicorn.Config(
+        build_app(args), host=args.host, port=args.port,
+        log_level="warning", access_log=False,
+    ))
+    llm = uvicorn.Server(uvicorn.Config(
+        create_stub_llm_app(args.llm_latency_ms), host="127.0.0.1", port=args.llm_port,
+        log_level="warning", access_log=False,
+    ))
+    print(f"🧪 Load-test API on http://{args.host}:{args.port} (stub LLM on :{args.llm_port})")
+    await asyncio.gather(api.serve(), llm.serve())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the API with local stand-ins for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--llm-port", type=int, default=8099)
+    parser.add_argument("--mongo-uri", default="mongomock://localhost/tomato_guard_loadtest",
+                        help="mongomock://… for the in-memory fake, or a local mongodb:// URI")
+    parser.add_argument("--db-name", default="tomato_guard_loadtest")
+    parser.add_argument("--model-latency-ms", type=float, default=40.0,
+                        help="Simulated per-image inference latency of the stub models")
+    parser.add_argument("--storage-latency-ms", type=float, default=150.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    args = parser.parse_args(argv)
+
+    configure_environment(args)
+    asyncio.run(serve(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
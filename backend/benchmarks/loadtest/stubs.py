@@ -0,0 +1,65 @@
+"""
+Local stand-ins for external services used by the load-test server.
+
+  • stub LLM   – OpenAI-compatible /chat/completions endpoint (for GeminiService)
+  • stub token verifier – accepts "stub:<uid>:<email>" as a Firebase ID token
+
+These are wired in by benchmarks.loadtest.server only; nothing in app/
+imports this module.
+"""
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+# Admin account seeded by the load-test server and used by the driver
+ADMIN_EMAIL = "loadtest-admin@example.com"
+ADMIN_PASSWORD = "loadtest-admin-password"
+
+STUB_TOKEN_PREFIX = "stub:"
+
+STUB_LLM_REPLY = (
+    "🍅 Early blight is a fungal disease. Remove affected leaves, improve air "
+    "circulation and apply a copper-based fungicide every 7-10 days."
+)
+
+
+def stub_token(uid: str, email: str) -> str:
+    return f"{STUB_TOKEN_PREFIX}{uid}:{email}"
+
+
+def stub_verify_id_token(id_token: str) -> dict:
+    """Drop-in for FirebaseService.verify_id_token"""
+    if not id_token.startswith(STUB_TOKEN_PREFIX):
+        raise ValueError("Invalid Firebase token: not a load-test stub token")
+    uid, _, email = id_token[len(STUB_TOKEN_PREFIX):].partition(":")
+    if not uid or not email:
+        raise ValueError("Invalid Firebase token: expected stub:<uid>:<email>")
+    return {"uid": uid, "email": email, "name": f"Load Test {uid}"}
+
+
+def create_stub_llm_app(latency_ms: float = 300.0) -> FastAPI:
+    """OpenAI-compatible chat completions endpoint with a canned reply"""
+    app = FastAPI(title="Stub LLM")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(payload: dict):
+        await asyncio.sleep(latency_ms / 1000.0)
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in payload.get("messages", []))
+        return {
+            "id": f"stub-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": STUB_LLM_REPLY},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(STUB_LLM_REPLY.split()),
+            },
+        }
+
+    return app
@@ -0,0 +1,165 @@
+"""
+Event-loop latency during a login storm.
+
+Fires --logins password logins, --concurrency at a time, at
+UserService.authenticate_user while a probe coroutine sleeps --probe-ms
+in a loop and records how late it wakes up: the delay any other request
+on the worker would see. Modes:
+
+  • inline   – the password verified on the event loop, as before the
+               hashing pool existed
+  • thread   – PasswordHasher without processes (PASSWORD_HASH_WORKERS=0)
+  • process  – PasswordHasher with --workers processes
+
+Reports login latency / throughput and the probe's lateness per mode.
+
+Usage (from backend/):
+    python -m benchmarks.login_storm
+    python -m benchmarks.login_storm --logins 500 --concurrency 100 --workers 4 \\
+        --output benchmarks/results/login_storm.json
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from benchmarks.common import print_table, run_metadata, summarize, write_json  # noqa: E402
+from benchmarks.save_analysis import get_client  # noqa: E402
+
+EMAIL = "storm@example.com"
+PASSWORD = "correct horse battery staple"
+
+
+async def legacy_authenticate(users, email: str, password: str) -> Optional[Dict[str, Any]]:
+    """authenticate_user as it was before the hashing pool, for comparison"""
+    from app.utils.security import verify_password
+
+    user_doc = await users.find_one({"email": email})
+    if not user_doc or not verify_password(password, user_doc["hashed_password"]):
+        return None
+    return user_doc
+
+
+async def storm(login, logins: int, concurrency: int, probe_interval: float) -> Dict[str, Any]:
+    lateness: List[float] = []
+    latencies: List[float] = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            before = time.perf_counter()
+            await asyncio.sleep(probe_interval)
+            lateness.append(max(0.0, time.perf_counter() - before - probe_interval))
+
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with slots:
+            started = time.perf_counter()
+            assert await login() is not None
+            latencies.append(time.perf_counter() - started)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe_task
+
+    lag = summarize(lateness)
+    login_stats = summarize(latencies)
+    return {
+        "logins_per_s": round(logins / elapsed, 2),
+        "login_p50_ms": login_stats["p50_ms"],
+        "login_p95_ms": login_stats["p95_ms"],
+        "lag_p50_ms": lag["p50_ms"],
+        "lag_p99_ms": lag["p99_ms"],
+        "lag_max_ms": lag["max_ms"],
+    }
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    from app.services import auth_service as auth_service_module
+    from app.services.user_service import user_service
+    from app.utils.password_hasher import PasswordHasher
+    from app.utils.security import get_password_hash
+
+    client = get_client(args.mongo_uri)
+    db = client[args.db_name]
+    user_service._users_collection = db.users
+    inserted = await db.users.insert_one({
+        "email": EMAIL,
+        "full_name": "Storm User",
+        "hashed_password": get_password_hash(PASSWORD),
+        "role": "user",
+        "is_active": True,
+        "created_at": datetime.utcnow(),
+    })
+
+    pool_hasher = auth_service_module.password_hasher
+    rows = []
+    try:
+        rows.append({"mode": "inline", **await storm(
+            lambda: legacy_authenticate(db.users, EMAIL, PASSWORD),
+            args.logins, args.concurrency, args.probe_ms / 1000,
+        )})
+        for mode, workers in (("thread", 0), ("process", args.workers)):
+            hasher = PasswordHasher(workers=workers, max_concurrent=max(workers, 1), max_waiting=args.logins)
+            hasher.start()
+            auth_service_module.password_hasher = hasher
+            try:
+                await hasher.verify_and_update(PASSWORD, get_password_hash(PASSWORD))  # workers up
+                rows.append({"mode": mode, **await storm(
+                    lambda: user_service.authenticate_user(EMAIL, PASSWORD),
+                    args.logins, args.concurrency, args.probe_ms / 1000,
+                )})
+            finally:
+                await hasher.stop()
+    finally:
+        auth_service_module.password_hasher = pool_hasher
+        await db.users.delete_one({"_id": inserted.inserted_id})
+        client.close()
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark event-loop latency during a login storm")
+    parser.add_argument("--mongo-uri", default="mongomock://localhost",
+                        help="mongomock://… for the in-memory fake, or a local mongodb:// URI")
+    parser.add_argument("--db-name", default="tomato_guard_benchmark")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2, help="Processes for the 'process' mode")
+    parser.add_argument("--probe-ms", type=float, default=5.0, help="Sleep interval of the lag probe")
+    parser.add_argument("--output", help="Write JSON results to this path ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    rows = asyncio.run(run(args))
+
+    print()
+    print_table(rows, ["mode", "logins_per_s", "login_p50_ms", "login_p95_ms",
+                       "lag_p50_ms", "lag_p99_ms", "lag_max_ms"])
+
+    write_json(args.output, {
+        "benchmark": "login_storm",
+        "meta": run_metadata(
+            mongo_uri=args.mongo_uri.split("@")[-1],
+            logins=args.logins,
+            concurrency=args.concurrency,
+            workers=args.workers,
+            probe_ms=args.probe_ms,
+        ),
+        "results": rows,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Offline benchmark for the ML analysis pipeline.
+
+Times every stage of MLService on synthetic (and optionally real sample)
+images from 0.3 MP to 12 MP:
+
+  decode_pil / decode_cv2  – image decoding as done by preprocessing / spot detection
+  preprocess               – TomatoImagePreprocessor.preprocess_for_prediction
+  part / disease           – model inference, per batch size
+  spots                    – DiseaseSpotDetector.detect_disease_spots
+  encode_base64            – annotated image -> JPEG -> base64
+  end_to_end               – MLService.analyze_image
+  end_to_end_multi         – MLService.analyze_image_regions
+
+Runs on CPU with either the real Keras models or stub models that need no
+TensorFlow, so the image-processing stages can be tracked anywhere.
+
+Usage (from backend/):
+    python -m benchmarks.ml_pipeline --backend stub
+    python -m benchmarks.ml_pipeline --backend stub keras --batch-sizes 1 8 32 \\
+        --images ../samples --output benchmarks/results/ml_pipeline.json
+"""
+import argparse
+import io
+import math
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import print_table, run_metadata, summarize, time_call, write_json  # noqa: E402
+
+DEFAULT_MEGAPIXELS = [0.3, 1.0, 3.0, 8.0, 12.0]
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+class StubModel:
+    """
+    Keras-compatible stand-in for a classifier. Cost scales with the input
+    batch (it reads every pixel) plus an optional fixed per-image delay to
+    mimic real inference latency.
+    """
+
+    def __init__(self, num_classes: int, favored_index: int = 0, latency_ms: float = 0.0):
+        self.num_classes = num_classes
+        self.favored_index = favored_index
+        self.latency_ms = latency_ms
+        self.input_shape = (None, 224, 224, 3)
+        self.output_shape = (None, num_classes)
+        self.layers: List[Any] = []
+
+    def predict(self, x, verbose=0):
+        x = np.asarray(x, dtype=np.float32)
+        means = x.reshape(x.shape[0], -1).mean(axis=1)
+        if self.latency_ms:
+            time.sleep(self.latency_ms * x.shape[0] / 1000.0)
+        logits = np.tile(np.linspace(0.0, 1.0, self.num_classes), (x.shape[0], 1))
+        logits[:, self.favored_index] += 3.0 + means
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def count_params(self) -> int:
+        return 0
+
+
+def build_service(backend: str, model_dir: str, stub_latency_ms: float):
+    from app.services.ml_service import MLService
+
+    if backend == "keras":
+        service = MLService(model_path=model_dir)
+        missing = {"part", "leaf", "fruit", "stem"} - set(service.models)
+        if missing:
+            raise SystemExit(f"❌ Keras backend is missing models: {', '.join(sorted(missing))}")
+        return service
+
+    return attach_stub_models(MLService(model_path=model_dir, autoload=False), stub_latency_ms)
+
+
+def attach_stub_models(service, latency_ms: float = 0.0):
+    """Replace a service's models with stubs (also used by the load-test server)"""
+    names = service.class_names
+    # Favor leaf / Early Blight so the full path (incl. spot detection) runs
+    service.models = {
+        "part": StubModel(len(names["part"]), names["part"].index("leaf"), latency_ms),
+        "leaf": StubModel(len(names["leaf"]), names["leaf"].index("Early Blight"), latency_ms),
+        "fruit": StubModel(len(names["fruit"]), 0, latency_ms),
+        "stem": StubModel(len(names["stem"]), 0, latency_ms),
+    }
+    service.loaded_models_info = [
+        {"name": name, "filename": "stub", "parameters": 0} for name in service.models
+    ]
+    return service
+
+
+def synthetic_image(megapixels: float, seed: int = 0) -> bytes:
+    """A 4:3 JPEG with a leaf-like green shape and brown lesions on soil"""
+    rng = np.random.default_rng(seed)
+    width = int(math.sqrt(megapixels * 1_000_000 * 4 / 3))
+    height = int(width * 3 / 4)
+
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = (60, 80, 100)  # BGR soil
+    center = (width // 2, height // 2)
+    axes = (int(width * 0.35), int(height * 0.3))
+    cv2.ellipse(image, center, axes, 20, 0, 360, (40, 150, 50), -1)
+
+    for _ in range(25):
+        x = int(rng.integers(center[0] - axes[0] // 2, center[0] + axes[0] // 2))
+        y = int(rng.integers(center[1] - axes[1] // 2, center[1] + axes[1] // 2))
+        radius = max(2, int(rng.uniform(0.005, 0.02) * width))
+        cv2.circle(image, (x, y), radius, (30, 70, 120), -1)
+
+    # Texture noise so JPEG size is realistic for the resolution
+    noise = rng.integers(-12, 12, size=image.shape, dtype=np.int16)
+    image = np.clip(image.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    if not ok:
+        raise RuntimeError("Failed to encode synthetic image")
+    return encoded.tobytes()
+
+
+def load_samples(paths: List[str]) -> List[Tuple[str, bytes]]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, f) for f in sorted(os.listdir(path))
+                if f.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            files.append(path)
+    samples = []
+    for file_path in files:
+        with open(file_path, "rb") as f:
+            samples.append((f"sample:{os.path.basename(file_path)}", f.read()))
+    return samples
+
+
+def benchmark_image_stages(service, label: str, data: bytes, iterations: int) -> List[Dict[str, Any]]:
+    """Per-image stages (independent of batch size)"""
+    pil_image = Image.open(io.BytesIO(data)).convert("RGB")
+    cv_image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    megapixels = round(pil_image.size[0] * pil_image.size[1] / 1_000_000, 2)
+
+    stages = {
+        "decode_pil": lambda: Image.open(io.BytesIO(data)).convert("RGB"),
+        "decode_cv2": lambda: cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR),
+        "preprocess": lambda: service.preprocessor.preprocess_for_prediction(pil_image),
+        "spots": lambda: service.spot_detector.detect_disease_spots(data, "Early Blight"),
+        "encode_base64": lambda: service.spot_detector.image_to_base64(cv_image),
+        "end_to_end": lambda: service.analyze_image(data),
+        "end_to_end_multi": lambda: service.analyze_image_regions(data),
+    }
+
+    rows = []
+    for stage, fn in stages.items():
+        samples = time_call(fn, iterations)
+        rows.append({
+            "image": label,
+            "megapixels": megapixels,
+            "bytes": len(data),
+            "batch_size": 1,
+            "stage": stage,
+            **summarize(samples),
+        })
+    return rows
+
+
+def benchmark_model_stages(service, batch_size: int, iterations: int) -> List[Dict[str, Any]]:
+    """Model inference on preprocessed 224x224 inputs (independent of source resolution)"""
+    batch = np.random.default_rng(0).random((batch_size, 224, 224, 3)).astype(np.float32)
+    rows = []
+    for stage, model_name in (("part", "part"), ("disease", "leaf")):
+        model = service.models[model_name]
+        samples = time_call(lambda: model.predict(batch, verbose=0), iterations)
+        rows.append({
+            "image": "224x224",
+            "megapixels": None,
+            "bytes": None,
+            "batch_size": batch_size,
+            "stage": stage,
+            **summarize(samples, items_per_sample=batch_size),
+        })
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the TomatoGuard ML pipeline")
+    parser.add_argument("--backend", nargs="+", choices=["stub", "keras"], default=["stub"])
+    parser.add_argument("--model-dir", default="models/")
+    parser.add_argument("--megapixels", nargs="+", type=float, default=DEFAULT_MEGAPIXELS)
+    parser.add_argument("--images", nargs="*", default=[], help="Sample image files or directories")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4, 8])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0,
+                        help="Simulated per-image inference latency for stub models")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write JSON results to this path ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    # CPU only, for comparable numbers across machines
+    os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+
+    images = [(f"synthetic:{mp}MP", synthetic_image(mp, args.seed)) for mp in args.megapixels]
+    images.extend(load_samples(args.images))
+
+    results = []
+    for backend in args.backend:
+        service = build_service(backend, args.model_dir, args.stub_latency_ms)
+        print(f"\n⏱️  Backend: {backend}")
+
+        for batch_size in args.batch_sizes:
+            for row in benchmark_model_stages(service, batch_size, args.iterations):
+                results.append({"backend": backend, **row})
+
+        for label, data in images:
+            print(f"   {label} ({len(data) / 1024:.0f} KB)")
+            for row in benchmark_image_stages(service, label, data, args.iterations):
+                results.append({"backend": backend, **row})
+
+    print()
+    print_table(results, ["backend", "image", "batch_size", "stage", "p50_ms", "p95_ms", "p99_ms", "throughput_per_s"])
+
+    write_json(args.output, {
+        "benchmark": "ml_pipeline",
+        "meta": run_metadata(
+            backends=args.backend,
+            iterations=args.iterations,
+            stub_latency_ms=args.stub_latency_ms,
+            opencv=cv2.__version__,
+        ),
+        "results": results,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
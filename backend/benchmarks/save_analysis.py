@@ -0,0 +1,151 @@
+"""
+Micro-benchmark for the analysis write path.
+
+Compares AnalysisService.save_analysis against the previous implementation
+(AnalysisRecord -> dict -> insert_one -> find_one -> AnalysisResponse) on
+a realistic analysis_result produced by the stub ML pipeline, reporting
+wall-clock latency and process CPU time per saved analysis.
+
+Runs against the in-memory mongomock-motor fake by default (from
+requirements-dev.txt, as for every benchmark); pass a local mongod URI to
+include real network/BSON costs.
+
+Usage (from backend/):
+    python -m benchmarks.save_analysis
+    python -m benchmarks.save_analysis --mongo-uri mongodb://localhost:27017 \\
+        --iterations 500 --output benchmarks/results/save_analysis.json
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import print_table, run_metadata, summarize, write_json  # noqa: E402
+
+
+def sample_analysis_result(megapixels: float, multi_object: bool) -> Dict[str, Any]:
+    """A real analysis_result (annotated image included) from the stub pipeline"""
+    from benchmarks.ml_pipeline import build_service, synthetic_image
+
+    service = build_service("stub", "models/", 0.0)
+    data = synthetic_image(megapixels)
+    return service.analyze_image_regions(data) if multi_object else service.analyze_image(data)
+
+
+async def legacy_save(service, analysis_data):
+    """save_analysis as it was before the lean write path, for comparison"""
+    from app.models.analysis_model import AnalysisRecord, AnalysisResponse
+
+    analysis_record = AnalysisRecord(**analysis_data.dict())
+    if 'model_info' in analysis_data.analysis_result:
+        analysis_record.metadata = {
+            'processing_time': analysis_data.analysis_result.get('performance', {}).get('total_processing_time'),
+            'model_version': analysis_data.analysis_result.get('model_info', {}).get('analysis_timestamp'),
+            'preprocessing_method': analysis_data.analysis_result.get('model_info', {}).get('preprocessing_method'),
+            'bounding_boxes_enabled': analysis_data.analysis_result.get('model_info', {}).get('bounding_boxes_enabled')
+        }
+    analysis_dict = analysis_record.dict()
+    analysis_dict.pop('id', None)
+    result = await service.analyses_collection.insert_one(analysis_dict)
+    created = await service.analyses_collection.find_one({"_id": result.inserted_id})
+    created["id"] = str(created.pop("_id"))
+    return AnalysisResponse(**created)
+
+
+async def time_async(fn: Callable[[], Awaitable[Any]], iterations: int, warmup: int = 5):
+    for _ in range(warmup):
+        await fn()
+    wall, cpu = [], []
+    for _ in range(iterations):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        await fn()
+        cpu.append(time.process_time() - cpu_start)
+        wall.append(time.perf_counter() - wall_start)
+    return wall, cpu
+
+
+def get_client(uri: str):
+    if uri.startswith("mongomock://"):
+        from mongomock_motor import AsyncMongoMockClient
+        return AsyncMongoMockClient()
+    from motor.motor_asyncio import AsyncIOMotorClient
+    return AsyncIOMotorClient(uri)
+
+
+async def run(args) -> List[Dict[str, Any]]:
+    from app.models.analysis_model import AnalysisCreate
+    from app.services.analysis_service import AnalysisService
+
+    analysis_result = sample_analysis_result(args.megapixels, args.multi_object)
+    analysis_data = AnalysisCreate(
+        user_id="benchmark-user",
+        image_url="http://localhost/storage/benchmark.jpg",
+        cloudinary_public_id="benchmark",
+        analysis_result=analysis_result,
+        notes="Benchmark analysis",
+        tags=["benchmark"],
+    )
+
+    client = get_client(args.mongo_uri)
+    db = client[args.db_name]
+    service = AnalysisService(db)
+    await db.analyses.delete_many({})
+
+    variants = {
+        "legacy": lambda: legacy_save(service, analysis_data),
+        "lean": lambda: service.save_analysis(analysis_data),
+    }
+    rows = []
+    try:
+        for name, fn in variants.items():
+            wall, cpu = await time_async(fn, args.iterations)
+            summary = summarize(wall)
+            rows.append({
+                "variant": name,
+                **summary,
+                "cpu_mean_ms": round(1000 * sum(cpu) / len(cpu), 3),
+            })
+    finally:
+        await db.analyses.delete_many({})
+        client.close()
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark AnalysisService.save_analysis")
+    parser.add_argument("--mongo-uri", default="mongomock://localhost",
+                        help="mongomock://… for the in-memory fake, or a local mongodb:// URI")
+    parser.add_argument("--db-name", default="tomato_guard_benchmark")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--megapixels", type=float, default=1.0,
+                        help="Size of the synthetic image behind the analysis_result")
+    parser.add_argument("--multi-object", action="store_true",
+                        help="Use a multi-region analysis_result (larger document)")
+    parser.add_argument("--output", help="Write JSON results to this path ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+    rows = asyncio.run(run(args))
+
+    print()
+    print_table(rows, ["variant", "n", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "cpu_mean_ms"])
+
+    write_json(args.output, {
+        "benchmark": "save_analysis",
+        "meta": run_metadata(
+            mongo_uri=args.mongo_uri.split("@")[-1],
+            iterations=args.iterations,
+            megapixels=args.megapixels,
+            multi_object=args.multi_object,
+        ),
+        "results": rows,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Check that every hot query is served by an index.
+
+Runs explain (queryPlanner) for each entry in HOT_QUERIES and fails with a
+non-zero exit status if any winning plan contains a COLLSCAN, so it can
+gate CI or a deploy. Registered indexes are ensured first (disable with
+--no-ensure to check a live cluster as it is).
+
+Needs a real mongod: the in-memory mongomock fake has no query planner.
+Placeholder filter values do not matter to the planner, and an empty
+database works too once the indexes exist.
+
+Usage (from backend/, with the usual DB_URI / MONGO_DB_URI environment):
+    python -m scripts.check_query_plans
+    python -m scripts.check_query_plans --no-ensure --verbose
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Set
+
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.database import close_mongo_connection, connect_to_mongo, get_database  # noqa: E402
+from app.services.indexes import index_manager  # noqa: E402
+
+_since = datetime.utcnow() - timedelta(days=30)
+
+# name -> command to explain; keep in step with the queries in services/ and routes/
+HOT_QUERIES: Dict[str, Dict[str, Any]] = {
+    "analysis.history": {
+        "find": "analyses", "filter": {"user_id": "u"}, "sort": {"created_at": -1, "_id": -1}, "limit": 50,
+    },
+    "analysis.history_next_page": {
+        "find": "analyses",
+        "filter": {"user_id": "u", "$or": [
+            {"created_at": {"$lt": _since}},
+            {"created_at": _since, "_id": {"$lt": ObjectId()}},
+        ]},
+        "sort": {"created_at": -1, "_id": -1}, "limit": 50,
+    },
+    "analytics.history_next_page": {
+        "find": "analyses",
+        "filter": {"$or": [
+            {"created_at": {"$lt": _since}},
+            {"created_at": _since, "_id": {"$lt": ObjectId()}},
+        ]},
+        "sort": {"created_at": -1, "_id": -1}, "limit": 20,
+    },
+    "analysis.user_filtered": {
+        "find": "analyses", "filter": {"user_id": "u", "is_favorite": True}, "sort": {"created_at": -1},
+    },
+    "analytics.today_count": {
+        "count": "analyses", "query": {"created_at": {"$gte": _since}},
+    },
+    "analytics.healthy_count": {
+        "count": "analyses", "query": {"disease": "Healthy"},
+    },
+    "analytics.low_confidence": {
+        "count": "analyses", "query": {"confidence": {"$lt": 0.6}},
+    },
+    "analytics.trends": {
+        "aggregate": "analyses",
+        "pipeline": [
+            {"$match": {"created_at": {"$gte": _since}}},
+            {"$group": {"_id": "$plant_part", "count": {"$sum": 1}}},
+        ],
+        "cursor": {},
+    },
+    "analytics.spotlight_disease": {
+        "count": "analyses",
+        "query": {"plant_part": "leaf", "disease": "Early Blight", "created_at": {"$gte": _since}},
+    },
+    "analytics.recent": {
+        "find": "analyses", "filter": {}, "sort": {"created_at": -1}, "limit": 10,
+    },
+    "notifications.list": {
+        "find": "notifications", "filter": {"recipient_id": "u"}, "sort": {"created_at": -1}, "limit": 50,
+    },
+    "notifications.unread_list": {
+        "find": "notifications", "filter": {"recipient_id": "u", "is_read": False},
+        "sort": {"created_at": -1}, "limit": 50,
+    },
+    "notifications.unread_count": {
+        "count": "notifications", "query": {"recipient_id": "u", "is_read": False},
+    },
+    "posts.list": {
+        "find": "posts", "filter": {}, "sort": {"created_at": -1}, "limit": 20,
+    },
+    "posts.by_category": {
+        "find": "posts", "filter": {"category": "disease"}, "sort": {"created_at": -1}, "limit": 20,
+    },
+    "posts.by_author": {
+        "find": "posts", "filter": {"author_id": "u"}, "sort": {"created_at": -1},
+    },
+    "posts.liked_by": {
+        "find": "posts", "filter": {"likes": "u"}, "sort": {"created_at": -1},
+    },
+    "users.by_email": {
+        "find": "users", "filter": {"email": "user@example.com"}, "limit": 1,
+    },
+    "users.by_firebase_uid": {
+        "find": "users", "filter": {"firebase_uid": "uid"}, "limit": 1,
+    },
+    "upload_outbox.claim": {
+        "findAndModify": "upload_outbox",
+        "query": {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": datetime.utcnow()}},
+            {"status": "processing", "lease_until": {"$lt": datetime.utcnow()}},
+        ]},
+        "sort": {"next_attempt_at": 1},
+        "update": {"$set": {"status": "processing"}},
+    },
+    "token_revocation.sync": {
+        "find": "refresh_token_revocations",
+        "filter": {"revoked_at": {"$gte": _since}},
+        "projection": {"kind": 1, "user_id": 1, "not_before": 1, "revoked_at": 1},
+    },
+}
+
+
+def plan_stages(node: Any, stages: Set[str]) -> Set[str]:
+    """Collect plan stage names, ignoring rejected plans"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "rejectedPlans":
+                continue
+            if key == "stage" and isinstance(value, str):
+                stages.add(value)
+            else:
+                plan_stages(value, stages)
+    elif isinstance(node, list):
+        for item in node:
+            plan_stages(item, stages)
+    return stages
+
+
+async def check(args) -> int:
+    db = get_database()
+    if args.ensure:
+        await index_manager.ensure(db)
+
+    failures: List[str] = []
+    for name, command in HOT_QUERIES.items():
+        explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        stages = plan_stages(explain.get("queryPlanner", explain), set())
+        ok = "COLLSCAN" not in stages
+        if not ok:
+            failures.append(name)
+        detail = f" ({', '.join(sorted(stages))})" if args.verbose or not ok else ""
+        print(f"{'✅' if ok else '❌'} {name}{detail}")
+
+    if failures:
+        print(f"\n❌ {len(failures)} hot queries fall back to a collection scan: {', '.join(failures)}")
+        return 1
+    print(f"\n✅ All {len(HOT_QUERIES)} hot queries use an index")
+    return 0
+
+
+async def run(args) -> int:
+    await connect_to_mongo()
+    try:
+        return await check(args)
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fail if a hot query would scan a whole collection")
+    parser.add_argument("--no-ensure", dest="ensure", action="store_false",
+                        help="Check the live indexes without creating missing ones")
+    parser.add_argument("--verbose", action="store_true", help="Print plan stages for every query")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Export analyses to NDJSON, CSV or Parquet for offline study.
+
+Streams the analyses collection (oldest first) through the same exporter
+as GET /api/v1/admin/export/analyses, with the same filters, in constant
+memory. The position of the last row written is checkpointed next to the
+output (<output>.cursor) after every batch, so an interrupted NDJSON or
+CSV export continues where it stopped with --resume. A Parquet file is
+only readable once complete, so a resumed Parquet export is written to a
+new part file (<name>.partN.parquet) holding the remaining rows.
+
+Parquet needs pyarrow (pip install pyarrow).
+
+Usage (from backend/, with the usual DB_URI / MONGO_DB_URI environment):
+    python -m scripts.export_analyses --format csv --output exports/analyses.csv
+    python -m scripts.export_analyses --format parquet --output exports/leaf.parquet \\
+        --plant-part leaf --date-from 2025-01-01 --min-confidence 0.8
+    python -m scripts.export_analyses --format csv --output exports/analyses.csv --resume
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.analysis_model import AnalysisExportFilters  # noqa: E402
+from app.services.database import close_mongo_connection, connect_to_mongo, get_database  # noqa: E402
+from app.services.export_service import AnalysisExporter, ExportUnavailable  # noqa: E402
+from app.utils.pagination import encode_cursor  # noqa: E402
+
+
+def checkpoint_path(output: str) -> str:
+    return output + ".cursor"
+
+
+def read_checkpoint(output: str):
+    try:
+        with open(checkpoint_path(output), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(output: str, token: str) -> None:
+    path = checkpoint_path(output)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(token)
+    os.replace(path + ".tmp", path)
+
+
+def next_part_path(output: str) -> str:
+    base, ext = os.path.splitext(output)
+    part = 1
+    while os.path.exists(f"{base}.part{part}{ext}"):
+        part += 1
+    return f"{base}.part{part}{ext}"
+
+
+async def export(args) -> int:
+    cursor = read_checkpoint(args.output) if args.resume else None
+    if args.resume and not cursor:
+        print(f"ℹ️ No checkpoint at {checkpoint_path(args.output)}; starting from the beginning")
+
+    filters = AnalysisExportFilters(
+        date_from=args.date_from, date_to=args.date_to,
+        plant_part=args.plant_part, disease=args.disease,
+        min_confidence=args.min_confidence, max_confidence=args.max_confidence,
+        cursor=cursor,
+    )
+
+    target, mode = args.output, "wb"
+    if cursor:
+        if args.format == "parquet":
+            target = next_part_path(args.output)
+        else:
+            mode = "ab"
+
+    progress = {"rows": 0, "token": None}
+
+    def on_batch(batch):
+        progress["rows"] += len(batch)
+        # Rows without created_at have no position; keep the last one that has
+        positioned = next((row for row in reversed(batch) if row.get("created_at")), None)
+        if positioned is not None:
+            progress["token"] = encode_cursor(positioned["created_at"], positioned["id"])
+
+    try:
+        chunks = AnalysisExporter(get_database(), batch_size=args.batch_size).stream(
+            args.format, filters, limit=args.limit, header=mode == "wb", on_batch=on_batch,
+        )
+    except ExportUnavailable as e:
+        print(f"❌ {e}")
+        return 1
+    except ValueError as e:
+        print(f"❌ {e}: {checkpoint_path(args.output)} is stale or damaged; delete it or export without --resume")
+        return 1
+
+    started = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    with open(target, mode) as f:
+        async for chunk in chunks:
+            f.write(chunk)
+            f.flush()
+            # NDJSON / CSV chunks hold whole batches, so the checkpoint can
+            # follow every chunk; a Parquet file only counts once closed
+            if args.format != "parquet" and progress["token"]:
+                write_checkpoint(args.output, progress["token"])
+    if progress["token"]:
+        write_checkpoint(args.output, progress["token"])
+
+    print(f"✅ Exported {progress['rows']} analyses to {target} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+async def run(args) -> int:
+    await connect_to_mongo()
+    try:
+        return await export(args)
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export analyses to NDJSON, CSV or Parquet")
+    parser.add_argument("--format", choices=["ndjson", "csv", "parquet"], default="ndjson")
+    parser.add_argument("--output", required=True, help="Output file")
+    parser.add_argument("--resume", action="store_true", help="Continue from the <output>.cursor checkpoint")
+    parser.add_argument("--date-from", type=datetime.fromisoformat)
+    parser.add_argument("--date-to", type=datetime.fromisoformat)
+    parser.add_argument("--plant-part")
+    parser.add_argument("--disease")
+    parser.add_argument("--min-confidence", type=float)
+    parser.add_argument("--max-confidence", type=float)
+    parser.add_argument("--limit", type=int, help="Stop after this many rows")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
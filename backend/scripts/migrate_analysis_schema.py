@@ -0,0 +1,139 @@
+"""
+Migrate analysis documents to the canonical schema.
+
+Adds the top-level disease / plant_part / confidence / severity fields
+(see app.services.analysis_service.canonical_fields) to documents written
+before they existed, then ensures the analysis indexes.
+
+Documents are processed in _id order in batches of bulk updates. Progress
+is checkpointed in the `migrations` collection after every batch, so an
+interrupted run continues where it stopped; documents that already carry
+the current schema_version are skipped, so re-running is always safe.
+Only the detection fields are read, never the stored images.
+
+Usage (from backend/, with the usual DB_URI / MONGO_DB_URI environment):
+    python -m scripts.migrate_analysis_schema --dry-run
+    python -m scripts.migrate_analysis_schema --batch-size 500 --sleep-ms 50
+    python -m scripts.migrate_analysis_schema --restart
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import UpdateOne  # noqa: E402
+
+from app.services.analysis_service import (  # noqa: E402
+    ANALYSIS_SCHEMA_VERSION,
+    AnalysisService,
+    canonical_fields,
+)
+from app.services.database import close_mongo_connection, connect_to_mongo, get_database  # noqa: E402
+
+MIGRATION_ID = f"analysis_schema_v{ANALYSIS_SCHEMA_VERSION}"
+
+# Just what canonical_fields reads, for both storage layouts
+SOURCE_PROJECTION = {
+    f"analysis_result.{prefix}{path}": 1
+    for prefix in ("", "analysis.")
+    for path in (
+        "disease_detection.disease",
+        "disease_detection.confidence",
+        "part_detection.part",
+        "spot_detection.severity.level",
+    )
+}
+
+
+async def migrate(args) -> int:
+    db = get_database()
+    analyses = db.analyses
+    migrations = db.migrations
+    pending_filter = {"schema_version": {"$ne": ANALYSIS_SCHEMA_VERSION}}
+
+    if args.dry_run:
+        remaining = await analyses.count_documents(pending_filter)
+        print(f"🔎 {remaining} analyses need migrating to schema v{ANALYSIS_SCHEMA_VERSION}")
+        return 0
+
+    checkpoint = None if args.restart else await migrations.find_one({"_id": MIGRATION_ID})
+    last_id = checkpoint.get("last_id") if checkpoint else None
+    migrated = checkpoint.get("migrated", 0) if checkpoint else 0
+    if last_id is not None:
+        print(f"↪️  Resuming after _id {last_id} ({migrated} already migrated)")
+    await migrations.update_one(
+        {"_id": MIGRATION_ID},
+        {"$set": {"last_id": last_id, "migrated": migrated, "completed_at": None},
+         "$setOnInsert": {"started_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+    started = time.perf_counter()
+    while True:
+        query = dict(pending_filter)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await analyses.find(query, SOURCE_PROJECTION).sort("_id", 1).limit(args.batch_size).to_list(
+            length=args.batch_size
+        )
+        if not batch:
+            break
+
+        operations = [
+            # Re-check the version so a document rewritten meanwhile is left alone
+            UpdateOne(
+                {"_id": doc["_id"], **pending_filter},
+                {"$set": canonical_fields(doc.get("analysis_result") or {})},
+            )
+            for doc in batch
+        ]
+        result = await analyses.bulk_write(operations, ordered=False)
+        migrated += result.modified_count
+        last_id = batch[-1]["_id"]
+
+        await migrations.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {"last_id": last_id, "migrated": migrated, "updated_at": datetime.utcnow()}},
+        )
+        rate = migrated / max(time.perf_counter() - started, 1e-6)
+        print(f"   … {migrated} migrated (last _id {last_id}, {rate:.0f} docs/s)")
+
+        if args.sleep_ms:
+            await asyncio.sleep(args.sleep_ms / 1000.0)
+
+    await migrations.update_one(
+        {"_id": MIGRATION_ID}, {"$set": {"completed_at": datetime.utcnow()}}
+    )
+    print(f"✅ Migration {MIGRATION_ID} complete: {migrated} documents migrated")
+
+    if not args.skip_indexes:
+        await AnalysisService(db).create_indexes()
+    return 0
+
+
+async def run(args) -> int:
+    await connect_to_mongo()
+    try:
+        return await migrate(args)
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Migrate analyses to the canonical schema")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--sleep-ms", type=float, default=0.0,
+                        help="Pause between batches to limit load on the cluster")
+    parser.add_argument("--dry-run", action="store_true", help="Only count documents needing migration")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    parser.add_argument("--skip-indexes", action="store_true", help="Do not create indexes afterwards")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Backfill or rebuild the analytics rollups.
+
+Recomputes every (day, plant_part, disease) row of analytics_rollups from
+the analyses collection and swaps the result in atomically. Use it once
+after deploying the rollups, and whenever the incremental counters may
+have drifted (e.g. after a failed rollup update was logged).
+
+The rollups are built from the canonical top-level fields, so documents
+must have been migrated first (scripts/migrate_analysis_schema.py); the
+command refuses to run while unmigrated analyses remain unless --force.
+
+Usage (from backend/, with the usual DB_URI / MONGO_DB_URI environment):
+    python -m scripts.rebuild_analytics_rollups
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.analysis_service import ANALYSIS_SCHEMA_VERSION  # noqa: E402
+from app.services.analytics_rollups import AnalyticsRollupService  # noqa: E402
+from app.services.database import close_mongo_connection, connect_to_mongo, get_database  # noqa: E402
+
+
+async def rebuild(args) -> int:
+    db = get_database()
+    unmigrated = await db.analyses.count_documents({"schema_version": {"$ne": ANALYSIS_SCHEMA_VERSION}})
+    if unmigrated and not args.force:
+        print(f"❌ {unmigrated} analyses are not migrated yet; run "
+              f"python -m scripts.migrate_analysis_schema first (or pass --force)")
+        return 1
+
+    started = time.perf_counter()
+    rows = await AnalyticsRollupService(db).rebuild()
+    print(f"✅ Rebuilt {rows} rollup rows in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+async def run(args) -> int:
+    await connect_to_mongo()
+    try:
+        return await rebuild(args)
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild analytics_rollups from the analyses collection")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if some analyses are unmigrated")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
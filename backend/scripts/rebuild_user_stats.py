@@ -0,0 +1,70 @@
+"""
+Rebuild the per-user statistics counters.
+
+Recomputes user_stats documents from the analyses collection, for one
+user (--user) or for every user with analyses (removing documents of
+users that have none left). Use it whenever the counters may have
+drifted, e.g. after a failed stats update was logged. Users whose
+document was never fully built (no document yet, or only increments
+applied since deploy) are also rebuilt lazily on their next statistics
+read, so a full run is not required after deploying.
+
+The counters read the canonical top-level fields, so documents must have
+been migrated first (scripts/migrate_analysis_schema.py); the command
+refuses to run while unmigrated analyses remain unless --force.
+
+Usage (from backend/, with the usual DB_URI / MONGO_DB_URI environment):
+    python -m scripts.rebuild_user_stats
+    python -m scripts.rebuild_user_stats --user 65f0c0ffee...
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.analysis_service import ANALYSIS_SCHEMA_VERSION  # noqa: E402
+from app.services.database import close_mongo_connection, connect_to_mongo, get_database  # noqa: E402
+from app.services.user_stats import UserStatsService  # noqa: E402
+
+
+async def rebuild(args) -> int:
+    db = get_database()
+    scope = {"user_id": args.user} if args.user else {}
+    unmigrated = await db.analyses.count_documents({**scope, "schema_version": {"$ne": ANALYSIS_SCHEMA_VERSION}})
+    if unmigrated and not args.force:
+        print(f"❌ {unmigrated} analyses are not migrated yet; run "
+              f"python -m scripts.migrate_analysis_schema first (or pass --force)")
+        return 1
+
+    service = UserStatsService(db)
+    started = time.perf_counter()
+    if args.user:
+        stats = await service.rebuild(args.user)
+        print(f"✅ Rebuilt stats for {args.user} ({stats['total']} analyses)")
+    else:
+        users = await service.rebuild_all()
+        print(f"✅ Rebuilt stats for {users} users in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+async def run(args) -> int:
+    await connect_to_mongo()
+    try:
+        return await rebuild(args)
+    finally:
+        await close_mongo_connection()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild user_stats from the analyses collection")
+    parser.add_argument("--user", help="Only rebuild this user_id")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if some analyses are unmigrated")
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())